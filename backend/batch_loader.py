@@ -0,0 +1,80 @@
+# backend/batch_loader.py
+"""Per-request batched lookups by key (DataLoader style) to avoid N+1 queries.
+
+Collect the keys a response needs with `want`, then `get` them: every pending
+key of a model is resolved with one `IN (...)` query, and results (including
+misses) are cached for the rest of the request.
+
+    loaders = Loaders(db)
+    users = loaders(User)
+    for a in assignments:
+        users.want(a.student_id, a.parent_id, a.teacher_id)
+    names = [users.get(a.student_id).username for a in assignments]
+"""
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set
+
+# Keys per IN (...) list, well below SQLite's and Postgres' parameter limits
+CHUNK_SIZE = 500
+
+
+class BatchLoader:
+    """Loads rows of one model by a key column, batching and caching lookups"""
+
+    def __init__(self, db: Session, model, key=None):
+        self.db = db
+        self.model = model
+        self.key = key if key is not None else model.id
+        self._cache: Dict[Hashable, Any] = {}
+        self._pending: Set[Hashable] = set()
+        self.queries = 0
+
+    def want(self, *keys: Optional[Hashable]) -> "BatchLoader":
+        """Queue keys for the next batch; None and already loaded keys are ignored"""
+        self._pending.update(k for k in keys if k is not None and k not in self._cache)
+        return self
+
+    def prime(self, row):
+        """Seed the cache with a row loaded elsewhere"""
+        self._cache[getattr(row, self.key.key)] = row
+
+    def get(self, key: Optional[Hashable]):
+        if key is None:
+            return None
+        if key not in self._cache:
+            self._pending.add(key)
+            self.load()
+        return self._cache.get(key)
+
+    def get_many(self, keys: Iterable[Optional[Hashable]]) -> List[Any]:
+        keys = list(keys)
+        self.want(*keys)
+        self.load()
+        return [self._cache.get(k) if k is not None else None for k in keys]
+
+    def load(self):
+        """Resolve every pending key"""
+        pending, self._pending = sorted(self._pending), set()
+        for start in range(0, len(pending), CHUNK_SIZE):
+            chunk = pending[start:start + CHUNK_SIZE]
+            for k in chunk:
+                self._cache[k] = None
+            for row in self.db.execute(select(self.model).where(self.key.in_(chunk))).scalars():
+                self.prime(row)
+            self.queries += 1
+
+
+class Loaders:
+    """One BatchLoader per model (and key column) for the lifetime of a request"""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._loaders: Dict[tuple, BatchLoader] = {}
+
+    def __call__(self, model, key=None) -> BatchLoader:
+        slot = (model, key.key if key is not None else "id")
+        loader = self._loaders.get(slot)
+        if loader is None:
+            loader = self._loaders[slot] = BatchLoader(self.db, model, key)
+        return loader
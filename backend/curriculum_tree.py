@@ -0,0 +1,174 @@
+# backend/curriculum_tree.py
+"""Nested curriculum hierarchy (Country > SchoolYear > Term > Topic > Concept > Lesson)
+with lesson counts per node, built in a fixed number of queries and cached as
+snapshots per filter.
+
+Snapshots carry a content hash used as the ETag. They are keyed on the
+table_versions counters of the tables they read (VERSION_TABLES), which every
+writer bumps inside its own transaction: a write is seen by the next request
+once it commits, whichever process or worker made it, and a tree built from
+rows read before that commit is filed under the old versions and never served
+again. The TTL only bounds memory.
+"""
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+import os
+import threading
+
+from table_versions import versions_query
+from ttl_cache import TTLCache
+
+# ==================== CONFIGURATION ====================
+CURRICULUM_CACHE_TTL_SECONDS = float(os.getenv("CURRICULUM_CACHE_TTL_SECONDS", "3600"))
+CURRICULUM_CACHE_MAX_ENTRIES = int(os.getenv("CURRICULUM_CACHE_MAX_ENTRIES", "256"))
+
+MODEL_NAMES = ("Country", "SchoolYear", "Term", "Topic", "CurriculumSubject", "Subject", "Concept", "Lesson")
+# table_versions names covering MODEL_NAMES: Country/SchoolYear/Term write "curriculum",
+# Topic/CurriculumSubject/Concept/Lesson write "lessons", Subject writes "subjects"
+VERSION_TABLES = ("curriculum", "lessons", "subjects")
+
+
+class Snapshot:
+    __slots__ = ("body", "etag")
+
+    def __init__(self, tree: Dict[str, Any]):
+        self.body = json.dumps(tree, separators=(",", ":"), default=str).encode()
+        self.etag = '"' + hashlib.sha1(self.body).hexdigest() + '"'
+
+
+class CurriculumTree:
+    """Builds and caches the tree; models are passed by name (see MODEL_NAMES)"""
+
+    def __init__(self, **models):
+        missing = [name for name in MODEL_NAMES if name not in models]
+        if missing:
+            raise TypeError(f"CurriculumTree needs models: {', '.join(missing)}")
+        self.m = models
+        self.cache = TTLCache(CURRICULUM_CACHE_TTL_SECONDS, CURRICULUM_CACHE_MAX_ENTRIES)
+        self.versions: tuple = ()
+        self.builds = 0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, country_id: Optional[int] = None, grade: Optional[int] = None,
+            include_lessons: bool = False) -> Snapshot:
+        # Read the counters before the rows: the rows are then at least as new as the key
+        found = {row.name: row.version for row in db.execute(versions_query(*VERSION_TABLES))}
+        versions = tuple(found.get(name, 0) for name in VERSION_TABLES)
+        key = (country_id, grade, include_lessons, versions)
+        snapshot = self.cache.get(key)
+        if snapshot is not None:
+            return snapshot
+        snapshot = Snapshot(self.build(db, country_id, grade, include_lessons))
+        self.cache.put(key, snapshot)
+        with self._lock:
+            self.versions = versions
+            self.builds += 1
+        return snapshot
+
+    def build(self, db: Session, country_id: Optional[int] = None, grade: Optional[int] = None,
+              include_lessons: bool = False) -> Dict[str, Any]:
+        """One query per level (plus one for lessons), then assemble bottom-up"""
+        m = self.m
+        Country, SchoolYear, Term, Topic = m["Country"], m["SchoolYear"], m["Term"], m["Topic"]
+        CurriculumSubject, Subject, Concept, Lesson = m["CurriculumSubject"], m["Subject"], m["Concept"], m["Lesson"]
+
+        countries = select(Country.id, Country.name).order_by(Country.id)
+        years = select(SchoolYear.id, SchoolYear.country_id, SchoolYear.year_label).order_by(SchoolYear.id)
+        if country_id is not None:
+            countries = countries.where(Country.id == country_id)
+            years = years.where(SchoolYear.country_id == country_id)
+        terms = (
+            select(Term.id, Term.school_year_id, Term.term_number, Term.title)
+            .where(Term.school_year_id.in_(years.with_only_columns(SchoolYear.id).order_by(None)))
+            .order_by(Term.term_number, Term.id)
+        )
+        topics = (
+            select(Topic.id, Topic.term_id, Topic.title, CurriculumSubject.subject_id, Subject.name,
+                   CurriculumSubject.grade_level)
+            .outerjoin(CurriculumSubject, CurriculumSubject.id == Topic.curriculum_subject_id)
+            .outerjoin(Subject, Subject.id == CurriculumSubject.subject_id)
+            .where(Topic.term_id.in_(terms.with_only_columns(Term.id).order_by(None)))
+            .order_by(Topic.id)
+        )
+        if grade is not None:
+            topics = topics.where(CurriculumSubject.grade_level == grade)
+        concepts = (
+            select(Concept.id, Concept.topic_id, Concept.title)
+            .where(Concept.topic_id.in_(topics.with_only_columns(Topic.id).order_by(None)))
+            .order_by(Concept.id)
+        )
+        concept_ids = concepts.with_only_columns(Concept.id).order_by(None)
+        if include_lessons:
+            lessons = select(Lesson.id, Lesson.concept_id, Lesson.title).where(
+                Lesson.concept_id.in_(concept_ids)
+            ).order_by(Lesson.id)
+        else:
+            lessons = select(Lesson.concept_id, func.count()).where(
+                Lesson.concept_id.in_(concept_ids)
+            ).group_by(Lesson.concept_id)
+
+        lesson_nodes: Dict[int, List[dict]] = {}
+        lesson_counts: Dict[int, int] = {}
+        if include_lessons:
+            for lesson_id, concept, title in db.execute(lessons):
+                lesson_nodes.setdefault(concept, []).append({"id": lesson_id, "title": title})
+            lesson_counts = {concept: len(nodes) for concept, nodes in lesson_nodes.items()}
+        else:
+            lesson_counts = dict(db.execute(lessons).all())
+
+        def children(rows, parent_index, make) -> Dict[int, List[dict]]:
+            grouped: Dict[int, List[dict]] = {}
+            for row in rows:
+                grouped.setdefault(row[parent_index], []).append(make(row))
+            return grouped
+
+        def concept_node(row):
+            node = {"id": row.id, "title": row.title, "lesson_count": lesson_counts.get(row.id, 0)}
+            if include_lessons:
+                node["lessons"] = lesson_nodes.get(row.id, [])
+            return node
+
+        by_topic = children(db.execute(concepts), 1, concept_node)
+        by_term = children(db.execute(topics), 1, lambda row: self._node(
+            {"id": row.id, "title": row.title, "subject_id": row.subject_id, "subject": row.name,
+             "grade_level": row.grade_level},
+            "concepts", by_topic.get(row.id, []),
+        ))
+        by_year = children(db.execute(terms), 1, lambda row: self._node(
+            {"id": row.id, "term_number": row.term_number, "title": row.title},
+            "topics", by_term.get(row.id, []),
+        ))
+        by_country = children(db.execute(years), 1, lambda row: self._node(
+            {"id": row.id, "year_label": row.year_label},
+            "terms", self._prune(by_year.get(row.id, []), "topics", grade),
+        ))
+        nodes = self._prune([
+            self._node({"id": row.id, "name": row.name}, "school_years",
+                       self._prune(by_country.get(row.id, []), "terms", grade))
+            for row in db.execute(countries)
+        ], "school_years", grade)
+        return {
+            "country_id": country_id,
+            "grade": grade,
+            "lesson_count": sum(node["lesson_count"] for node in nodes),
+            "countries": nodes,
+        }
+
+    @staticmethod
+    def _node(fields: dict, child_key: str, child_nodes: List[dict]) -> dict:
+        fields["lesson_count"] = sum(child["lesson_count"] for child in child_nodes)
+        fields[child_key] = child_nodes
+        return fields
+
+    @staticmethod
+    def _prune(nodes: List[dict], child_key: str, grade: Optional[int]) -> List[dict]:
+        """With a grade filter, drop branches that ended up with no topics"""
+        if grade is None:
+            return nodes
+        return [node for node in nodes if node[child_key]]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"versions": dict(zip(VERSION_TABLES, self.versions)), "builds": self.builds, "cache": self.cache.stats()}
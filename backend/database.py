@@ -0,0 +1,319 @@
+# backend/database.py
+from fastapi import Request, Response
+from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from typing import Any, Dict, List, Optional
+import itertools
+import os
+import threading
+import time
+
+# ==================== CONFIGURATION ====================
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./islandquest.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "15000"))
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+DB_REPLICA_EJECT_SECONDS = float(os.getenv("DB_REPLICA_EJECT_SECONDS", "30"))
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+READ_PRIMARY_COOKIE = "read_primary_until"
+
+# Upper bounds (ms) of the checkout wait histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+
+class PoolStats:
+    """Checkout wait-time histogram and timeout counter for a connection pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.buckets = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    def observe(self, wait_ms: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            for i, bound in enumerate(WAIT_BUCKETS_MS):
+                if wait_ms <= bound:
+                    self.buckets[i] += 1
+                    break
+            else:
+                self.buckets[-1] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            labels = [f"le_{bound}ms" for bound in WAIT_BUCKETS_MS] + ["inf"]
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait_ms / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 3),
+                "wait_histogram": dict(zip(labels, self.buckets)),
+            }
+
+
+class InstrumentedPool:
+    """Pool mixin that records how long each checkout waited for a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.observe(0, timed_out=True)
+            raise
+        self.stats.observe((time.perf_counter() - started) * 1000)
+        return connection
+
+    def recreate(self):
+        # Keep the same stats object when the engine recreates its pool
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+class InstrumentedQueuePool(InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def _pool_settings() -> Dict[str, Any]:
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def create_db_engine(url: str = DATABASE_URL):
+    """Build an engine with the pool settings from the environment"""
+    if url.startswith("sqlite"):
+        return create_engine(url, connect_args={"check_same_thread": False})
+
+    connect_args = {}
+    if DB_STATEMENT_TIMEOUT_MS > 0 and url.startswith("postgresql"):
+        connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    return create_engine(url, poolclass=InstrumentedQueuePool, connect_args=connect_args, **_pool_settings())
+
+
+def async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto its async driver (asyncpg / aiosqlite)"""
+    scheme, sep, rest = url.partition("://")
+    if scheme in ("postgresql", "postgres") or scheme.startswith("postgresql+"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    if scheme.startswith("sqlite"):
+        return f"sqlite+aiosqlite{sep}{rest}"
+    return url
+
+
+def create_async_db_engine(url: str = DATABASE_URL):
+    """Async counterpart of create_db_engine, used by the read-heavy async handlers"""
+    url = async_url(url)
+    if url.startswith("sqlite"):
+        return create_async_engine(url)
+
+    connect_args = {}
+    if DB_STATEMENT_TIMEOUT_MS > 0 and url.startswith("postgresql"):
+        connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+    return create_async_engine(
+        url, poolclass=InstrumentedAsyncQueuePool, connect_args=connect_args, **_pool_settings()
+    )
+
+
+def pool_stats(engine=None) -> Dict[str, Any]:
+    """Live pool occupancy plus checkout wait statistics (sync or async engine)"""
+    engine = engine or globals()["engine"]
+    pool = getattr(engine, "sync_engine", engine).pool
+    stats = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": pool._max_overflow,
+            "timeout_seconds": pool.timeout(),
+        })
+        stats["saturated"] = stats["checked_out"] >= stats["size"] + stats["max_overflow"]
+    if isinstance(pool, InstrumentedPool):
+        stats.update(pool.stats.snapshot())
+    return stats
+
+
+# Single engine shared by main.py and dependencies.py
+engine = create_db_engine()
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# Async engine for the read-heavy handlers; writes stay on the sync path above
+async_engine = create_async_db_engine()
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# ==================== READ REPLICAS ====================
+
+class Replica:
+    """Sync and async engines for one read replica, plus its health state"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.engine = create_db_engine(url)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.async_engine = create_async_db_engine(url)
+        self.AsyncSessionLocal = async_sessionmaker(self.async_engine, class_=AsyncSession, expire_on_commit=False)
+        self.ejected_until = 0.0
+        self.reads = 0
+        self.failures = 0
+
+
+class ReplicaRouter:
+    """Round-robin over healthy replicas; a replica that fails to connect sits out DB_REPLICA_EJECT_SECONDS"""
+
+    def __init__(self, replicas: List[Replica], eject_seconds: float):
+        self.replicas = replicas
+        self.eject_seconds = eject_seconds
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self.primary_fallbacks = 0
+        self.pinned_reads = 0
+
+    def next(self) -> Optional[Replica]:
+        now = time.monotonic()
+        healthy = [r for r in self.replicas if r.ejected_until <= now]
+        if not healthy:
+            if self.replicas:
+                with self._lock:
+                    self.primary_fallbacks += 1
+            return None
+        replica = healthy[next(self._counter) % len(healthy)]
+        with self._lock:
+            replica.reads += 1
+        return replica
+
+    def eject(self, replica: Replica):
+        with self._lock:
+            replica.failures += 1
+            replica.ejected_until = time.monotonic() + self.eject_seconds
+            self.primary_fallbacks += 1
+
+    def note_pinned(self):
+        with self._lock:
+            self.pinned_reads += 1
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "replicas": [
+                {
+                    "url": r.engine.url.render_as_string(hide_password=True),
+                    "healthy": r.ejected_until <= now,
+                    "reads": r.reads,
+                    "failures": r.failures,
+                }
+                for r in self.replicas
+            ],
+            "primary_fallbacks": self.primary_fallbacks,
+            "pinned_reads": self.pinned_reads,
+        }
+
+
+replica_router = ReplicaRouter([Replica(url) for url in DATABASE_REPLICA_URLS], DB_REPLICA_EJECT_SECONDS)
+
+
+def mark_recent_write(response: Response):
+    """Pin this client's reads to the primary for READ_YOUR_WRITES_SECONDS after a successful write"""
+    if replica_router.replicas:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            str(int(time.time()) + READ_YOUR_WRITES_SECONDS),
+            max_age=READ_YOUR_WRITES_SECONDS,
+            httponly=True,
+            samesite="lax",
+        )
+
+
+def _choose_replica(request: Request) -> Optional[Replica]:
+    if not replica_router.replicas:
+        return None
+    try:
+        pinned = float(request.cookies.get(READ_PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        pinned = False
+    if pinned:
+        replica_router.note_pinned()
+        return None
+    return replica_router.next()
+
+
+def get_read_db(request: Request):
+    """Session for read-only handlers: a healthy replica unless this client wrote recently"""
+    replica = _choose_replica(request)
+    db = None
+    if replica is not None:
+        db = replica.SessionLocal()
+        try:
+            db.connection()
+        except DBAPIError:
+            db.close()
+            replica_router.eject(replica)
+            db = None
+    if db is None:
+        db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    """Async counterpart of get_read_db"""
+    replica = _choose_replica(request)
+    db = None
+    if replica is not None:
+        db = replica.AsyncSessionLocal()
+        try:
+            await db.connection()
+        except (DBAPIError, OSError):
+            await db.close()
+            replica_router.eject(replica)
+            db = None
+    if db is None:
+        db = AsyncSessionLocal()
+    async with db:
+        yield db
@@ -9,22 +9,15 @@ from typing import Optional
 import os
 
 from models import User, Base
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from database import get_db
+from principal_cache import load_principal
+from hash_calibration import load_params, apply_params
+from tokens import verify_access_token
 
 # Configuration
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./islandquest.db")
 SECRET_KEY = os.getenv("SECRET_KEY", "your_super_secret_key_here_change_this_in_production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 
-# Database setup
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(DATABASE_URL)
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
 # Password hashing
 pwd_context = CryptContext(
     schemes=["bcrypt"],
@@ -32,17 +25,14 @@ pwd_context = CryptContext(
     deprecated="auto"
 )
 
+# Use the bcrypt cost persisted by hash_calibration.py, if any
+hash_params = load_params()
+if hash_params:
+    apply_params(pwd_context, hash_params)
+
 # OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-# Database dependency
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # Password utilities
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password"""
@@ -73,14 +63,14 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = verify_access_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
+    user = load_principal(db, User, username)
     if user is None:
         raise credentials_exception
     return user
@@ -0,0 +1,65 @@
+# backend/fieldsets.py
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from lean_read import compile_row_encoder
+from multivalue import split_values
+
+
+class Fieldset:
+    """Sparse fieldsets for a list endpoint: ?fields=a,b or a named ?view=.
+
+    The chosen fields decide which columns the query loads (load_only), so big
+    columns are only read when a response actually carries them; responses
+    are dumped with just those keys (use response_model_exclude_unset=True).
+    select()/encoder() are the lean path: row tuples encoded straight to JSON.
+    """
+
+    def __init__(self, model, views: Dict[str, Sequence[str]], extra: Sequence[str] = (), always: Sequence[str] = ("id",),
+                 convert: Optional[Dict[str, Callable[[Any], Any]]] = None):
+        self.model = model
+        # field -> function applied to the column value on the lean path
+        self.convert = convert or {}
+        self.views = {name: tuple(fields) for name, fields in views.items()}
+        self.always = tuple(always)
+        # extra: fields no view includes, available by name only
+        self.allowed = tuple(dict.fromkeys((*(f for fields in self.views.values() for f in fields), *extra)))
+
+    def resolve(self, fields: Optional[Iterable[str]], view: str) -> Tuple[str, ...]:
+        """Requested fields (?fields=a&fields=b or a,b) win over the view; id is always included"""
+        requested = split_values(fields)
+        if not requested:
+            if view not in self.views:
+                raise HTTPException(status_code=400, detail=f"Unknown view '{view}', use one of: {', '.join(self.views)}")
+            return self.views[view]
+        unknown = [field for field in requested if field not in self.allowed]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(self.allowed)}",
+            )
+        # Declared order, whatever order they were asked in: one field list (and one compiled
+        # encoder, see lean_read.py) per subset rather than per permutation
+        wanted = set(requested)
+        return tuple(dict.fromkeys((*self.always, *(field for field in self.allowed if field in wanted))))
+
+    def load(self, fields: Sequence[str], *extra: str):
+        """load_only() option for the columns behind fields (plus any the endpoint needs itself)"""
+        return load_only(*(getattr(self.model, name) for name in dict.fromkeys((*fields, *extra))))
+
+    def select(self, fields: Sequence[str]):
+        """Core-style select of just the columns behind fields; rows are plain tuples, nothing is hydrated"""
+        return select(*(getattr(self.model, name) for name in fields))
+
+    def encoder(self, fields: Sequence[str]) -> Callable:
+        """Compiled row -> dict function for rows of select(fields)"""
+        return compile_row_encoder(fields, self.convert)
+
+    @staticmethod
+    def dump(obj: Any, fields: Sequence[str]) -> Dict[str, Any]:
+        return {name: getattr(obj, name) for name in fields}
+
+    def dump_all(self, rows: Iterable[Any], fields: Sequence[str]) -> List[Dict[str, Any]]:
+        return [self.dump(row, fields) for row in rows]
@@ -0,0 +1,130 @@
+# backend/hash_calibration.py
+"""Benchmark the password KDFs on this machine and persist the chosen cost.
+
+Usage: python hash_calibration.py [--target-ms 150] [--force]
+"""
+from passlib.context import CryptContext
+from passlib.hash import argon2, bcrypt
+from pathlib import Path
+from typing import Any, Dict, Optional
+from datetime import datetime
+import argparse
+import json
+import math
+import os
+import statistics
+import time
+
+# ==================== CONFIGURATION ====================
+HASH_TARGET_MS = float(os.getenv("HASH_TARGET_MS", "150"))
+HASH_ARGON2_MEMORY_KIB = int(os.getenv("HASH_ARGON2_MEMORY_KIB", "65536"))
+HASH_PARAMS_FILE = Path(os.getenv("HASH_PARAMS_FILE", str(Path(__file__).resolve().parent / "hash_params.json")))
+HASH_CALIBRATE_ON_STARTUP = os.getenv("HASH_CALIBRATE_ON_STARTUP", "true").lower() == "true"
+
+# Floors we never calibrate below, whatever the CPU budget (OWASP argon2id minimum, bcrypt cost 10)
+MIN_ARGON2_MEMORY_KIB = 19456
+MIN_BCRYPT_ROUNDS = 10
+MAX_BCRYPT_ROUNDS = 15
+
+_PROBE_SECRET = "calibration-probe-secret"
+
+
+def _median_ms(handler, samples: int = 3) -> float:
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        handler.hash(_PROBE_SECRET)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate_argon2(target_ms: float) -> Dict[str, int]:
+    """Pick argon2id memory/time cost so one single-lane hash takes about target_ms"""
+    memory_cost = HASH_ARGON2_MEMORY_KIB
+    # Shrink memory until a single pass fits the budget, then add passes up to it
+    single_pass_ms = _median_ms(argon2.using(memory_cost=memory_cost, time_cost=1, parallelism=1))
+    while single_pass_ms > target_ms and memory_cost > MIN_ARGON2_MEMORY_KIB:
+        memory_cost = max(MIN_ARGON2_MEMORY_KIB, memory_cost // 2)
+        single_pass_ms = _median_ms(argon2.using(memory_cost=memory_cost, time_cost=1, parallelism=1))
+
+    time_cost = max(1, int(target_ms // max(single_pass_ms, 0.001)))
+    while time_cost > 1:
+        measured = _median_ms(argon2.using(memory_cost=memory_cost, time_cost=time_cost, parallelism=1))
+        if measured <= target_ms * 1.25:
+            break
+        time_cost -= 1
+
+    return {"memory_cost": memory_cost, "time_cost": time_cost, "parallelism": 1}
+
+
+def calibrate_bcrypt(target_ms: float) -> Dict[str, int]:
+    """Pick the bcrypt cost factor closest to target_ms (each round doubles the work)"""
+    base_ms = _median_ms(bcrypt.using(rounds=MIN_BCRYPT_ROUNDS))
+    extra = int(round(math.log2(max(target_ms, 1) / max(base_ms, 0.001)))) if base_ms > 0 else 0
+    rounds = min(MAX_BCRYPT_ROUNDS, max(MIN_BCRYPT_ROUNDS, MIN_BCRYPT_ROUNDS + extra))
+    return {"rounds": rounds}
+
+
+def calibrate(target_ms: float = HASH_TARGET_MS) -> Dict[str, Any]:
+    return {
+        "target_ms": target_ms,
+        "cpu_count": os.cpu_count(),
+        "calibrated_at": datetime.utcnow().isoformat(),
+        "argon2": calibrate_argon2(target_ms),
+        "bcrypt": calibrate_bcrypt(target_ms),
+    }
+
+
+def save_params(params: Dict[str, Any], path: Path = HASH_PARAMS_FILE) -> None:
+    path.write_text(json.dumps(params, indent=2))
+
+
+def load_params(path: Path = HASH_PARAMS_FILE) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def apply_params(context: CryptContext, params: Dict[str, Any]) -> None:
+    """Make the context hash with the calibrated cost; hashes with other costs will report needs_update"""
+    settings = {}
+    schemes = context.schemes()
+    if "argon2" in schemes and params.get("argon2"):
+        settings.update({f"argon2__{key}": value for key, value in params["argon2"].items()})
+    if "bcrypt" in schemes and params.get("bcrypt"):
+        settings["bcrypt__rounds"] = params["bcrypt"]["rounds"]
+    if settings:
+        context.update(**settings)
+
+
+def load_or_calibrate(target_ms: float = HASH_TARGET_MS) -> Optional[Dict[str, Any]]:
+    """Return persisted params, recalibrating when the target or core count changed"""
+    params = load_params()
+    if params and params.get("target_ms") == target_ms and params.get("cpu_count") == os.cpu_count():
+        return params
+    if not HASH_CALIBRATE_ON_STARTUP:
+        return params
+    params = calibrate(target_ms)
+    try:
+        save_params(params)
+    except OSError as e:
+        print(f" Could not persist hash parameters: {e}")
+    return params
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrate password hashing cost for this machine")
+    parser.add_argument("--target-ms", type=float, default=HASH_TARGET_MS)
+    parser.add_argument("--force", action="store_true", help="recalibrate even if parameters are persisted")
+    args = parser.parse_args()
+
+    existing = load_params()
+    if existing and not args.force and existing.get("target_ms") == args.target_ms:
+        print(f"Using persisted parameters from {HASH_PARAMS_FILE} (pass --force to recalibrate)")
+        result = existing
+    else:
+        result = calibrate(args.target_ms)
+        save_params(result)
+        print(f"Saved parameters to {HASH_PARAMS_FILE}")
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,197 @@
+# backend/hashing.py
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from typing import Any, Dict, List
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+
+# ==================== CONFIGURATION ====================
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", str(os.cpu_count() or 1)))
+HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", str(max(HASH_POOL_WORKERS, 1) * 8)))
+HASH_RETRY_AFTER_SECONDS = int(os.getenv("HASH_RETRY_AFTER_SECONDS", "2"))
+
+# ==================== WORKER FUNCTIONS ====================
+# These run inside the pool processes. Contexts are shipped as their config
+# string and rebuilt once per worker.
+
+_worker_contexts: Dict[str, CryptContext] = {}
+
+def _context_from_config(config: str) -> CryptContext:
+    context = _worker_contexts.get(config)
+    if context is None:
+        context = _worker_contexts[config] = CryptContext.from_string(config)
+    return context
+
+def _hash_in_worker(config: str, password: str) -> str:
+    return _context_from_config(config).hash(password)
+
+def _verify_in_worker(config: str, password: str, hashed_password: str) -> bool:
+    return _context_from_config(config).verify(password, hashed_password)
+
+def _hash_many_in_worker(config: str, passwords: List[str]) -> List[str]:
+    context = _context_from_config(config)
+    return [context.hash(password) for password in passwords]
+
+# ==================== EXECUTOR ====================
+
+class HashingExecutor:
+    """Bounded process pool for password KDF work, shared by the auth endpoints"""
+
+    def __init__(self, max_workers: int, max_pending: int, retry_after: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._latencies = deque(maxlen=2048)
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.bulk_hashed = 0
+        self._bulk_in_flight = 0
+
+    def _get_pool(self):
+        if self._pool is None and self.max_workers > 0:
+            with self._lock:
+                if self._pool is None:
+                    # spawn rather than fork: the server process already runs threads
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._pool
+
+    def _acquire_slot(self):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Authentication service is busy, please retry shortly",
+                    headers={"Retry-After": str(self.retry_after)},
+                )
+            self._pending += 1
+
+    def _release_slot(self, started: float, ok: bool):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._pending -= 1
+            self._latencies.append(elapsed_ms)
+            if ok:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    async def _submit(self, fn, *args):
+        self._acquire_slot()
+        started = time.perf_counter()
+        ok = False
+        try:
+            # With HASH_POOL_WORKERS=0 the default thread executor is used (dev/sqlite setups)
+            result = await asyncio.get_running_loop().run_in_executor(self._get_pool(), fn, *args)
+            ok = True
+            return result
+        finally:
+            self._release_slot(started, ok)
+
+    async def hash(self, context: CryptContext, password: str) -> str:
+        return await self._submit(_hash_in_worker, context.to_string(), password)
+
+    async def verify(self, context: CryptContext, password: str, hashed_password: str) -> bool:
+        return await self._submit(_verify_in_worker, context.to_string(), password, hashed_password)
+
+    @property
+    def bulk_window(self) -> int:
+        """Chunks a bulk batch may have in flight: one worker (and queue room) stays free for interactive auth"""
+        return max(1, min(self.max_workers - 1, self.max_pending - 1))
+
+    def _bulk_slot(self, delta: int):
+        # Bulk chunks count as pending like interactive calls, so 503s and stats see them,
+        # but they never get rejected: the window already bounds them
+        with self._lock:
+            self._pending += delta
+            self._bulk_in_flight += delta
+
+    def hash_many(self, context: CryptContext, passwords: List[str]) -> List[str]:
+        """Hash a batch of passwords on the pool (bulk imports), at most bulk_window chunks at a time;
+        blocks the calling thread"""
+        if not passwords:
+            return []
+        config = context.to_string()
+        window = self.bulk_window
+        # Several chunks per worker so a slow chunk doesn't leave other cores idle
+        chunk_size = max(1, min(64, -(-len(passwords) // (window * 4))))
+        chunks = [passwords[i:i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+        pool = self._get_pool()
+        results: List[List[str]] = []
+        if pool is None:
+            for chunk in chunks:
+                self._bulk_slot(1)
+                try:
+                    results.append(_hash_many_in_worker(config, chunk))
+                finally:
+                    self._bulk_slot(-1)
+        else:
+            in_flight = deque()
+            try:
+                for chunk in chunks:
+                    if len(in_flight) >= window:
+                        results.append(in_flight[0].result())
+                        in_flight.popleft()
+                        self._bulk_slot(-1)
+                    self._bulk_slot(1)
+                    in_flight.append(pool.submit(_hash_many_in_worker, config, chunk))
+                while in_flight:
+                    results.append(in_flight[0].result())
+                    in_flight.popleft()
+                    self._bulk_slot(-1)
+            finally:
+                # On failure, leave the remaining chunks to finish on their own but stop counting them
+                for future in in_flight:
+                    future.cancel()
+                self._bulk_slot(-len(in_flight))
+        hashes = [hashed for chunk in results for hashed in chunk]
+        with self._lock:
+            self.bulk_hashed += len(hashes)
+        return hashes
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            pending = self._pending
+            completed, failed, rejected = self.completed, self.failed, self.rejected
+            bulk_hashed, bulk_in_flight = self.bulk_hashed, self._bulk_in_flight
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))], 2)
+
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "pending": pending,
+            "queue_depth": max(0, pending - max(self.max_workers, 1)),
+            "completed": completed,
+            "failed": failed,
+            "rejected": rejected,
+            "bulk_hashed": bulk_hashed,
+            "bulk_in_flight": bulk_in_flight,
+            "bulk_window": self.bulk_window,
+            "latency_ms": {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99)},
+        }
+
+
+hashing_pool = HashingExecutor(HASH_POOL_WORKERS, HASH_QUEUE_SIZE, HASH_RETRY_AFTER_SECONDS)
@@ -0,0 +1,233 @@
+# backend/leaderboard_index.py
+"""In-process ranked index of lifetime points for leaderboards and "my rank" lookups.
+
+Each board is an order-statistic list of (-points, user_id) keys: sorted
+sublists with a Fenwick tree over their lengths, so rank and k-th lookups are
+O(log n) and updates touch a single sublist. There is one global board plus
+one per scope value (role, and school/island when users carry those ids).
+
+The index is rebuilt from the database at startup and on demand, and updated
+whenever a user's points change in this process.
+"""
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import threading
+
+# User attributes that define scoped boards; users without the attribute are only on the global board
+SCOPE_ATTRIBUTES = ("role", "school_id", "island_id")
+GLOBAL_SCOPE = ("all", None)
+
+Key = Tuple[int, int]
+Scope = Tuple[str, Any]
+
+
+class RankedList:
+    """Sorted keys with O(log n) index_of / at lookups"""
+
+    LOAD = 512
+
+    def __init__(self, keys: Iterable[Key] = (), presorted: bool = False):
+        keys = list(keys) if presorted else sorted(keys)
+        self._lists: List[List[Key]] = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._rebuild_index()
+
+    def _rebuild_index(self):
+        self._maxes = [sub[-1] for sub in self._lists]
+        self._tree = [0] * (len(self._lists) + 1)
+        for i, sub in enumerate(self._lists):
+            self._tree_add(i, len(sub))
+
+    def _tree_add(self, pos: int, delta: int):
+        pos += 1
+        while pos < len(self._tree):
+            self._tree[pos] += delta
+            pos += pos & -pos
+
+    def _prefix(self, pos: int) -> int:
+        """Number of keys in the first pos sublists"""
+        total = 0
+        while pos > 0:
+            total += self._tree[pos]
+            pos -= pos & -pos
+        return total
+
+    def __len__(self) -> int:
+        return self._prefix(len(self._lists))
+
+    def add(self, key: Key):
+        if not self._lists:
+            self._lists.append([key])
+            self._rebuild_index()
+            return
+        pos = min(bisect_left(self._maxes, key), len(self._lists) - 1)
+        sub = self._lists[pos]
+        insort(sub, key)
+        self._maxes[pos] = sub[-1]
+        if len(sub) > 2 * self.LOAD:
+            self._lists[pos:pos + 1] = [sub[:self.LOAD], sub[self.LOAD:]]
+            self._rebuild_index()
+        else:
+            self._tree_add(pos, 1)
+
+    def remove(self, key: Key):
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._lists):
+            return
+        sub = self._lists[pos]
+        i = bisect_left(sub, key)
+        if i == len(sub) or sub[i] != key:
+            return
+        del sub[i]
+        if not sub:
+            del self._lists[pos]
+            self._rebuild_index()
+        else:
+            self._maxes[pos] = sub[-1]
+            self._tree_add(pos, -1)
+
+    def index_of(self, key: Key) -> Optional[int]:
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._lists):
+            return None
+        sub = self._lists[pos]
+        i = bisect_left(sub, key)
+        if i == len(sub) or sub[i] != key:
+            return None
+        return self._prefix(pos) + i
+
+    def _locate(self, index: int) -> Tuple[int, int]:
+        """(sublist, offset) of the index-th key, by descending the Fenwick tree"""
+        pos, remaining = 0, index
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < len(self._tree) and self._tree[nxt] <= remaining:
+                pos = nxt
+                remaining -= self._tree[nxt]
+            step >>= 1
+        return pos, remaining
+
+    def slice(self, start: int, stop: int) -> List[Key]:
+        start, stop = max(start, 0), min(stop, len(self))
+        if start >= stop:
+            return []
+        pos, offset = self._locate(start)
+        result: List[Key] = []
+        while len(result) < stop - start and pos < len(self._lists):
+            result.extend(self._lists[pos][offset:offset + (stop - start - len(result))])
+            pos, offset = pos + 1, 0
+        return result
+
+
+class LeaderboardIndex:
+    """Global and scoped boards of lifetime points, safe to use from the threadpool"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries: Dict[int, Tuple[int, Tuple[Scope, ...]]] = {}
+        self._boards: Dict[Scope, RankedList] = {GLOBAL_SCOPE: RankedList()}
+        self.ready = False
+        self.rebuilds = 0
+        self.updates = 0
+
+    @staticmethod
+    def scopes_of(user) -> Tuple[Scope, ...]:
+        return tuple(
+            (attr, getattr(user, attr)) for attr in SCOPE_ATTRIBUTES if getattr(user, attr, None) is not None
+        )
+
+    def rebuild(self, rows: Iterable[tuple], attributes: Iterable[str] = ()):
+        """Replace the index from (id, points, *scope values) rows, scope values in the order of attributes"""
+        attributes = tuple(attributes)
+        entries: Dict[int, Tuple[int, Tuple[Scope, ...]]] = {}
+        scope_sets: Dict[tuple, Tuple[Scope, ...]] = {}
+        for user_id, points, *values in rows:
+            values = tuple(values)
+            scopes = scope_sets.get(values)
+            if scopes is None:
+                scopes = scope_sets[values] = tuple(
+                    (attr, value) for attr, value in zip(attributes, values) if value is not None
+                )
+            entries[user_id] = (points or 0, scopes)
+        # Sort once, then split per scope keeping the order
+        ordered = sorted((-points, user_id) for user_id, (points, _) in entries.items())
+        keys: Dict[Scope, List[Key]] = {GLOBAL_SCOPE: ordered}
+        for key in ordered:
+            for scope in entries[key[1]][1]:
+                keys.setdefault(scope, []).append(key)
+        boards = {scope: RankedList(scope_keys, presorted=True) for scope, scope_keys in keys.items()}
+        with self._lock:
+            self._entries, self._boards = entries, boards
+            self.ready = True
+            self.rebuilds += 1
+
+    def update(self, user_id: int, points: int, scopes: Tuple[Scope, ...] = ()):
+        """Insert or move a user after their points (or scopes) changed"""
+        with self._lock:
+            self._discard(user_id)
+            self._entries[user_id] = (points, scopes)
+            for scope in (GLOBAL_SCOPE,) + scopes:
+                self._boards.setdefault(scope, RankedList()).add((-points, user_id))
+            self.updates += 1
+
+    def update_user(self, user, points: Optional[int] = None):
+        self.update(user.id, (user.points or 0) if points is None else points, self.scopes_of(user))
+
+    def remove(self, user_id: int):
+        with self._lock:
+            self._discard(user_id)
+
+    def _discard(self, user_id: int):
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return
+        points, scopes = entry
+        for scope in (GLOBAL_SCOPE,) + scopes:
+            board = self._boards.get(scope)
+            if board is not None:
+                board.remove((-points, user_id))
+
+    def _rows(self, keys: List[Key], first_rank: int) -> List[Dict[str, int]]:
+        return [{"rank": first_rank + i, "user_id": user_id, "points": -neg} for i, (neg, user_id) in enumerate(keys)]
+
+    def top(self, k: int, scope: Scope = GLOBAL_SCOPE) -> List[Dict[str, int]]:
+        with self._lock:
+            board = self._boards.get(scope)
+            return self._rows(board.slice(0, k), 1) if board else []
+
+    def rank_of(self, user_id: int, scope: Scope = GLOBAL_SCOPE) -> Optional[int]:
+        """1-based rank, or None if the user is not on that board"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            board = self._boards.get(scope)
+            if entry is None or board is None:
+                return None
+            index = board.index_of((-entry[0], user_id))
+            return None if index is None else index + 1
+
+    def around(self, user_id: int, radius: int = 5, scope: Scope = GLOBAL_SCOPE) -> List[Dict[str, int]]:
+        """The user's row with up to radius neighbours on each side"""
+        with self._lock:
+            rank = self.rank_of(user_id, scope)
+            if rank is None:
+                return []
+            start = max(rank - 1 - radius, 0)
+            return self._rows(self._boards[scope].slice(start, rank + radius), start + 1)
+
+    def size(self, scope: Scope = GLOBAL_SCOPE) -> int:
+        with self._lock:
+            board = self._boards.get(scope)
+            return len(board) if board else 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "users": len(self._entries),
+                "boards": len(self._boards),
+                "rebuilds": self.rebuilds,
+                "updates": self.updates,
+            }
+
+
+leaderboard_index = LeaderboardIndex()
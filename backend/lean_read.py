@@ -0,0 +1,53 @@
+# backend/lean_read.py
+"""Lean list reads: Core rows straight to JSON bytes.
+
+An ORM list handler copies every row three times: ORM hydration, a dict per
+object, then Pydantic validation of the response_model. Here the handler
+selects plain row tuples, a row -> dict function compiled once per field list
+turns each tuple into a dict literal, and orjson encodes the whole page in one
+call. The route's response_model then only documents the shape (OpenAPI).
+"""
+from fastapi import Response
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+import os
+
+import orjson
+
+from ttl_cache import TTLCache
+
+# ==================== CONFIGURATION ====================
+# Compiled encoders kept (one per distinct field list); callers pass fields in a canonical order
+LEAN_ENCODER_CACHE_SIZE = int(os.getenv("LEAN_ENCODER_CACHE_SIZE", "256"))
+
+_compiled = TTLCache(ttl_seconds=24 * 3600, max_entries=LEAN_ENCODER_CACHE_SIZE)
+
+
+def compile_row_encoder(fields: Sequence[str], convert: Optional[Dict[str, Callable[[Any], Any]]] = None) -> Callable:
+    """row tuple (in fields order) -> dict, generated as a single dict literal; convert maps field -> function"""
+    convert = {name: fn for name, fn in (convert or {}).items() if name in fields}
+    key = (tuple(fields), tuple(sorted((name, id(fn)) for name, fn in convert.items())))
+    encoder = _compiled.get(key)
+    if encoder is None:
+        names = {f"_convert_{i}": convert[name] for i, name in enumerate(fields) if name in convert}
+        items = ", ".join(
+            f"{name!r}: _convert_{i}(row[{i}])" if name in convert else f"{name!r}: row[{i}]"
+            for i, name in enumerate(fields)
+        )
+        namespace = dict(names)
+        exec(f"def encode_row(row):\n    return {{{items}}}\n", namespace)
+        encoder = namespace["encode_row"]
+        _compiled.put(key, encoder)
+    return encoder
+
+
+def encode_rows(encode_row: Callable, rows: Iterable[Any]) -> bytes:
+    return orjson.dumps(list(map(encode_row, rows)), option=orjson.OPT_NON_STR_KEYS)
+
+
+def json_rows(encode_row: Callable, rows: Iterable[Any], response: Optional[Response] = None) -> Response:
+    """A ready JSON response for rows, keeping headers set on the handler's Response parameter (e.g. the next cursor)"""
+    return Response(
+        content=encode_rows(encode_row, rows),
+        media_type="application/json",
+        headers=dict(response.headers) if response is not None else None,
+    )
@@ -0,0 +1,129 @@
+# backend/lesson_path.py
+"""Materialized curriculum path on lessons (subject_id, grade_level, term_id).
+
+A lesson's subject, grade and term are reached through
+concept -> topic -> curriculum_subject. They are copied onto the lesson so
+/lessons can filter on them with plain composite indexes instead of a
+four-way join. The copy is set when a lesson is written and refreshed
+set-based whenever a concept, topic or curriculum subject above it moves.
+
+Usage: python lesson_path.py rebuild   (recompute every lesson's path)
+"""
+from sqlalchemy import event, inspect, select, text, update
+from sqlalchemy.orm.attributes import get_history
+import argparse
+
+PATH_COLUMNS = ("subject_id", "grade_level", "term_id")
+PATH_INDEXES = {
+    "idx_lessons_subject": ("subject_id", "id"),
+    "idx_lessons_subject_grade": ("subject_id", "grade_level", "id"),
+    "idx_lessons_grade_level": ("grade_level", "id"),
+    "idx_lessons_term": ("term_id", "id"),
+}
+
+_models = {}
+
+
+def _changed(target, *attrs) -> bool:
+    return any(get_history(target, attr).has_changes() for attr in attrs)
+
+
+def _path_select():
+    Concept, Topic, CurriculumSubject = _models["Concept"], _models["Topic"], _models["CurriculumSubject"]
+    return (
+        select(CurriculumSubject.subject_id, CurriculumSubject.grade_level, Topic.term_id)
+        .select_from(Concept)
+        .join(Topic, Topic.id == Concept.topic_id)
+        .outerjoin(CurriculumSubject, CurriculumSubject.id == Topic.curriculum_subject_id)
+    )
+
+
+def refresh_paths(connection, concept_ids=None) -> int:
+    """Recompute the path of lessons under concept_ids (a list or a select of ids), or of every lesson"""
+    Lesson, Concept, Topic, CurriculumSubject = (
+        _models["Lesson"], _models["Concept"], _models["Topic"], _models["CurriculumSubject"]
+    )
+    lessons = Lesson.__table__
+    path = _path_select().where(Concept.id == lessons.c.concept_id)
+    stmt = update(lessons).values(
+        subject_id=path.with_only_columns(CurriculumSubject.subject_id).scalar_subquery(),
+        grade_level=path.with_only_columns(CurriculumSubject.grade_level).scalar_subquery(),
+        term_id=path.with_only_columns(Topic.term_id).scalar_subquery(),
+    )
+    if concept_ids is not None:
+        stmt = stmt.where(lessons.c.concept_id.in_(concept_ids))
+    return connection.execute(stmt).rowcount
+
+
+def _set_lesson_path(mapper, connection, target):
+    if target.concept_id is None:
+        values = (None, None, None)
+    elif get_history(target, "concept_id").has_changes() or not inspect(target).has_identity:
+        row = connection.execute(_path_select().where(_models["Concept"].id == target.concept_id)).first()
+        values = tuple(row) if row else (None, None, None)
+    else:
+        return
+    for column, value in zip(PATH_COLUMNS, values):
+        setattr(target, column, value)
+
+
+def _concept_moved(mapper, connection, target):
+    if _changed(target, "topic_id") or inspect(target).deleted:
+        refresh_paths(connection, [target.id])
+
+
+def _topic_moved(mapper, connection, target):
+    if _changed(target, "curriculum_subject_id", "term_id") or inspect(target).deleted:
+        Concept = _models["Concept"]
+        refresh_paths(connection, select(Concept.id).where(Concept.topic_id == target.id))
+
+
+def _curriculum_subject_changed(mapper, connection, target):
+    if _changed(target, "subject_id", "grade_level") or inspect(target).deleted:
+        Concept, Topic = _models["Concept"], _models["Topic"]
+        refresh_paths(connection, select(Concept.id).join(Topic, Topic.id == Concept.topic_id).where(
+            Topic.curriculum_subject_id == target.id
+        ))
+
+
+def track_lesson_path(lesson_model, concept_model, topic_model, curriculum_subject_model):
+    """Keep lesson_model's path columns in sync with the curriculum models"""
+    _models.update(
+        Lesson=lesson_model, Concept=concept_model, Topic=topic_model, CurriculumSubject=curriculum_subject_model
+    )
+    event.listen(lesson_model, "before_insert", _set_lesson_path)
+    event.listen(lesson_model, "before_update", _set_lesson_path)
+    for model, handler in (
+        (concept_model, _concept_moved),
+        (topic_model, _topic_moved),
+        (curriculum_subject_model, _curriculum_subject_changed),
+    ):
+        event.listen(model, "after_update", handler)
+        event.listen(model, "after_delete", handler)
+
+
+def migrate(bind):
+    """Add the path columns and indexes to an existing lessons table and backfill them. Idempotent."""
+    existing = {column["name"] for column in inspect(bind).get_columns("lessons")}
+    missing = [column for column in PATH_COLUMNS if column not in existing]
+    with bind.begin() as conn:
+        for column in missing:
+            conn.execute(text(f"ALTER TABLE lessons ADD COLUMN {column} INTEGER"))
+        for name, columns in PATH_INDEXES.items():
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON lessons ({', '.join(columns)})"))
+        if missing:
+            updated = refresh_paths(conn)
+            print(f" Lesson curriculum paths added ({updated} lessons backfilled)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the materialized lesson curriculum path")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    from main import engine  # registers the tracked models
+    from table_versions import bump
+
+    with engine.begin() as conn:
+        print(f" Recomputed the path of {refresh_paths(conn)} lessons")
+        bump(conn, "lessons")
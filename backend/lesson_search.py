@@ -0,0 +1,179 @@
+# backend/lesson_search.py
+"""Full-text lesson search over title, tags, description, objectives and the
+text of content_html, ranked best-first.
+
+Postgres keeps a weighted tsvector per lesson in `lesson_search` (GIN index,
+ranked with ts_rank); SQLite keeps an FTS5 table of the same name (ranked with
+bm25). Either way the index is updated from Lesson mapper events in the
+writing transaction, and can be rebuilt from scratch.
+
+Usage: python lesson_search.py rebuild
+"""
+from sqlalchemy import Float, Integer, event, inspect, select, text
+from sqlalchemy.orm.attributes import get_history
+from typing import List, Optional
+import argparse
+import html
+import os
+import re
+
+from multivalue import to_list
+
+# ==================== CONFIGURATION ====================
+# Postgres text search configuration (stemming/stop words)
+SEARCH_TEXT_CONFIG = os.getenv("SEARCH_TEXT_CONFIG", "english")
+
+# Searchable fields in weight order: (lesson attribute, tsvector weight, bm25 weight)
+FIELDS = (
+    ("title", "A", 10.0),
+    ("tags", "B", 5.0),
+    ("description", "B", 5.0),
+    ("objectives", "C", 2.0),
+    ("content_html", "D", 1.0),
+)
+FIELD_NAMES = tuple(name for name, _, _ in FIELDS)
+
+_TAGS = re.compile(r"<(script|style)\b.*?</\1\s*>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+_WORDS = re.compile(r"\w+", re.UNICODE)
+
+_lesson_model = None
+
+
+def strip_html(markup: Optional[str]) -> str:
+    return " ".join(html.unescape(_TAGS.sub(" ", markup or "")).split())
+
+
+def _is_postgres(bind) -> bool:
+    return bind.dialect.name == "postgresql"
+
+
+def _pg_document_sql() -> str:
+    """tsvector expression over a lessons row; HTML is stripped in SQL so rebuilds stay set-based"""
+    parts = []
+    for name, weight, _ in FIELDS:
+        if name == "tags":
+            value = "array_to_string(tags, ' ')"
+        elif name == "content_html":
+            value = r"regexp_replace(content_html, '<[^>]+>', ' ', 'g')"
+        else:
+            value = name
+        parts.append(f"setweight(to_tsvector(CAST(:config AS regconfig), coalesce({value}, '')), '{weight}')")
+    return " || ".join(parts)
+
+
+def _fts_values(row) -> dict:
+    values = {name: getattr(row, name) or "" for name in FIELD_NAMES}
+    values["tags"] = " ".join(to_list(values["tags"]))
+    values["content_html"] = strip_html(values["content_html"])
+    return values
+
+
+def index_lessons(connection, lesson_ids: Optional[List[int]] = None):
+    """(Re)index the given lessons, or all of them"""
+    if _is_postgres(connection):
+        where = "WHERE id = ANY(:ids)" if lesson_ids is not None else ""
+        params = {"config": SEARCH_TEXT_CONFIG}
+        if lesson_ids is not None:
+            params["ids"] = list(lesson_ids)
+        connection.execute(text(
+            f"INSERT INTO lesson_search (lesson_id, document) SELECT id, {_pg_document_sql()} FROM lessons {where} "
+            "ON CONFLICT (lesson_id) DO UPDATE SET document = EXCLUDED.document"
+        ), params)
+        return
+    lessons = _lesson_model.__table__
+    query = select(lessons.c.id, *(lessons.c[name] for name in FIELD_NAMES))
+    if lesson_ids is not None:
+        query = query.where(lessons.c.id.in_(lesson_ids))
+    rows = [dict(_fts_values(row), rowid=row.id) for row in connection.execute(query)]
+    remove_lessons(connection, [row["rowid"] for row in rows] if lesson_ids is not None else None)
+    if rows:
+        connection.execute(text(
+            f"INSERT INTO lesson_search (rowid, {', '.join(FIELD_NAMES)}) "
+            f"VALUES (:rowid, {', '.join(':' + name for name in FIELD_NAMES)})"
+        ), rows)
+
+
+def remove_lessons(connection, lesson_ids: Optional[List[int]] = None):
+    key = "lesson_id" if _is_postgres(connection) else "rowid"
+    if lesson_ids is None:
+        connection.execute(text("DELETE FROM lesson_search"))
+    elif lesson_ids:
+        connection.execute(text(f"DELETE FROM lesson_search WHERE {key} = :id"), [{"id": i} for i in lesson_ids])
+
+
+def _after_write(mapper, connection, target):
+    if inspect(target).has_identity and not any(get_history(target, name).has_changes() for name in FIELD_NAMES):
+        return
+    index_lessons(connection, [target.id])
+
+
+def _after_delete(mapper, connection, target):
+    remove_lessons(connection, [target.id])
+
+
+def track_lesson_search(lesson_model):
+    global _lesson_model
+    _lesson_model = lesson_model
+    event.listen(lesson_model, "after_insert", _after_write)
+    event.listen(lesson_model, "after_update", _after_write)
+    event.listen(lesson_model, "after_delete", _after_delete)
+
+
+def ranked(bind, q: str):
+    """Subquery of (lesson_id, score) matching q, higher score = better match; None if q has no terms"""
+    if _is_postgres(bind):
+        if not q.strip():
+            return None
+        stmt = text(
+            "SELECT lesson_id, ts_rank(document, query) AS score "
+            "FROM lesson_search, websearch_to_tsquery(CAST(:config AS regconfig), :q) query "
+            "WHERE document @@ query"
+        ).bindparams(config=SEARCH_TEXT_CONFIG, q=q)
+    else:
+        # Quote every term so user input can't be parsed as FTS5 syntax; terms are ANDed
+        terms = _WORDS.findall(q)
+        if not terms:
+            return None
+        weights = ", ".join(str(weight) for _, _, weight in FIELDS)
+        stmt = text(
+            f"SELECT rowid AS lesson_id, -bm25(lesson_search, {weights}) AS score "
+            "FROM lesson_search WHERE lesson_search MATCH :q"
+        ).bindparams(q=" ".join(f'"{term}"' for term in terms))
+    return stmt.columns(lesson_id=Integer, score=Float).subquery("ranked")
+
+
+def migrate(bind):
+    """Create the search table/index if missing and fill it. Idempotent."""
+    if "lesson_search" in inspect(bind).get_table_names():
+        return
+    with bind.begin() as conn:
+        if _is_postgres(conn):
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS lesson_search ("
+                " lesson_id INTEGER PRIMARY KEY REFERENCES lessons(id) ON DELETE CASCADE,"
+                " document tsvector NOT NULL)"
+            ))
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_lesson_search_document ON lesson_search USING GIN (document)"
+            ))
+        else:
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS lesson_search USING fts5("
+                f"{', '.join(FIELD_NAMES)}, tokenize='porter unicode61')"
+            ))
+        index_lessons(conn)
+    print(" Lesson search index created")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the lesson full-text search index")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.parse_args()
+
+    from main import engine  # registers the tracked model
+
+    migrate(engine)
+    with engine.begin() as conn:
+        remove_lessons(conn)
+        index_lessons(conn)
+    print(" Lesson search index rebuilt")
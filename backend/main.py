@@ -1,28 +1,58 @@
 # backend/main.py
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, status, APIRouter, Body
+from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, status, APIRouter, Body, Request, Response, Query
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy import create_engine, Column, Integer, String, Text, Boolean, ForeignKey, TIMESTAMP, JSON
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select, text, Index, Column, Integer, String, Text, Boolean, ForeignKey, TIMESTAMP, JSON
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session, relationship
+from sqlalchemy.orm import Session, relationship, deferred, undefer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 from pydantic import BaseModel
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 import os
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from pathlib import Path
 import uuid
 import shutil
 from dotenv import load_dotenv
 import hashlib
+import time
 from typing import List
 
 
 # Load environment variables from .env file FIRST
 load_dotenv()
+
+# Local modules read their settings from the environment at import time
+from database import (
+    DATABASE_URL, engine, SessionLocal, get_db, pool_stats, async_engine, get_async_db,
+    get_read_db, get_async_read_db, mark_recent_write, replica_router,
+)
+from principal_cache import principal_cache, load_principal, load_principal_async
+from hashing import hashing_pool
+from hash_calibration import load_or_calibrate, apply_params
+from tokens import verify_access_token, create_refresh_token, decode_refresh_token, token_cache
+from roster_import import parse_roster, import_roster, iter_report
+from pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, decode_cursor, keyset, page
+from multivalue import StringArray, value_table, track_values, match_values, split_values, migrate as migrate_multivalue
+from progress_store import PROGRESS_UNIQUE_INDEX, record_attempt, record_completion, ensure_unique_progress
+from lesson_path import PATH_INDEXES as LESSON_PATH_INDEXES, track_lesson_path, migrate as migrate_lesson_path
+from lesson_search import ranked, track_lesson_search, migrate as migrate_lesson_search
+from points_ledger import LESSON_REASON, award_points, bucket_keys
+from leaderboard_index import GLOBAL_SCOPE, SCOPE_ATTRIBUTES, leaderboard_index
+from user_stats import bump_stats, record_completion_stats, ensure_user_stats, stats_payload
+from curriculum_tree import CurriculumTree
+from quiz_grading import answer_keys, grade_attempt, save_attempt
+from fieldsets import Fieldset
+from lean_read import json_rows
+from table_versions import Conditional, version_table, track_versions, versions_query
+from quiz_ingest import TooManyRows, detect_format, iter_rows, ingest_quizzes, summarize
+from response_cache import ResponseCache, request_key
  # ==================== UPLOADS CONFIGURATION ====================
 # For Docker, we use /app/uploads (inside container)
 UPLOAD_DIR = Path("/app/uploads")
@@ -35,7 +65,6 @@ app = FastAPI(title="Island Quest Lab API", version="1.0.0")
 app.mount("/uploads", StaticFiles(directory="/app/uploads"), name="uploads")
 
 # ==================== CONFIGURATION ====================
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./islandquest.db")
 SECRET_KEY = os.getenv("SECRET_KEY", "your_super_secret_key_here_change_this_in_production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
@@ -47,16 +76,7 @@ print(f"Using SQLite: {'sqlite' in DATABASE_URL}")
 # ==================== DATABASE SETUP ====================
 Base = declarative_base()  # MUST BE DEFINED BEFORE MODEL CLASSES!
 
-# Configure engine based on database type
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(
-        DATABASE_URL,
-        connect_args={"check_same_thread": False}
-    )
-else:
-    engine = create_engine(DATABASE_URL)
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# engine, SessionLocal and get_db come from database.py (one pool per process)
 
 # ==================== DATABASE MODELS ====================
 
@@ -160,7 +180,8 @@ class Lesson(Base):
     id = Column(Integer, primary_key=True)
     concept_id = Column(Integer, ForeignKey('concepts.id'), nullable=True)
     title = Column(String(150), nullable=False)
-    content_html = Column(Text, nullable=False)
+    # The lesson body; only loaded when asked for (undefer / load_only), see fieldsets.py
+    content_html = deferred(Column(Text, nullable=False))
     creator_id = Column(Integer, ForeignKey('users.id'), nullable=True)
     created_at = Column(TIMESTAMP, server_default='CURRENT_TIMESTAMP')
     # New columns
@@ -168,11 +189,15 @@ class Lesson(Base):
     difficulty = Column(String(20), default='beginner')
     estimated_time = Column(Integer, default=30)
     points = Column(Integer, default=50)
-    grade_levels = Column(Text, default='')
+    grade_levels = Column(StringArray, default=list)
     description = Column(Text, default='')
     objectives = Column(Text, default='')
     prerequisites = Column(Text, default='')
-    tags = Column(Text, default='')
+    tags = Column(StringArray, default=list)
+    # Curriculum path of the concept, copied for filtering (see lesson_path.py)
+    subject_id = Column(Integer, nullable=True)
+    grade_level = Column(Integer, nullable=True)
+    term_id = Column(Integer, nullable=True)
     
     # Relationships
     concept = relationship("Concept", back_populates="lessons")
@@ -181,6 +206,8 @@ class Lesson(Base):
     media = relationship("Media", back_populates="lesson")
     progress = relationship("Progress", back_populates="lesson")
     quizzes = relationship("Quiz", back_populates="lesson")
+    
+    __table_args__ = tuple(Index(name, *columns) for name, columns in LESSON_PATH_INDEXES.items())
 
 class GameEngine(Base):
     __tablename__ = "game_engines"
@@ -232,6 +259,9 @@ class Progress(Base):
     # Relationships
     user = relationship("User", back_populates="progress")
     lesson = relationship("Lesson", back_populates="progress")
+    
+    # One row per user and lesson; complete_lesson upserts against it
+    __table_args__ = (Index(PROGRESS_UNIQUE_INDEX, "user_id", "lesson_id", unique=True),)
 
 class Quiz(Base):
     __tablename__ = "quizzes"
@@ -248,11 +278,35 @@ class Quiz(Base):
     time_limit = Column(Integer, default=0)
     image_url = Column(Text, default='')
     audio_url = Column(Text, default='')
-    tags = Column(Text, default='')
+    tags = Column(StringArray, default=list)
     
     # Relationships
     lesson = relationship("Lesson", back_populates="quizzes")
 
+# One graded submission of a quiz (all questions of its lesson) and its per-question answers
+class QuizAttempt(Base):
+    __tablename__ = "quiz_attempts"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), nullable=False)
+    quiz_id = Column(Integer, ForeignKey('quizzes.id', ondelete="SET NULL"), nullable=True)
+    lesson_id = Column(Integer, ForeignKey('lessons.id', ondelete="SET NULL"), nullable=True)
+    score = Column(Integer, nullable=False)
+    correct_count = Column(Integer, nullable=False)
+    total_count = Column(Integer, nullable=False)
+    points_earned = Column(Integer, nullable=False, default=0)
+    submitted_at = Column(TIMESTAMP, nullable=False)
+    
+    __table_args__ = (Index("idx_quiz_attempts_user", "user_id", "id"),)
+
+class QuizAnswer(Base):
+    __tablename__ = "quiz_answers"
+    id = Column(Integer, primary_key=True)
+    attempt_id = Column(Integer, ForeignKey('quiz_attempts.id', ondelete="CASCADE"), nullable=False, index=True)
+    quiz_id = Column(Integer, ForeignKey('quizzes.id', ondelete="CASCADE"), nullable=True)
+    answer = Column(Text, nullable=True)
+    is_correct = Column(Boolean, nullable=False)
+    points = Column(Integer, nullable=False, default=0)
+
 class Reward(Base):
     __tablename__ = "rewards"
     id = Column(Integer, primary_key=True)
@@ -265,9 +319,83 @@ class Reward(Base):
     creator = relationship("User", foreign_keys=[creator_id], back_populates="rewards_created")
     recipient = relationship("User", foreign_keys=[for_user_id], back_populates="rewards_received")
 
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+    jti = Column(String(32), primary_key=True)
+    expires_at = Column(TIMESTAMP, nullable=False)
+
+# Append-only record of every points award; leaderboards read the rollups below
+class PointsLedger(Base):
+    __tablename__ = "points_ledger"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    points = Column(Integer, nullable=False)
+    reason = Column(String(30), nullable=False)
+    source_id = Column(Integer, nullable=True)
+    awarded_at = Column(TIMESTAMP, nullable=False)
+    
+    __table_args__ = (Index("idx_points_ledger_source", "user_id", "reason", "source_id"),)
+
+# Points per user per day / ISO week / school term, maintained alongside the ledger
+class PointsRollup(Base):
+    __tablename__ = "points_rollups"
+    bucket_kind = Column(String(10), primary_key=True)
+    bucket_key = Column(String(20), primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    points = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (Index("idx_points_rollups_rank", "bucket_kind", "bucket_key", "points"),)
+
+# Progress counters per user, maintained with every Progress write (see user_stats.py)
+class UserStats(Base):
+    __tablename__ = "user_stats"
+    user_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), primary_key=True)
+    completed_count = Column(Integer, nullable=False, default=0)
+    attempted_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Integer, nullable=False, default=0)
+    last_activity_at = Column(TIMESTAMP, nullable=True)
+
+# Indexed tag/grade lookups when the database has no array columns (see multivalue.py)
+lesson_values = value_table(Base.metadata, "lesson_values", "lessons")
+quiz_values = value_table(Base.metadata, "quiz_values", "quizzes")
+track_values(Lesson, lesson_values, {"tags": "tag", "grade_levels": "grade"})
+track_values(Quiz, quiz_values, {"tags": "tag"})
+track_lesson_path(Lesson, Concept, Topic, CurriculumSubject)
+track_lesson_search(Lesson)
+answer_keys.track(Quiz)
+
+# Catalog version counters for ETag/304 (see table_versions.py); curriculum
+# moves rewrite lesson paths, so they count as lesson changes
+table_versions = version_table(Base.metadata)
+track_versions(Lesson)
+track_versions(Quiz)
+track_versions(Game)
+track_versions(Subject)
+for _model in (Concept, Topic, CurriculumSubject):
+    track_versions(_model, "lessons")
+for _model in (Country, SchoolYear, Term):
+    track_versions(_model, "curriculum")
+
+# Snapshot cache of the curriculum hierarchy, keyed on the version counters above
+curriculum_tree = CurriculumTree(
+    Country=Country, SchoolYear=SchoolYear, Term=Term, Topic=Topic, CurriculumSubject=CurriculumSubject,
+    Subject=Subject, Concept=Concept, Lesson=Lesson,
+)
+
+# Rendered responses every student shares (see response_cache.py); ORM writes
+# drop their tags on commit, Core writes to users call invalidate("leaderboard").
+# Handlers that use it are decorated with @response_cache.coalesce so identical
+# concurrent misses share one build
+response_cache = ResponseCache()
+response_cache.track(Subject, "subjects")
+response_cache.track(Game, "games")
+response_cache.track(Lesson, "lesson:{id}")
+response_cache.track(User, "leaderboard", attributes=("username", "points", "level", "avatar", "role", *SCOPE_ATTRIBUTES))
+
 # ==================== FASTAPI APP SETUP ====================
 
-app = FastAPI(title="Island Quest Lab API", version="1.0.0")
+# orjson for every JSON response; list endpoints go further and skip Pydantic entirely (lean_read.py)
+app = FastAPI(title="Island Quest Lab API", version="1.0.0", default_response_class=ORJSONResponse)
 
 # CORS Middleware
 app.add_middleware(
@@ -276,8 +404,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# Reads go to replicas (when configured); after a successful write the client's reads
+# stick to the primary for a few seconds so it sees its own changes
+@app.middleware("http")
+async def pin_reads_after_writes(request: Request, call_next):
+    response = await call_next(request)
+    if request.method in ("POST", "PUT", "PATCH", "DELETE") and response.status_code < 400:
+        mark_recent_write(response)
+    return response
+
 # Mount static files for uploaded media
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
@@ -291,13 +429,7 @@ pwd_context = CryptContext(
     deprecated="auto"
 )
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 
 
 # ==================== PYDANTIC MODELS ====================
@@ -334,6 +466,10 @@ class UserOut(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 # Enhanced Lesson Models
 class LessonCreate(BaseModel):
@@ -350,17 +486,35 @@ class LessonCreate(BaseModel):
     prerequisites: str = ""
     tags: List[str] = []
 
+# Every field but id is optional: list endpoints return only the requested fields (?fields= / ?view=)
 class LessonOut(BaseModel):
     id: int
-    concept_id: Optional[int]
-    title: str
-    content_html: str
-    creator_id: Optional[int]
-    created_at: datetime
+    concept_id: Optional[int] = None
+    title: Optional[str] = None
+    content_html: Optional[str] = None
+    creator_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    subject_id: Optional[int] = None
+    grade_level: Optional[int] = None
+    term_id: Optional[int] = None
+    category: Optional[str] = None
+    difficulty: Optional[str] = None
+    estimated_time: Optional[int] = None
+    points: Optional[int] = None
+    grade_levels: Optional[List[str]] = None
+    description: Optional[str] = None
+    tags: Optional[List[str]] = None
     
     class Config:
         from_attributes = True
 
+LESSON_VIEWS = {
+    "full": ("id", "concept_id", "title", "content_html", "creator_id", "created_at", "subject_id", "grade_level", "term_id"),
+    "summary": ("id", "title", "category", "difficulty", "points", "estimated_time", "subject_id", "grade_level"),
+}
+# Only returned when asked for by name
+LESSON_EXTRA_FIELDS = ("description", "tags", "grade_levels")
+
 class LessonOutEnhanced(BaseModel):
     id: int
     concept_id: Optional[int]
@@ -411,24 +565,39 @@ class QuizCreate(BaseModel):
     audio_url: str = ""
     tags: List[str] = []
 
+# Partial shapes as for LessonOut
 class QuizOut(BaseModel):
     id: int
-    lesson_id: Optional[int]
-    question: str
-    question_type: str
-    options: List[str]
-    correct_answer: str
-    explanation: str
-    points: int
-    difficulty: str
-    time_limit: int
-    image_url: str
-    audio_url: str
-    tags: List[str]
+    lesson_id: Optional[int] = None
+    question: Optional[str] = None
+    question_type: Optional[str] = None
+    options: Optional[List[str]] = None
+    # Only sent to authors (teacher/parent/admin); players are graded server-side
+    correct_answer: Optional[str] = None
+    explanation: Optional[str] = None
+    points: Optional[int] = None
+    difficulty: Optional[str] = None
+    time_limit: Optional[int] = None
+    image_url: Optional[str] = None
+    audio_url: Optional[str] = None
+    tags: Optional[List[str]] = None
     
     class Config:
         from_attributes = True
 
+QUIZ_VIEWS = {
+    "full": ("id", "lesson_id", "question", "question_type", "options", "correct_answer", "explanation", "points",
+             "difficulty", "time_limit", "image_url", "audio_url", "tags"),
+    "summary": ("id", "lesson_id", "question", "question_type", "points", "difficulty", "time_limit"),
+}
+
+def split_options(options: Optional[str]) -> List[str]:
+    # Quiz options are stored comma-joined
+    return options.split(',') if options else []
+
+lesson_fields = Fieldset(Lesson, LESSON_VIEWS, LESSON_EXTRA_FIELDS)
+quiz_fields = Fieldset(Quiz, QUIZ_VIEWS, convert={"options": split_options})
+
 class ProgressCreate(BaseModel):
     user_id: Optional[int] = None
     lesson_id: Optional[int] = None
@@ -461,11 +630,6 @@ class RewardOut(BaseModel):
     class Config:
         from_attributes = True
 
-# Bulk quiz creation model
-class QuizBulkCreate(BaseModel):
-    lesson_id: int
-    questions: List[QuizCreate]
-
 # Enhanced subject model
 class SubjectOutEnhanced(BaseModel):
     id: int
@@ -476,19 +640,10 @@ class SubjectOutEnhanced(BaseModel):
     class Config:
         from_attributes = True
 
-# Bulk quiz import
-class QuizBulkItem(BaseModel):
-    question: str
-    question_type: str = "mc_single"
-    options: List[str]
-    correct_answer: str
-    explanation: str = ""
-    points: int = 10
-    difficulty: str = "beginner"
-
-class QuizBulkCreate(BaseModel):
-    lesson_id: int
-    quizzes: List[QuizBulkItem]
+class QuizSubmission(BaseModel):
+    quiz_id: Optional[int] = None
+    # question (quiz) id -> option text/letter, list of options for multi-select, or typed text
+    answers: Dict[int, Union[str, int, float, bool, List[str], None]] = {}
 
 # ==================== AUTHENTICATION UTILITIES ====================
 
@@ -515,95 +670,211 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = verify_access_token(token)
+        username: str = payload.get("sub")
+        if username is None:
+            raise credentials_exception
+    except JWTError:
+        raise credentials_exception
+    
+    user = load_principal(db, User, username)
+    if user is None:
+        raise credentials_exception
+    return user
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    # Read-only counterpart of get_current_user for the async handlers
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = verify_access_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
+    user = await load_principal_async(db, User, username)
     if user is None:
         raise credentials_exception
     return user
 
+def get_optional_user(token: Optional[str] = Depends(oauth2_scheme_optional), db: Session = Depends(get_db)):
+    # Anonymous callers get None; a bad token is still a 401
+    return get_current_user(token, db) if token else None
+
+async def get_optional_user_async(token: Optional[str] = Depends(oauth2_scheme_optional), db: AsyncSession = Depends(get_async_db)):
+    return await get_current_user_async(token, db) if token else None
+
 def get_current_active_user(current_user: User = Depends(get_current_user)):
     if not current_user:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
+def issue_tokens(username: str):
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": username}, expires_delta=access_token_expires
+    )
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": create_refresh_token(username),
+    }
+
+# Refresh tokens are denylisted by jti until they expire. Inserting the jti is the
+# revocation, so a token presented twice fails on the primary key.
+REVOCATION_PURGE_INTERVAL_SECONDS = 600
+_last_revocation_purge = 0.0
+
+def revoke_refresh_token(db: Session, claims: dict) -> bool:
+    global _last_revocation_purge
+    if time.monotonic() - _last_revocation_purge > REVOCATION_PURGE_INTERVAL_SECONDS:
+        _last_revocation_purge = time.monotonic()
+        db.query(RevokedToken).filter(RevokedToken.expires_at < datetime.utcnow()).delete()
+    
+    db.add(RevokedToken(jti=claims["jti"], expires_at=datetime.utcfromtimestamp(claims["exp"])))
+    try:
+        db.commit()
+        return True
+    except IntegrityError:
+        db.rollback()
+        return False
+
 # ==================== AUTH ENDPOINTS ====================
 
-@app.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+def _check_new_user(db: Session, username: str, email: str, parent_id: Optional[int] = None):
     # Check if username exists
-    existing_user = db.query(User).filter(User.username == user.username).first()
+    existing_user = db.query(User).filter(User.username == username).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already exists")
     
     # Check if email exists
-    existing_email = db.query(User).filter(User.email == user.email).first()
+    existing_email = db.query(User).filter(User.email == email).first()
     if existing_email:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Validate parent_id if provided
-    if user.parent_id:
-        parent = db.query(User).filter(User.id == user.parent_id).first()
+    if parent_id:
+        parent = db.query(User).filter(User.id == parent_id).first()
         if not parent:
             raise HTTPException(status_code=400, detail="Parent not found")
         if parent.role != 'parent':
             raise HTTPException(status_code=400, detail="Parent ID does not belong to a parent user")
-    
-    # Create new user
-    hashed_password = get_password_hash(user.password)
-    db_user = User(
-        username=user.username,
-        email=user.email,
-        hashed_password=hashed_password,
-        role=user.role,
-        parent_id=user.parent_id
-    )
-    
+
+def _save_new_user(db: Session, db_user: User, error_detail: str):
     try:
         db.add(db_user)
         db.commit()
         db.refresh(db_user)
     except IntegrityError:
         db.rollback()
-        raise HTTPException(status_code=400, detail="Database error")
+        raise HTTPException(status_code=400, detail=error_detail)
     
+    # Drop any principal cached under this username before the account existed
+    principal_cache.invalidate(db_user.username)
+    leaderboard_index.update_user(db_user)
     return db_user
 
-@app.post("/token", response_model=Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+def _find_login_user(db: Session, login: str):
     # Try to find user by username first
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = db.query(User).filter(User.username == login).first()
     
     # If not found by username, try email
     if not user:
-        user = db.query(User).filter(User.email == form_data.username).first()
+        user = db.query(User).filter(User.email == login).first()
+    return user
+
+def _save_rehashed_password(db: Session, user: User, new_hash: str):
+    user.hashed_password = new_hash
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+
+# Database work runs on the threadpool; the KDF is awaited on the hashing pool so
+# a login burst can't tie up request threads.
+
+@app.post("/register", response_model=UserOut, status_code=status.HTTP_201_CREATED)
+async def register(user: UserCreate, db: Session = Depends(get_db)):
+    await run_in_threadpool(_check_new_user, db, user.username, user.email, user.parent_id)
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    # Create new user
+    hashed_password = await hashing_pool.hash(pwd_context, user.password)
+    db_user = User(
+        username=user.username,
+        email=user.email,
+        hashed_password=hashed_password,
+        role=user.role,
+        parent_id=user.parent_id
+    )
+    
+    return await run_in_threadpool(_save_new_user, db, db_user, "Database error")
+
+@app.post("/token", response_model=Token)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await run_in_threadpool(_find_login_user, db, form_data.username)
+    
+    if not user or not await hashing_pool.verify(pwd_context, form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+    # Upgrade legacy bcrypt hashes and argon2 hashes made with a different calibrated cost
+    if pwd_context.needs_update(user.hashed_password):
+        try:
+            new_hash = await hashing_pool.hash(pwd_context, form_data.password)
+            await run_in_threadpool(_save_rehashed_password, db, user, new_hash)
+        except HTTPException:
+            pass  # hashing pool saturated; the hash gets upgraded on a later login
+    
+    return issue_tokens(user.username)
+
+@app.post("/token/refresh", response_model=Token)
+def refresh_access_token(request: RefreshRequest, db: Session = Depends(get_db)):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or revoked refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
     )
-    return {"access_token": access_token, "token_type": "bearer"}
+    try:
+        claims = decode_refresh_token(request.refresh_token)
+    except JWTError:
+        raise credentials_exception
+    
+    user = load_principal(db, User, claims["sub"])
+    if user is None:
+        raise credentials_exception
+    
+    # Rotate: each refresh token can be exchanged once
+    if not revoke_refresh_token(db, claims):
+        raise credentials_exception
+    
+    return issue_tokens(user.username)
+
+@app.post("/token/revoke")
+def revoke_token(request: RefreshRequest, db: Session = Depends(get_db)):
+    try:
+        claims = decode_refresh_token(request.refresh_token)
+    except JWTError:
+        raise HTTPException(status_code=400, detail="Invalid refresh token")
+    
+    revoke_refresh_token(db, claims)
+    return {"message": "Refresh token revoked"}
 
 # ==================== USER ENDPOINTS ====================
 
 @app.get("/users/me", response_model=UserOut)
-async def read_users_me(current_user: User = Depends(get_current_active_user)):
+async def read_users_me(current_user: User = Depends(get_current_user_async)):
     return current_user
 
 @app.get("/users/{user_id}", response_model=UserOut)
-def read_user(user_id: int, db: Session = Depends(get_db)):
+def read_user(user_id: int, db: Session = Depends(get_read_db)):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -625,6 +896,7 @@ def update_user(
         raise HTTPException(status_code=403, detail="Not authorized to update this user")
     
     # Update fields
+    old_username = user.username
     update_data = user_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(user, field, value)
@@ -635,10 +907,22 @@ def update_user(
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Update failed")
+    finally:
+        principal_cache.invalidate(old_username, update_data.get('username'))
     
     return user
 
 # ==================== LESSON ENDPOINTS ====================
+# ==================== CONDITIONAL GET ====================
+# Catalog GETs check the version counters of the tables they read and answer
+# a matching If-None-Match / If-Modified-Since with 304 before reading any rows
+
+def catalog_check(request: Request, db: Session, *tables: str, variant=(), private: bool = False) -> Conditional:
+    return Conditional(request, db.execute(versions_query(*tables)).all(), tables, variant, private)
+
+async def catalog_check_async(request: Request, db: AsyncSession, *tables: str, variant=(), private: bool = False) -> Conditional:
+    return Conditional(request, (await db.execute(versions_query(*tables))).all(), tables, variant, private)
+
 @app.get("/lessons/create")
 def check_lesson_create_access(current_user: User = Depends(get_current_user)):
     # Just check if user can create lessons
@@ -646,55 +930,120 @@ def check_lesson_create_access(current_user: User = Depends(get_current_user)):
         raise HTTPException(status_code=403, detail="Not authorized to create lessons")
     return {"message": "Authorized to create lessons"}
 
-@app.get("/lessons", response_model=List[LessonOut])
-def get_lessons(
-    skip: int = 0,
-    limit: int = 100,
+@app.get("/lessons", response_model=List[LessonOut], response_model_exclude_unset=True)
+async def get_lessons(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, deprecated=True),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     concept_id: Optional[int] = None,
     creator_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    subject_id: Optional[int] = None,
+    subject: Optional[int] = Query(None, deprecated=True),
+    grade_level: Optional[int] = None,
+    term_id: Optional[int] = None,
+    tag: Optional[List[str]] = Query(None),
+    grade: Optional[List[str]] = Query(None),
+    match: str = Query("any", pattern="^(any|all)$"),
+    fields: Optional[List[str]] = Query(None),
+    view: str = Query("full", pattern="^(full|summary)$"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    query = db.query(Lesson)
+    # Only the columns behind the returned fields are read, as plain rows encoded straight to JSON
+    selected = lesson_fields.resolve(fields, view)
+    catalog = await catalog_check_async(request, db, "lessons")
+    if catalog.not_modified:
+        return catalog.response_304()
+    catalog.apply(response)
+    query = lesson_fields.select(selected)
+    subject_id = subject_id or subject
     
     if concept_id:
-        query = query.filter(Lesson.concept_id == concept_id)
+        query = query.where(Lesson.concept_id == concept_id)
     if creator_id:
-        query = query.filter(Lesson.creator_id == creator_id)
-    
-    lessons = query.offset(skip).limit(limit).all()
-    return lessons
+        query = query.where(Lesson.creator_id == creator_id)
+    # Materialized curriculum path, see lesson_path.py
+    if subject_id:
+        query = query.where(Lesson.subject_id == subject_id)
+    if grade_level is not None:
+        query = query.where(Lesson.grade_level == grade_level)
+    if term_id:
+        query = query.where(Lesson.term_id == term_id)
+    if split_values(tag):
+        query = query.where(match_values(Lesson, "tags", split_values(tag), match))
+    if split_values(grade):
+        query = query.where(match_values(Lesson, "grade_levels", split_values(grade), match))
+    
+    result = await db.execute(keyset(query, Lesson.id, cursor, limit, skip))
+    return json_rows(lesson_fields.encoder(selected), page(result.all(), limit, response), response)
+
+@app.get("/lessons/search", response_model=List[LessonOut], response_model_exclude_unset=True)
+async def search_lessons(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[List[str]] = Query(None),
+    view: str = Query("full", pattern="^(full|summary)$"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    # Ranked results page by position: the cursor is the offset of the next page
+    selected = lesson_fields.resolve(fields, view)
+    catalog = await catalog_check_async(request, db, "lessons")
+    if catalog.not_modified:
+        return catalog.response_304()
+    catalog.apply(response)
+    matches = ranked(db.get_bind(), q)
+    if matches is None:
+        return []
+    offset = decode_cursor(cursor) if cursor else 0
+    if not isinstance(offset, int) or offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    result = await db.execute(
+        lesson_fields.select(selected)
+        .join(matches, matches.c.lesson_id == Lesson.id)
+        .order_by(matches.c.score.desc(), Lesson.id)
+        .offset(offset)
+        .limit(limit + 1)
+    )
+    rows = page(result.all(), limit, response, key=lambda _: offset + limit)
+    return json_rows(lesson_fields.encoder(selected), rows, response)
 
 @app.get("/lessons/{lesson_id}", response_model=LessonOut)
-def get_lesson(lesson_id: int, db: Session = Depends(get_db)):
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+def get_lesson(lesson_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    catalog = catalog_check(request, db, "lessons")
+    if catalog.not_modified:
+        return catalog.response_304()
+    catalog.apply(response)
+    lesson = db.query(Lesson).options(undefer(Lesson.content_html)).filter(Lesson.id == lesson_id).first()
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
     return lesson
 
 @app.get("/lessons/enhanced/{lesson_id}", response_model=LessonOutEnhanced)
-def get_lesson_enhanced(lesson_id: int, db: Session = Depends(get_db)):
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+@response_cache.coalesce
+def get_lesson_enhanced(lesson_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    catalog = catalog_check(request, db, "lessons")
+    if catalog.not_modified:
+        return catalog.response_304()
+    catalog.apply(response)
+    cached = response_cache.lookup("/lessons/enhanced/{lesson_id}", request_key(request), (f"lesson:{lesson_id}",))
+    if cached.hit:
+        return cached.response(response)
+    lesson = db.query(Lesson).options(undefer(Lesson.content_html)).filter(Lesson.id == lesson_id).first()
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
     
     # Convert to enhanced format
     lesson_dict = {c.name: getattr(lesson, c.name) for c in lesson.__table__.columns}
     
-    # Parse string fields back to lists
-    if lesson_dict.get('grade_levels'):
-        lesson_dict['grade_levels'] = lesson_dict['grade_levels'].split(',') if lesson_dict['grade_levels'] else []
-    else:
-        lesson_dict['grade_levels'] = []
-    
-    if lesson_dict.get('tags'):
-        lesson_dict['tags'] = lesson_dict['tags'].split(',') if lesson_dict['tags'] else []
-    else:
-        lesson_dict['tags'] = []
-    
     # Add subject_name (using category)
     lesson_dict['subject_name'] = lesson.category
     
-    return lesson_dict
+    return cached.store(LessonOutEnhanced.model_validate(lesson_dict).model_dump(mode="json"), response)
 
 @app.post("/lessons", response_model=LessonOutEnhanced, status_code=status.HTTP_201_CREATED)
 def create_lesson(
@@ -705,12 +1054,7 @@ def create_lesson(
     if current_user.role not in ['teacher', 'parent', 'admin']:
         raise HTTPException(status_code=403, detail="Not authorized to create lessons")
     
-    # Convert lists to strings
-    lesson_dict = lesson.dict()
-    lesson_dict['grade_levels'] = ','.join(lesson_dict['grade_levels']) if lesson_dict['grade_levels'] else ''
-    lesson_dict['tags'] = ','.join(lesson_dict['tags']) if lesson_dict['tags'] else ''
-    
-    db_lesson = Lesson(**lesson_dict, creator_id=current_user.id)
+    db_lesson = Lesson(**lesson.dict(), creator_id=current_user.id)
     
     try:
         db.add(db_lesson)
@@ -720,10 +1064,7 @@ def create_lesson(
         db.rollback()
         raise HTTPException(status_code=400, detail="Failed to create lesson")
     
-    # Convert back for response
     lesson_out = {c.name: getattr(db_lesson, c.name) for c in db_lesson.__table__.columns}
-    lesson_out['grade_levels'] = lesson.grade_levels
-    lesson_out['tags'] = lesson.tags
     lesson_out['subject_name'] = lesson.category
     
     return lesson_out
@@ -745,10 +1086,6 @@ def update_lesson(
     
     update_data = lesson_update.dict(exclude_unset=True)
     
-    # Handle grade_levels conversion
-    if 'grade_levels' in update_data and update_data['grade_levels']:
-        update_data['grade_levels'] = ','.join(update_data['grade_levels'])
-    
     for field, value in update_data.items():
         setattr(lesson, field, value)
     
@@ -759,9 +1096,7 @@ def update_lesson(
         db.rollback()
         raise HTTPException(status_code=400, detail="Failed to update lesson")
     
-    # Convert back for response
     lesson_out = {c.name: getattr(lesson, c.name) for c in lesson.__table__.columns}
-    lesson_out['grade_levels'] = lesson_update.grade_levels
     lesson_out['subject_name'] = lesson.category
     
     return lesson_out
@@ -791,17 +1126,24 @@ def delete_lesson(
 
 # ==================== GAME ENDPOINTS ====================
 @app.get("/games/list")
+@response_cache.coalesce
 def get_games_list(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
     limit: Optional[int] = None,
-    skip: int = 0,
-    db: Session = Depends(get_db)
+    skip: int = Query(0, deprecated=True),
+    db: Session = Depends(get_read_db)
 ):
-    query = db.query(Game)
-    
-    if limit:
-        query = query.limit(limit)
-    
-    games = query.offset(skip).all()
+    catalog = catalog_check(request, db, "games")
+    if catalog.not_modified:
+        return catalog.response_304()
+    catalog.apply(response)
+    cached = response_cache.lookup("/games/list", request_key(request), ("games",))
+    if cached.hit:
+        return cached.response(response)
+    limit = limit or None
+    games = page(keyset(db.query(Game), Game.id, cursor, limit, skip).all(), limit, response)
     
     # Convert to frontend format
     game_list = []
@@ -815,24 +1157,29 @@ def get_games_list(
             "config_json": game.config_json
         })
     
-    return game_list
+    return cached.store(game_list, response)
 
 @app.get("/games")
-def get_games_with_stats(
+async def get_games_with_stats(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
     limit: Optional[int] = None,
-    skip: int = 0,
+    skip: int = Query(0, deprecated=True),
     lesson_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    query = db.query(Game)
+    catalog = await catalog_check_async(request, db, "games")
+    if catalog.not_modified:
+        return catalog.response_304()
+    catalog.apply(response)
+    query = select(Game)
     
     if lesson_id:
-        query = query.filter(Game.lesson_id == lesson_id)
-    
-    if limit:
-        query = query.limit(limit)
+        query = query.where(Game.lesson_id == lesson_id)
     
-    games = query.offset(skip).all()
+    limit = limit or None
+    games = page((await db.execute(keyset(query, Game.id, cursor, limit, skip))).scalars().all(), limit, response)
     
     # Convert to frontend format
     game_list = []
@@ -849,7 +1196,11 @@ def get_games_with_stats(
     return game_list
 
 @app.get("/games/{game_id}", response_model=GameOut)
-def get_game(game_id: int, db: Session = Depends(get_db)):
+def get_game(game_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    catalog = catalog_check(request, db, "games")
+    if catalog.not_modified:
+        return catalog.response_304()
+    catalog.apply(response)
     game = db.query(Game).filter(Game.id == game_id).first()
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
@@ -878,29 +1229,52 @@ def create_game(
 
 # ==================== QUIZ ENDPOINTS ====================
 
-@app.get("/quizzes", response_model=List[QuizOut])
-def get_quizzes(
-    skip: int = 0,
-    limit: int = 100,
+QUIZ_AUTHOR_ROLES = ('teacher', 'parent', 'admin')
+
+def quiz_out(quiz: Quiz, user: Optional[User], fields=QUIZ_VIEWS["full"]) -> dict:
+    # Options string to list; the answer key only goes to authors
+    quiz_dict = quiz_fields.dump(quiz, fields)
+    if 'options' in quiz_dict:
+        quiz_dict['options'] = split_options(quiz.options)
+    if not (user and user.role in QUIZ_AUTHOR_ROLES):
+        quiz_dict.pop('correct_answer', None)
+    return quiz_dict
+
+@app.get("/quizzes", response_model=List[QuizOut], response_model_exclude_unset=True)
+async def get_quizzes(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, deprecated=True),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     lesson_id: Optional[int] = None,
-    db: Session = Depends(get_db)
+    tag: Optional[List[str]] = Query(None),
+    match: str = Query("any", pattern="^(any|all)$"),
+    fields: Optional[List[str]] = Query(None),
+    view: str = Query("full", pattern="^(full|summary)$"),
+    current_user: Optional[User] = Depends(get_optional_user_async),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    query = db.query(Quiz)
+    # Lean path: row tuples -> compiled encoder -> orjson; QuizOut only documents the shape
+    selected = quiz_fields.resolve(fields, view)
+    author = bool(current_user and current_user.role in QUIZ_AUTHOR_ROLES)
+    if not author:
+        selected = tuple(field for field in selected if field != 'correct_answer')
+    # Authors and players get different bodies for the same URL
+    catalog = await catalog_check_async(request, db, "quizzes", variant=(author,), private=True)
+    if catalog.not_modified:
+        return catalog.response_304()
+    catalog.apply(response)
+    query = quiz_fields.select(selected)
     
     if lesson_id:
-        query = query.filter(Quiz.lesson_id == lesson_id)
-    
-    quizzes = query.offset(skip).limit(limit).all()
+        query = query.where(Quiz.lesson_id == lesson_id)
+    if split_values(tag):
+        query = query.where(match_values(Quiz, "tags", split_values(tag), match))
     
-    # Convert options string to list
-    result = []
-    for quiz in quizzes:
-        quiz_dict = {c.name: getattr(quiz, c.name) for c in quiz.__table__.columns}
-        quiz_dict['options'] = quiz.options.split(',') if quiz.options else []
-        quiz_dict['tags'] = quiz.tags.split(',') if quiz.tags else []
-        result.append(quiz_dict)
+    rows = page((await db.execute(keyset(query, Quiz.id, cursor, limit, skip))).all(), limit, response)
     
-    return result
+    return json_rows(quiz_fields.encoder(selected), rows, response)
 
 @app.post("/quizzes", response_model=QuizOut, status_code=status.HTTP_201_CREATED)
 def create_quiz(
@@ -914,7 +1288,6 @@ def create_quiz(
     # Convert lists to strings
     quiz_dict = quiz.dict()
     quiz_dict['options'] = ','.join(quiz_dict['options'])
-    quiz_dict['tags'] = ','.join(quiz_dict['tags']) if quiz_dict['tags'] else ''
     
     db_quiz = Quiz(**quiz_dict)
     
@@ -929,94 +1302,88 @@ def create_quiz(
     # Convert back to list for response
     quiz_out = {c.name: getattr(db_quiz, c.name) for c in db_quiz.__table__.columns}
     quiz_out['options'] = quiz.options
-    quiz_out['tags'] = quiz.tags
     
     return quiz_out
 
 @app.post("/quizzes/bulk", status_code=status.HTTP_201_CREATED)
-def create_quizzes_bulk(
-    quiz_bulk: QuizBulkCreate,
+async def create_quizzes_bulk(
+    request: Request,
+    lesson_id: Optional[int] = None,
+    mode: str = Query("strict", pattern="^(strict|lenient)$"),
+    format: Optional[str] = Query(None, pattern="^(json|ndjson|csv)$"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    # Body is JSON ({"lesson_id", "quizzes"}), NDJSON or CSV by Content-Type (or ?format=); see quiz_ingest
     if current_user.role not in ['teacher', 'parent', 'admin']:
         raise HTTPException(status_code=403, detail="Not authorized to create quizzes")
     
-    created_quizzes = []
+    try:
+        rows = await iter_rows(request.stream(), format or detect_format(request.headers.get("content-type")), lesson_id)
+    except TooManyRows as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not rows:
+        raise HTTPException(status_code=400, detail="No questions in request")
     
-    for quiz_data in quiz_bulk.questions:
-        # Convert options list to string
-        quiz_dict = quiz_data.dict()
-        quiz_dict['options'] = ','.join(quiz_dict['options'])
-        quiz_dict['lesson_id'] = quiz_bulk.lesson_id
-        
-        db_quiz = Quiz(**quiz_dict)
-        
-        try:
-            db.add(db_quiz)
-            db.commit()
-            db.refresh(db_quiz)
-            
-            # Convert back to list for response
-            quiz_out = {c.name: getattr(db_quiz, c.name) for c in db_quiz.__table__.columns}
-            quiz_out['options'] = quiz_data.options
-            created_quizzes.append(quiz_out)
-            
-        except IntegrityError:
-            db.rollback()
-            raise HTTPException(status_code=400, detail=f"Failed to create quiz: {quiz_data.question}")
-    
-    return {"message": f"Created {len(created_quizzes)} quizzes", "quizzes": created_quizzes}
-
-@app.get("/quizzes/{quiz_id}", response_model=QuizOut)
-def get_quiz(quiz_id: int, db: Session = Depends(get_db)):
+    try:
+        results = await run_in_threadpool(ingest_quizzes, db, Quiz, Lesson, QuizCreate, rows, mode == "lenient")
+    except IntegrityError:
+        raise HTTPException(status_code=400, detail="Failed to create quizzes")
+    summary = summarize(results)
+    if not summary["count"]:
+        raise HTTPException(status_code=422, detail={"message": "No quizzes created", "mode": mode, **summary})
+    answer_keys.invalidate_lessons(*{r["lesson_id"] for r in results if r["status"] == "created"})
+    
+    return {"message": f"Created {summary['count']} quizzes", "mode": mode, **summary}
+
+@app.get("/quizzes/{quiz_id}", response_model=QuizOut, response_model_exclude_unset=True)
+def get_quiz(
+    quiz_id: int,
+    request: Request,
+    response: Response,
+    current_user: Optional[User] = Depends(get_optional_user),
+    db: Session = Depends(get_read_db)
+):
+    author = bool(current_user and current_user.role in QUIZ_AUTHOR_ROLES)
+    catalog = catalog_check(request, db, "quizzes", variant=(author,), private=True)
+    if catalog.not_modified:
+        return catalog.response_304()
+    catalog.apply(response)
     quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
     if not quiz:
         raise HTTPException(status_code=404, detail="Quiz not found")
     
-    quiz_dict = {c.name: getattr(quiz, c.name) for c in quiz.__table__.columns}
-    quiz_dict['options'] = quiz.options.split(',') if quiz.options else []
-    
-    return quiz_dict
+    return quiz_out(quiz, current_user)
 
-@app.post("/quizzes/bulk", status_code=status.HTTP_201_CREATED)
-def create_quizzes_bulk(
-    bulk: QuizBulkCreate,
+@app.post("/quizzes/{quiz_id}/submit")
+def submit_quiz(
+    quiz_id: int,
+    submission: QuizSubmission,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if current_user.role not in ['teacher', 'parent', 'admin']:
-        raise HTTPException(status_code=403, detail="Not authorized to create quizzes")
-    
-    created_quizzes = []
+    # Grades every question of the quiz's lesson against the cached answer keys
+    found = answer_keys.for_quiz(db, quiz_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Quiz not found")
+    lesson_id, keys = found
+    unknown = sorted(set(submission.answers) - set(keys))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Answers for questions outside this quiz: {unknown}")
     
-    for quiz_data in bulk.quizzes:
-        # Convert lists to strings
-        quiz_dict = quiz_data.dict()
-        quiz_dict['lesson_id'] = bulk.lesson_id
-        quiz_dict['options'] = ','.join(quiz_dict['options'])
-        
-        db_quiz = Quiz(**quiz_dict)
-        
-        try:
-            db.add(db_quiz)
-            db.commit()
-            db.refresh(db_quiz)
-            
-            # Convert back to list for response
-            quiz_out = {c.name: getattr(db_quiz, c.name) for c in db_quiz.__table__.columns}
-            quiz_out['options'] = quiz_data.options
-            created_quizzes.append(quiz_out)
-            
-        except IntegrityError:
-            db.rollback()
-            raise HTTPException(status_code=400, detail=f"Failed to create quiz: {quiz_data.question}")
+    graded = grade_attempt(keys, submission.answers)
+    try:
+        attempt_id = save_attempt(
+            db, QuizAttempt, QuizAnswer, current_user.id, quiz_id, lesson_id, graded, datetime.utcnow()
+        )
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="Failed to save quiz attempt")
     
-    return {
-        "message": f"Created {len(created_quizzes)} quizzes",
-        "count": len(created_quizzes),
-        "quizzes": created_quizzes
-    }
+    return {"attempt_id": attempt_id, "quiz_id": quiz_id, "lesson_id": lesson_id, **graded}
 
 # Template endpoints
 class TemplateCreate(BaseModel):
@@ -1047,6 +1414,29 @@ def create_template(
 
 # ==================== PROGRESS ENDPOINTS ====================
 
+def save_completion(db: Session, user: User, lesson: Lesson, score: Optional[int], error_detail: str):
+    """Complete a lesson for user and commit; returns (points_awarded, total_points).
+
+    Upserts the progress row and increments points in SQL, in one transaction;
+    retries and double-clicks award the lesson's points only once.
+    """
+    try:
+        points_awarded, total_points, outcome, previous_score = record_completion(
+            db, User, Progress, user.id, lesson.id, lesson.points or 0, score
+        )
+        record_completion_stats(db, UserStats, user.id, outcome, score, previous_score)
+        if points_awarded:
+            award_points(db, PointsLedger, PointsRollup, user.id, points_awarded, LESSON_REASON, lesson.id)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=error_detail)
+    principal_cache.invalidate(user.username)
+    if points_awarded:
+        leaderboard_index.update_user(user, total_points)
+        response_cache.invalidate("leaderboard")
+    return points_awarded, total_points
+
 @app.post("/progress", response_model=ProgressOut, status_code=status.HTTP_201_CREATED)
 def create_progress(
     progress: ProgressCreate,
@@ -1070,6 +1460,28 @@ def create_progress(
     if not progress.user_id:
         progress.user_id = current_user.id
     
+    if progress.lesson_id is not None:
+        # One row per (user, lesson): repeats and retries update it instead of failing on the unique index
+        lesson = db.query(Lesson).filter(Lesson.id == progress.lesson_id).first()
+        if not lesson:
+            raise HTTPException(status_code=404, detail="Lesson not found")
+        if progress.completed:
+            user = current_user if progress.user_id == current_user.id else db.get(User, progress.user_id)
+            if not user:
+                raise HTTPException(status_code=404, detail="User not found")
+            save_completion(db, user, lesson, progress.score, "Failed to create progress")
+        else:
+            try:
+                if record_attempt(db, Progress, progress.user_id, progress.lesson_id, progress.score):
+                    bump_stats(db, UserStats, progress.user_id, attempted=1)
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+                raise HTTPException(status_code=400, detail="Failed to create progress")
+        return db.query(Progress).filter(
+            Progress.user_id == progress.user_id, Progress.lesson_id == progress.lesson_id
+        ).first()
+    
     db_progress = Progress(**progress.dict())
     
     if db_progress.completed:
@@ -1077,6 +1489,11 @@ def create_progress(
     
     try:
         db.add(db_progress)
+        bump_stats(
+            db, UserStats, progress.user_id, attempted=1,
+            completed=1 if db_progress.completed else 0,
+            score=(db_progress.score or 0) if db_progress.completed else 0,
+        )
         db.commit()
         db.refresh(db_progress)
     except IntegrityError:
@@ -1088,10 +1505,12 @@ def create_progress(
 @app.get("/progress/user/{user_id}", response_model=List[ProgressOut])
 def get_user_progress(
     user_id: int,
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, deprecated=True),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     # Check authorization
     if current_user.id != user_id and current_user.role not in ['parent', 'admin', 'teacher']:  # Add teacher
@@ -1115,19 +1534,20 @@ def get_user_progress(
         if not student:
             raise HTTPException(status_code=403, detail="Not authorized to view this user's progress")
     
-    progress_list = db.query(Progress).filter(Progress.user_id == user_id).offset(skip).limit(limit).all()
-    return progress_list
+    query = db.query(Progress).filter(Progress.user_id == user_id)
+    return page(keyset(query, Progress.id, cursor, limit, skip).all(), limit, response)
 
 @app.get("/progress/lesson/{lesson_id}")
-def get_lesson_progress(
+async def get_lesson_progress(
     lesson_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    progress = db.query(Progress).filter(
+    result = await db.execute(select(Progress).where(
         Progress.lesson_id == lesson_id,
         Progress.user_id == current_user.id
-    ).first()
+    ))
+    progress = result.scalars().first()
     
     if not progress:
         return {"completed": False, "score": 0}
@@ -1150,67 +1570,136 @@ def complete_lesson(
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
     
-    # Check if progress already exists
-    existing_progress = db.query(Progress).filter(
-        Progress.lesson_id == lesson_id,
-        Progress.user_id == current_user.id
-    ).first()
-    
-    if existing_progress:
-        # Update existing progress
-        existing_progress.completed = True
-        existing_progress.score = score
-        existing_progress.completed_at = datetime.utcnow()
-    else:
-        # Create new progress
-        new_progress = Progress(
-            user_id=current_user.id,
-            lesson_id=lesson_id,
-            score=score,
-            completed=True,
-            completed_at=datetime.utcnow()
-        )
-        db.add(new_progress)
-    
-    # Award points to user
-    current_user.points = (current_user.points or 0) + lesson.points
+    points_awarded, total_points = save_completion(db, current_user, lesson, score, "Failed to save progress")
     
-    try:
-        db.commit()
-        
-        # Re-fetch user to get updated points
-        db.refresh(current_user)
-        
-        return {
-            "message": "Lesson completed successfully",
-            "points_awarded": lesson.points,
-            "total_points": current_user.points,
-            "score": score
-        }
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Failed to save progress")
+    return {
+        "message": "Lesson completed successfully" if points_awarded else "Lesson already completed",
+        "points_awarded": points_awarded,
+        "total_points": total_points,
+        "score": score
+    }
+# ==================== CURRICULUM ENDPOINT ====================
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+@app.get("/curriculum/tree")
+def get_curriculum_tree(
+    request: Request,
+    country_id: Optional[int] = None,
+    grade: Optional[int] = None,
+    lessons: bool = False,
+    db: Session = Depends(get_read_db)
+):
+    snapshot = curriculum_tree.get(db, country_id, grade, lessons)
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, snapshot.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
 # ==================== LEADERBOARD ENDPOINT ====================
+def rebuild_leaderboard_index():
+    db = SessionLocal()
+    try:
+        attributes = [attr for attr in SCOPE_ATTRIBUTES if hasattr(User, attr)]
+        rows = db.execute(select(User.id, User.points, *(getattr(User, attr) for attr in attributes))).all()
+        leaderboard_index.rebuild(rows, attributes)
+    finally:
+        db.close()
+
+def _leaderboard_scope(role: Optional[str], school_id: Optional[int], island_id: Optional[int]):
+    given = [(attr, value) for attr, value in (("role", role), ("school_id", school_id), ("island_id", island_id)) if value is not None]
+    if len(given) > 1:
+        raise HTTPException(status_code=400, detail="Use one of role, school_id or island_id")
+    return given[0] if given else GLOBAL_SCOPE
+
+def _leaderboard_entry(user: User, rank: int, points: int):
+    return {
+        "rank": rank,
+        "user_id": user.id,
+        "username": user.username,
+        "points": points or 0,
+        "level": user.level or "Explorer",
+        "avatar": user.avatar or "default_avatar.png",
+        "role": user.role
+    }
+
+async def _entries_from_index(db: AsyncSession, ranked: List[dict]):
+    users = {u.id: u for u in (await db.execute(select(User).where(User.id.in_([r["user_id"] for r in ranked])))).scalars()}
+    return [_leaderboard_entry(users[r["user_id"]], r["rank"], r["points"]) for r in ranked if r["user_id"] in users]
+
 @app.get("/leaderboard")
-def get_leaderboard(
+@response_cache.coalesce
+async def get_leaderboard(
+    request: Request,
     limit: int = 50,
-    db: Session = Depends(get_db)
+    window: str = Query("all", pattern="^(day|week|term|all)$"),
+    role: Optional[str] = None,
+    school_id: Optional[int] = None,
+    island_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    users = db.query(User).order_by(User.points.desc()).limit(limit).all()
-    
-    leaderboard = []
-    for i, user in enumerate(users):
-        leaderboard.append({
-            "rank": i + 1,
-            "user_id": user.id,
-            "username": user.username,
-            "points": user.points or 0,
-            "level": user.level or "Explorer",
-            "avatar": user.avatar or "default_avatar.png",
-            "role": user.role
-        })
-    
-    return {"leaderboard": leaderboard}
+    scope = _leaderboard_scope(role, school_id, island_id)
+    # Current day/week/term bucket; part of the cache key so a rollover starts a fresh board
+    period = bucket_keys(datetime.utcnow())[window] if window != "all" else None
+    cached = await response_cache.lookup_async("/leaderboard", request_key(request), ("leaderboard",), variant=(period,))
+    if cached.hit:
+        return cached.response()
+    if window == "all" and leaderboard_index.ready:
+        # Lifetime board straight from the in-memory index
+        leaderboard = await _entries_from_index(db, leaderboard_index.top(limit, scope))
+        return await cached.store_async({"leaderboard": leaderboard, "window": window, "period": period})
+    
+    scope_filter = []
+    if scope != GLOBAL_SCOPE:
+        if not hasattr(User, scope[0]):
+            return {"leaderboard": [], "window": window, "period": period}
+        scope_filter.append(getattr(User, scope[0]) == scope[1])
+    if window == "all":
+        rows = (await db.execute(
+            select(User, User.points).where(*scope_filter).order_by(User.points.desc(), User.id).limit(limit)
+        )).all()
+    else:
+        # Current bucket of the rollups, never the ledger itself
+        rows = (await db.execute(
+            select(User, PointsRollup.points)
+            .join(PointsRollup, PointsRollup.user_id == User.id)
+            .where(PointsRollup.bucket_kind == window, PointsRollup.bucket_key == period, *scope_filter)
+            .order_by(PointsRollup.points.desc(), User.id)
+            .limit(limit)
+        )).all()
+    
+    leaderboard = [_leaderboard_entry(user, i + 1, points) for i, (user, points) in enumerate(rows)]
+    return await cached.store_async({"leaderboard": leaderboard, "window": window, "period": period})
+
+@app.get("/leaderboard/me")
+async def get_my_rank(
+    radius: int = Query(5, ge=0, le=50),
+    role: Optional[str] = None,
+    school_id: Optional[int] = None,
+    island_id: Optional[int] = None,
+    current_user: User = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    if not leaderboard_index.ready:
+        raise HTTPException(status_code=503, detail="Leaderboard is rebuilding", headers={"Retry-After": "5"})
+    scope = _leaderboard_scope(role, school_id, island_id)
+    return {
+        "rank": leaderboard_index.rank_of(current_user.id, scope),
+        "total": leaderboard_index.size(scope),
+        "neighbours": await _entries_from_index(db, leaderboard_index.around(current_user.id, radius, scope)),
+    }
+
+@app.post("/admin/leaderboard/rebuild")
+async def rebuild_leaderboard(current_user: User = Depends(get_current_user)):
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    await run_in_threadpool(rebuild_leaderboard_index)
+    response_cache.invalidate("leaderboard")
+    return leaderboard_index.stats()
 
 
 # ==================== MEDIA UPLOAD ENDPOINTS ====================
@@ -1297,7 +1786,7 @@ async def upload_media(
     }
 
 @app.get("/media/{lesson_id}", response_model=List[dict])
-def get_lesson_media(lesson_id: int, db: Session = Depends(get_db)):
+def get_lesson_media(lesson_id: int, db: Session = Depends(get_read_db)):
     media_list = db.query(Media).filter(Media.lesson_id == lesson_id).all()
     return [
         {
@@ -1315,7 +1804,7 @@ def get_lesson_media(lesson_id: int, db: Session = Depends(get_db)):
 @app.get("/my-students", response_model=List[UserOut])
 def get_my_students(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     if current_user.role not in ['parent', 'teacher']:  # Allow teachers too
         raise HTTPException(status_code=403, detail="Only parents and teachers can view their students")
@@ -1330,7 +1819,7 @@ def get_my_students(
     return students
 
 @app.post("/register-student", response_model=UserOut, status_code=status.HTTP_201_CREATED)
-def register_student(
+async def register_student(
     student: UserCreate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -1338,18 +1827,10 @@ def register_student(
     if current_user.role != 'parent':
         raise HTTPException(status_code=403, detail="Only parents can register students")
     
-    # Check if username exists
-    existing_user = db.query(User).filter(User.username == student.username).first()
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Username already exists")
-    
-    # Check if email exists
-    existing_email = db.query(User).filter(User.email == student.email).first()
-    if existing_email:
-        raise HTTPException(status_code=400, detail="Email already registered")
+    await run_in_threadpool(_check_new_user, db, student.username, student.email)
     
     # Create student with parent relationship
-    hashed_password = get_password_hash(student.password)
+    hashed_password = await hashing_pool.hash(pwd_context, student.password)
     db_student = User(
         username=student.username,
         email=student.email,
@@ -1358,15 +1839,7 @@ def register_student(
         parent_id=current_user.id
     )
     
-    try:
-        db.add(db_student)
-        db.commit()
-        db.refresh(db_student)
-    except IntegrityError:
-        db.rollback()
-        raise HTTPException(status_code=400, detail="Failed to register student")
-    
-    return db_student
+    return await run_in_threadpool(_save_new_user, db, db_student, "Failed to register student")
 
 # ==================== REWARD ENDPOINTS ====================
 
@@ -1400,6 +1873,39 @@ def create_reward(
     
     return db_reward
 
+# ==================== ADMIN ENDPOINTS ====================
+
+@app.post("/admin/roster/import")
+async def import_roster_file(
+    file: UploadFile = File(...),
+    format: Optional[str] = None,
+    partial: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    fmt = format or ('ndjson' if (file.filename or '').endswith(('.ndjson', '.jsonl')) else 'csv')
+    try:
+        rows = parse_roster(await file.read(), fmt)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    try:
+        results = await run_in_threadpool(import_roster, db, User, pwd_context, rows, partial)
+    except IntegrityError:
+        # A concurrent registration took one of the usernames/emails after validation
+        raise HTTPException(status_code=409, detail="Roster conflicts with users created during the import, please retry")
+    principal_cache.invalidate(*(r["username"] for r in results if r["status"] == "created"))
+    for r in results:
+        if r["status"] == "created":
+            leaderboard_index.update(r["id"], 0, (("role", r["role"]),))
+    response_cache.invalidate("leaderboard")
+    
+    # One NDJSON line per roster row, then a summary line
+    return StreamingResponse(iter_report(results), media_type="application/x-ndjson")
+
 # ==================== PARENT DASHBOARD ENDPOINTS ====================
 @app.get("/parent/dashboard")
 async def temp_parent_dashboard():
@@ -1414,12 +1920,28 @@ class SubjectOut(BaseModel):
         from_attributes = True  # Changed from orm_mode to from_attributes for Pydantic v2
 
 @app.get("/subjects", response_model=List[SubjectOut])
-def get_subjects(db: Session = Depends(get_db)):
+@response_cache.coalesce
+def get_subjects(request: Request, response: Response, db: Session = Depends(get_read_db)):
+    catalog = catalog_check(request, db, "subjects")
+    if catalog.not_modified:
+        return catalog.response_304()
+    catalog.apply(response)
+    cached = response_cache.lookup("/subjects", request_key(request), ("subjects",))
+    if cached.hit:
+        return cached.response(response)
     subjects = db.query(Subject).all()  # Changed from models.Subject to Subject
-    return subjects
+    return cached.store([{"id": subject.id, "name": subject.name} for subject in subjects], response)
 
 @app.get("/subjects/enhanced", response_model=List[SubjectOutEnhanced])
-def get_subjects_enhanced(db: Session = Depends(get_db)):
+@response_cache.coalesce
+def get_subjects_enhanced(request: Request, response: Response, db: Session = Depends(get_read_db)):
+    catalog = catalog_check(request, db, "subjects")
+    if catalog.not_modified:
+        return catalog.response_304()
+    catalog.apply(response)
+    cached = response_cache.lookup("/subjects/enhanced", request_key(request), ("subjects",))
+    if cached.hit:
+        return cached.response(response)
     # Map subjects to colors and icons
     subject_mapping = {
         "Math": {"color": "#3B82F6", "icon": "calculator"},
@@ -1442,26 +1964,28 @@ def get_subjects_enhanced(db: Session = Depends(get_db)):
             "icon": mapping["icon"]
         })
     
-    return enhanced_subjects
+    return cached.store(enhanced_subjects, response)
 
 # ==================== HEALTH AND UTILITY ENDPOINTS ====================
 @app.get("/user/stats/me")
 def get_my_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    progress_records = db.query(Progress).filter(Progress.user_id == current_user.id).all()
-    completed = [p for p in progress_records if p.completed]
-    
+    return stats_payload(current_user, db.get(UserStats, current_user.id))
+
+@app.get("/metrics", tags=["Health"])
+def get_metrics():
     return {
-        "user_id": current_user.id,
-        "username": current_user.username,
-        "total_points": current_user.points or 0,
-        "level": current_user.level or "Explorer",
-        "streak": current_user.streak or 0,
-        "completed_lessons": len(completed),
-        "total_lessons_attempted": len(progress_records),
-        "average_score": sum([p.score or 0 for p in completed]) / len(completed) if completed else 0
+        "principal_cache": principal_cache.stats(),
+        "password_hashing": hashing_pool.stats(),
+        "token_cache": token_cache.stats(),
+        "db_pool": pool_stats(engine),
+        "db_pool_async": pool_stats(async_engine),
+        "read_replicas": replica_router.stats(),
+        "leaderboard_index": leaderboard_index.stats(),
+        "curriculum_tree": curriculum_tree.stats(),
+        "response_cache": response_cache.stats(),
     }
 
 @app.get("/", tags=["Health"])
@@ -1470,31 +1994,20 @@ def read_root():
 
 @app.get("/health", tags=["Health"])
 def health_check(db: Session = Depends(get_db)):
+    pool = pool_stats(engine)
     try:
-        db.execute("SELECT 1")
-        return {"status": "healthy", "database": "connected"}
+        db.execute(text("SELECT 1"))
+        return {"status": "degraded" if pool.get("saturated") else "healthy", "database": "connected", "pool": pool}
     except Exception as e:
-        return {"status": "unhealthy", "database": "disconnected", "error": str(e)}
+        return {"status": "unhealthy", "database": "disconnected", "error": str(e), "pool": pool}
 
 @app.get("/user/{user_id}/stats")
-def get_user_stats(user_id: int, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+def get_user_stats(user_id: int, db: Session = Depends(get_read_db)):
+    row = db.query(User, UserStats).outerjoin(UserStats, UserStats.user_id == User.id).filter(User.id == user_id).first()
+    if not row:
         raise HTTPException(status_code=404, detail="User not found")
     
-    progress_records = db.query(Progress).filter(Progress.user_id == user_id).all()
-    completed = [p for p in progress_records if p.completed]
-    
-    return {
-        "user_id": user_id,
-        "username": user.username,
-        "total_points": user.points,
-        "level": user.level,
-        "streak": user.streak,
-        "completed_lessons": len(completed),
-        "total_lessons_attempted": len(progress_records),
-        "average_score": sum([p.score or 0 for p in completed]) / len(completed) if completed else 0
-    }
+    return stats_payload(*row)
 
 # ==================== STARTUP EVENT ====================
 
@@ -1503,12 +2016,36 @@ async def startup_event():
     # Create tables
     try:
         Base.metadata.create_all(bind=engine)
+        migrate_multivalue(engine)
+        migrate_lesson_path(engine)
+        migrate_lesson_search(engine)
+        ensure_unique_progress(engine)
+        ensure_user_stats(engine, UserStats, Progress)
         print(" Database tables created successfully!")
     except Exception as e:
         print(f" Failed to create database tables: {e}")
         # Try to continue without tables for now
         pass
     
+    # Tie the password hashing cost to this machine's CPU budget
+    hash_params = await run_in_threadpool(load_or_calibrate)
+    if hash_params:
+        apply_params(pwd_context, hash_params)
+        print(f" Password hashing calibrated: {hash_params['argon2']}")
+    
+    try:
+        await run_in_threadpool(rebuild_leaderboard_index)
+        print(f" Leaderboard index built ({leaderboard_index.size()} users)")
+    except Exception as e:
+        print(f" Leaderboard index not built, falling back to SQL: {e}")
+    
     # Create uploads directory if it doesn't exist
     UPLOAD_DIR.mkdir(exist_ok=True)
-    print(" Uploads directory ready!")
\ No newline at end of file
+    print(" Uploads directory ready!")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    hashing_pool.shutdown()
+    await async_engine.dispose()
+    for replica in replica_router.replicas:
+        await replica.async_engine.dispose()
\ No newline at end of file
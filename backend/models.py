@@ -1,7 +1,13 @@
 # backend/models.py
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, TIMESTAMP, JSON
+from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, TIMESTAMP, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
+
+from multivalue import StringArray, value_table, track_values
+from progress_store import PROGRESS_UNIQUE_INDEX
+from lesson_path import PATH_INDEXES as LESSON_PATH_INDEXES, track_lesson_path
+from lesson_search import track_lesson_search
+from table_versions import version_table, track_versions
 
 Base = declarative_base()
 
@@ -93,18 +99,23 @@ class Lesson(Base):
     id = Column(Integer, primary_key=True)
     concept_id = Column(Integer, ForeignKey('concepts.id'), nullable=True)
     title = Column(String(150), nullable=False)
-    content_html = Column(Text, nullable=False)
+    # The lesson body; only loaded when asked for (undefer / load_only), see fieldsets.py
+    content_html = deferred(Column(Text, nullable=False))
     creator_id = Column(Integer, ForeignKey('users.id'), nullable=True)
     created_at = Column(TIMESTAMP, server_default='CURRENT_TIMESTAMP')
     category = Column(String(50), default='General')
     difficulty = Column(String(20), default='beginner')
     estimated_time = Column(Integer, default=30)
     points = Column(Integer, default=50)
-    grade_levels = Column(Text, default='')
+    grade_levels = Column(StringArray, default=list)
     description = Column(Text, default='')
     objectives = Column(Text, default='')
     prerequisites = Column(Text, default='')
-    tags = Column(Text, default='')
+    tags = Column(StringArray, default=list)
+    # Curriculum path of the concept, copied for filtering (see lesson_path.py)
+    subject_id = Column(Integer, nullable=True)
+    grade_level = Column(Integer, nullable=True)
+    term_id = Column(Integer, nullable=True)
     
     concept = relationship("Concept", back_populates="lessons")
     creator = relationship("User", back_populates="lessons_created")
@@ -112,6 +123,8 @@ class Lesson(Base):
     media = relationship("Media", back_populates="lesson")
     progress = relationship("Progress", back_populates="lesson")
     quizzes = relationship("Quiz", back_populates="lesson")
+    
+    __table_args__ = tuple(Index(name, *columns) for name, columns in LESSON_PATH_INDEXES.items())
 
 class GameEngine(Base):
     __tablename__ = "game_engines"
@@ -155,6 +168,16 @@ class Progress(Base):
     completed_at = Column(TIMESTAMP, nullable=True)
     user = relationship("User", back_populates="progress")
     lesson = relationship("Lesson", back_populates="progress")
+    __table_args__ = (Index(PROGRESS_UNIQUE_INDEX, "user_id", "lesson_id", unique=True),)
+
+# Progress counters per user, maintained with every Progress write (see user_stats.py)
+class UserStats(Base):
+    __tablename__ = "user_stats"
+    user_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), primary_key=True)
+    completed_count = Column(Integer, nullable=False, default=0)
+    attempted_count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Integer, nullable=False, default=0)
+    last_activity_at = Column(TIMESTAMP, nullable=True)
 
 class Quiz(Base):
     __tablename__ = "quizzes"
@@ -170,9 +193,32 @@ class Quiz(Base):
     time_limit = Column(Integer, default=0)
     image_url = Column(Text, default='')
     audio_url = Column(Text, default='')
-    tags = Column(Text, default='')
+    tags = Column(StringArray, default=list)
     lesson = relationship("Lesson", back_populates="quizzes")
 
+# One graded submission of a quiz (all questions of its lesson) and its per-question answers
+class QuizAttempt(Base):
+    __tablename__ = "quiz_attempts"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id', ondelete="CASCADE"), nullable=False)
+    quiz_id = Column(Integer, ForeignKey('quizzes.id', ondelete="SET NULL"), nullable=True)
+    lesson_id = Column(Integer, ForeignKey('lessons.id', ondelete="SET NULL"), nullable=True)
+    score = Column(Integer, nullable=False)
+    correct_count = Column(Integer, nullable=False)
+    total_count = Column(Integer, nullable=False)
+    points_earned = Column(Integer, nullable=False, default=0)
+    submitted_at = Column(TIMESTAMP, nullable=False)
+    __table_args__ = (Index("idx_quiz_attempts_user", "user_id", "id"),)
+
+class QuizAnswer(Base):
+    __tablename__ = "quiz_answers"
+    id = Column(Integer, primary_key=True)
+    attempt_id = Column(Integer, ForeignKey('quiz_attempts.id', ondelete="CASCADE"), nullable=False, index=True)
+    quiz_id = Column(Integer, ForeignKey('quizzes.id', ondelete="CASCADE"), nullable=True)
+    answer = Column(Text, nullable=True)
+    is_correct = Column(Boolean, nullable=False)
+    points = Column(Integer, nullable=False, default=0)
+
 class Reward(Base):
     __tablename__ = "rewards"
     id = Column(Integer, primary_key=True)
@@ -204,4 +250,21 @@ class Assignment(Base):
     student_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     parent_id = Column(Integer, ForeignKey('users.id'), nullable=True)
     teacher_id = Column(Integer, ForeignKey('users.id'), nullable=True)
-    created_at = Column(TIMESTAMP, server_default='CURRENT_TIMESTAMP')
\ No newline at end of file
+    created_at = Column(TIMESTAMP, server_default='CURRENT_TIMESTAMP')
+
+# Indexed tag/grade lookups when the database has no array columns (see multivalue.py)
+lesson_values = value_table(Base.metadata, "lesson_values", "lessons")
+quiz_values = value_table(Base.metadata, "quiz_values", "quizzes")
+track_values(Lesson, lesson_values, {"tags": "tag", "grade_levels": "grade"})
+track_values(Quiz, quiz_values, {"tags": "tag"})
+track_lesson_path(Lesson, Concept, Topic, CurriculumSubject)
+track_lesson_search(Lesson)
+table_versions = version_table(Base.metadata)
+track_versions(Lesson)
+track_versions(Quiz)
+track_versions(Game)
+track_versions(Subject)
+for _model in (Concept, Topic, CurriculumSubject):
+    track_versions(_model, "lessons")
+for _model in (Country, SchoolYear, Term):
+    track_versions(_model, "curriculum")
@@ -0,0 +1,176 @@
+# backend/multivalue.py
+"""Multi-valued string columns (lesson tags/grade levels, quiz tags).
+
+On Postgres the values live in a text[] column with a GIN index and are
+filtered with && (any) / @> (all). Other databases keep the legacy
+comma-joined text column for display plus a (kind, value, owner_id) side
+table, maintained by mapper events, for indexed filtering.
+
+Usage: python multivalue.py   (migrate existing comma-joined data in place)
+"""
+from sqlalchemy import (
+    Column, ForeignKey, Index, Integer, MetaData, String, Table, Text,
+    delete, event, func, inspect, insert, select, text,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, array
+from sqlalchemy.types import TypeDecorator
+from typing import Any, Dict, Iterable, List, Optional
+
+from database import engine
+
+USE_ARRAYS = engine.dialect.name == "postgresql"
+
+# model class -> (side table, {attribute name: kind})
+_tracked: Dict[type, tuple] = {}
+
+
+def to_list(value: Any) -> List[str]:
+    """Normalise a list or comma-joined string into stripped, de-duplicated values"""
+    if value is None:
+        return []
+    items = value.split(",") if isinstance(value, str) else value
+    seen = []
+    for item in items:
+        item = str(item).strip()
+        if item and item not in seen:
+            seen.append(item)
+    return seen
+
+
+def split_values(raw: Optional[Iterable[str]]) -> List[str]:
+    """Query-string values: ?tag=a&tag=b and ?tag=a,b both mean [a, b]"""
+    return to_list([part for value in raw or [] for part in value.split(",")])
+
+
+class StringArray(TypeDecorator):
+    """A list of strings: text[] on Postgres, comma-joined text elsewhere"""
+
+    impl = Text
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(ARRAY(Text))
+        return dialect.type_descriptor(Text())
+
+    def process_bind_param(self, value, dialect):
+        values = to_list(value)
+        return values if dialect.name == "postgresql" else ",".join(values)
+
+    def process_result_value(self, value, dialect):
+        return to_list(value)
+
+
+def value_table(metadata: MetaData, name: str, owner_table: str) -> Table:
+    """Side table used for filtering when the database has no array columns.
+
+    On Postgres the table is built on a private MetaData so create_all never creates it.
+    """
+    return Table(
+        name,
+        MetaData() if USE_ARRAYS else metadata,
+        Column("owner_id", Integer, ForeignKey(f"{owner_table}.id", ondelete="CASCADE"), primary_key=True),
+        Column("kind", String(10), primary_key=True),
+        Column("value", String(100), primary_key=True),
+        Index(f"idx_{name}_lookup", "kind", "value", "owner_id"),
+    )
+
+
+def _sync(connection, side: Table, fields: Dict[str, str], target, only_changed: bool):
+    state = inspect(target)
+    for attr, kind in fields.items():
+        if only_changed and not state.attrs[attr].history.has_changes():
+            continue
+        connection.execute(delete(side).where(side.c.owner_id == target.id, side.c.kind == kind))
+        values = to_list(getattr(target, attr))
+        if values:
+            connection.execute(insert(side), [{"owner_id": target.id, "kind": kind, "value": v} for v in values])
+
+
+def track_values(model, side: Table, fields: Dict[str, str]):
+    """Keep a model's side table in step with ORM inserts, updates and deletes.
+
+    Core bulk inserts bypass these events and must call sync_rows() themselves.
+    """
+    _tracked[model] = (side, fields)
+    if USE_ARRAYS:
+        return
+
+    @event.listens_for(model, "after_insert")
+    def _after_insert(mapper, connection, target):
+        _sync(connection, side, fields, target, only_changed=False)
+
+    @event.listens_for(model, "after_update")
+    def _after_update(mapper, connection, target):
+        _sync(connection, side, fields, target, only_changed=True)
+
+    @event.listens_for(model, "after_delete")
+    def _after_delete(mapper, connection, target):
+        connection.execute(delete(side).where(side.c.owner_id == target.id))
+
+
+def sync_rows(connection, model, rows: List[Dict[str, Any]]):
+    """Side-table rows for records inserted with Core (each row needs its id)"""
+    if USE_ARRAYS or model not in _tracked:
+        return
+    side, fields = _tracked[model]
+    values = [
+        {"owner_id": row["id"], "kind": kind, "value": v}
+        for row in rows
+        for attr, kind in fields.items()
+        for v in to_list(row.get(attr))
+    ]
+    if values:
+        connection.execute(insert(side), values)
+
+
+def match_values(model, attr: str, values: List[str], match: str = "any"):
+    """WHERE clause for rows whose attr contains any (or all) of the values"""
+    if USE_ARRAYS:
+        operator = "@>" if match == "all" else "&&"
+        return getattr(model, attr).op(operator, is_comparison=True)(array(values, type_=Text))
+    side, fields = _tracked[model]
+    owners = select(side.c.owner_id).where(side.c.kind == fields[attr], side.c.value.in_(values))
+    if match == "all":
+        owners = owners.group_by(side.c.owner_id).having(func.count(side.c.value) == len(values))
+    return model.id.in_(owners)
+
+
+def migrate(bind=engine):
+    """Convert comma-joined columns to text[] + GIN (Postgres) or backfill the side tables. Idempotent."""
+    with bind.begin() as conn:
+        for model, (side, fields) in _tracked.items():
+            table = model.__table__
+            if USE_ARRAYS:
+                for attr in fields:
+                    column = table.c[attr].name
+                    data_type = conn.execute(text(
+                        "SELECT data_type FROM information_schema.columns "
+                        "WHERE table_name = :table AND column_name = :column"
+                    ), {"table": table.name, "column": column}).scalar()
+                    if data_type and data_type != "ARRAY":
+                        print(f" Converting {table.name}.{column} to text[]")
+                        conn.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN {column} DROP DEFAULT"))
+                        conn.execute(text(
+                            f"ALTER TABLE {table.name} ALTER COLUMN {column} TYPE text[] USING "
+                            f"array_remove(string_to_array(regexp_replace(btrim(coalesce({column}, '')), "
+                            f"'\\s*,\\s*', ',', 'g'), ','), '')"
+                        ))
+                        conn.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN {column} SET DEFAULT '{{}}'"))
+                    conn.execute(text(
+                        f"CREATE INDEX IF NOT EXISTS idx_{table.name}_{column} ON {table.name} USING GIN ({column})"
+                    ))
+            else:
+                side.create(conn, checkfirst=True)
+                columns = [table.c.id] + [table.c[attr] for attr in fields]
+                missing = conn.execute(
+                    select(*columns).where(table.c.id.not_in(select(side.c.owner_id)))
+                ).mappings().all()
+                sync_rows(conn, model, [dict(row) for row in missing])
+
+
+if __name__ == "__main__":
+    import main  # registers the tracked models
+
+    migrate()
+    print(" Multi-valued columns migrated")
@@ -0,0 +1,61 @@
+# backend/pagination.py
+from fastapi import HTTPException, Response
+from typing import Any, Callable, List, Optional
+import base64
+import json
+import os
+
+# ==================== CONFIGURATION ====================
+# Upper bound for ?limit= on keyset-paginated list endpoints
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+# Opaque cursor for the next page; kept out of the body so list responses stay plain arrays
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(key: Any) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"k": key}).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Any:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))["k"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _cursor_key(cursor: str, key_column) -> Any:
+    """Decoded cursor key, checked against the key column's type (a list or a string would reach the database)"""
+    key = decode_cursor(cursor)
+    try:
+        expected = key_column.type.python_type
+    except NotImplementedError:
+        return key
+    if isinstance(key, bool) or not isinstance(key, expected):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+def keyset(query, key_column, cursor: Optional[str], limit: Optional[int], skip: int = 0):
+    """Order by a unique key and resume after the cursor, fetching one extra row to detect a next page.
+
+    skip is the deprecated offset fallback and is ignored when a cursor is given.
+    Works on both select() statements and legacy Query objects.
+    """
+    query = query.order_by(key_column)
+    if cursor:
+        query = query.where(key_column > _cursor_key(cursor, key_column))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit + 1) if limit is not None else query
+
+
+def page(rows: List[Any], limit: Optional[int], response: Response, key: Callable[[Any], Any] = lambda row: row.id) -> List[Any]:
+    """Trim the extra row fetched by keyset() and advertise the next cursor"""
+    if limit is not None and limit <= 0:
+        return []
+    if limit is not None and len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key(rows[-1]))
+    return rows
@@ -0,0 +1,148 @@
+# backend/points_ledger.py
+"""Append-only points ledger with day/week/term rollups for windowed leaderboards.
+
+Every award is one ledger row plus an increment of the user's rollup row for
+the award's day, ISO week and school term, in the caller's transaction.
+Leaderboards read the rollups; the ledger itself is only scanned by the
+backfill/rebuild job.
+
+Usage: python points_ledger.py backfill   (ledger entries for completed Progress rows, then rebuild)
+       python points_ledger.py rebuild    (recompute every rollup from the ledger)
+"""
+from datetime import date, datetime
+from sqlalchemy import and_, delete, exists, func, insert, literal, select
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+import argparse
+import os
+
+from progress_store import dialect_insert
+
+# ==================== CONFIGURATION ====================
+# Month-day each school term starts, in school-year order (Terms carry no dates of their own)
+TERM_START_DATES = os.getenv("TERM_START_DATES", "09-01,01-06,04-21")
+
+BUCKET_KINDS = ("day", "week", "term")
+LESSON_REASON = "lesson"
+
+
+def _term_starts() -> List[Tuple[int, int]]:
+    return [tuple(int(part) for part in md.strip().split("-")) for md in TERM_START_DATES.split(",") if md.strip()]
+
+
+def term_key(at: date) -> str:
+    """School-year term containing a date, e.g. '2026-27-T1'"""
+    starts = _term_starts()
+    first = starts[0]
+    year = at.year if (at.month, at.day) >= first else at.year - 1
+    number = 1
+    for i, (month, day) in enumerate(starts):
+        start = date(year if (month, day) >= first else year + 1, month, day)
+        if start <= at:
+            number = i + 1
+    return f"{year}-{(year + 1) % 100:02d}-T{number}"
+
+
+def bucket_keys(at: datetime) -> Dict[str, str]:
+    iso_year, iso_week, _ = at.isocalendar()
+    return {
+        "day": at.date().isoformat(),
+        "week": f"{iso_year}-W{iso_week:02d}",
+        "term": term_key(at.date()),
+    }
+
+
+def _rollup_upsert(db: Session, rollup_model, rows: List[dict]):
+    table = rollup_model.__table__
+    stmt = dialect_insert(db)(table).values(rows)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.bucket_kind, table.c.bucket_key, table.c.user_id],
+        set_={"points": table.c.points + stmt.excluded.points},
+    ))
+
+
+def award_points(
+    db: Session,
+    ledger_model,
+    rollup_model,
+    user_id: int,
+    points: int,
+    reason: str,
+    source_id: Optional[int] = None,
+    at: Optional[datetime] = None,
+):
+    """Append a ledger entry and bump the user's day/week/term rollups (the caller commits)"""
+    at = at or datetime.utcnow()
+    db.execute(insert(ledger_model.__table__).values(
+        user_id=user_id, points=points, reason=reason, source_id=source_id, awarded_at=at
+    ))
+    _rollup_upsert(db, rollup_model, [
+        {"bucket_kind": kind, "bucket_key": key, "user_id": user_id, "points": points}
+        for kind, key in bucket_keys(at).items()
+    ])
+
+
+def backfill_from_progress(db: Session, ledger_model, rollup_model, progress_model, lesson_model) -> int:
+    """Write ledger entries for completed Progress rows that have none yet, then rebuild the rollups"""
+    ledger, progress, lessons = ledger_model.__table__, progress_model.__table__, lesson_model.__table__
+    already = exists().where(and_(
+        ledger.c.user_id == progress.c.user_id,
+        ledger.c.reason == LESSON_REASON,
+        ledger.c.source_id == progress.c.lesson_id,
+    ))
+    source = (
+        select(
+            progress.c.user_id,
+            func.coalesce(lessons.c.points, 0),
+            literal(LESSON_REASON),
+            progress.c.lesson_id,
+            func.coalesce(progress.c.completed_at, func.current_timestamp()),
+        )
+        .join(lessons, lessons.c.id == progress.c.lesson_id)
+        .where(progress.c.completed.is_(True), progress.c.user_id.is_not(None), ~already)
+    )
+    added = db.execute(insert(ledger).from_select(
+        ["user_id", "points", "reason", "source_id", "awarded_at"], source
+    )).rowcount
+    rebuild_rollups(db, ledger_model, rollup_model)
+    return added
+
+
+def rebuild_rollups(db: Session, ledger_model, rollup_model, batch_size: int = 5000):
+    """Recompute every rollup from the ledger (the only path that scans it)"""
+    ledger = ledger_model.__table__
+    totals: Dict[Tuple[str, str, int], int] = {}
+    rows = db.execute(
+        select(ledger.c.user_id, ledger.c.points, ledger.c.awarded_at).execution_options(yield_per=batch_size)
+    )
+    for user_id, points, awarded_at in rows:
+        for kind, key in bucket_keys(awarded_at).items():
+            totals[(kind, key, user_id)] = totals.get((kind, key, user_id), 0) + points
+
+    db.execute(delete(rollup_model.__table__))
+    values = [
+        {"bucket_kind": kind, "bucket_key": key, "user_id": user_id, "points": points}
+        for (kind, key, user_id), points in totals.items()
+    ]
+    for start in range(0, len(values), batch_size):
+        db.execute(insert(rollup_model.__table__), values[start:start + batch_size])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the points ledger and its rollups")
+    parser.add_argument("command", choices=["backfill", "rebuild"])
+    args = parser.parse_args()
+
+    from main import SessionLocal, PointsLedger, PointsRollup, Progress, Lesson
+
+    db = SessionLocal()
+    try:
+        if args.command == "backfill":
+            added = backfill_from_progress(db, PointsLedger, PointsRollup, Progress, Lesson)
+            print(f" Added {added} ledger entries from progress")
+        else:
+            rebuild_rollups(db, PointsLedger, PointsRollup)
+        db.commit()
+        print(" Rollups rebuilt")
+    finally:
+        db.close()
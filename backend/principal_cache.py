@@ -0,0 +1,51 @@
+# backend/principal_cache.py
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+import os
+
+from ttl_cache import TTLCache
+
+# ==================== CONFIGURATION ====================
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "10000"))
+
+
+# Column values of authenticated users, keyed by token subject
+principal_cache = TTLCache(PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_MAX_ENTRIES)
+
+
+def _remember(subject: str, user, user_model) -> None:
+    principal_cache.put(
+        subject,
+        {attr.key: getattr(user, attr.key) for attr in inspect(user_model).column_attrs}
+    )
+
+
+def load_principal(db: Session, user_model, subject: str):
+    """Return the user for a token subject, only querying the users table on a cache miss"""
+    values = principal_cache.get(subject)
+    if values is not None:
+        # Rebuild a detached instance and attach it to this session without a SELECT,
+        # so handlers can still modify and commit current_user as before
+        user = user_model(**values)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    user = db.query(user_model).filter(user_model.username == subject).first()
+    if user is not None:
+        _remember(subject, user, user_model)
+    return user
+
+
+async def load_principal_async(db: AsyncSession, user_model, subject: str):
+    """Async variant for read-only handlers; a cache hit returns an unattached copy without any I/O"""
+    values = principal_cache.get(subject)
+    if values is not None:
+        return user_model(**values)
+
+    result = await db.execute(select(user_model).where(user_model.username == subject))
+    user = result.scalars().first()
+    if user is not None:
+        _remember(subject, user, user_model)
+    return user
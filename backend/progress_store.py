@@ -0,0 +1,100 @@
+# backend/progress_store.py
+from datetime import datetime
+from sqlalchemy import func, inspect, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from typing import Optional, Tuple
+
+PROGRESS_UNIQUE_INDEX = "uq_progress_user_lesson"
+
+
+def dialect_insert(db: Session):
+    """insert() construct with on_conflict_do_update for the bound dialect (Postgres or SQLite)"""
+    return pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+
+
+def record_completion(db: Session, user_model, progress_model, user_id: int, lesson_id: int, points: int, score: int) -> Tuple[int, int, str, Optional[int]]:
+    """Mark a lesson completed and award its points exactly once;
+    returns (points_awarded, total_points, outcome, previous_score).
+
+    outcome is "inserted" (new row), "completed" (existing row completed now) or
+    "repeat" (already completed, score overwritten). previous_score is the
+    overwritten score of a repeat, None otherwise. The insert skips on conflict
+    and the update only matches rows not yet completed, so a concurrent or
+    retried completion finds nothing to change and awards nothing.
+    The caller commits.
+    """
+    table = progress_model.__table__
+    now = datetime.utcnow()
+    stmt = dialect_insert(db)(table).values(
+        user_id=user_id, lesson_id=lesson_id, score=score, completed=True, completed_at=now
+    )
+    stmt = stmt.on_conflict_do_nothing(index_elements=[table.c.user_id, table.c.lesson_id]).returning(table.c.id)
+    outcome = "inserted" if db.execute(stmt).first() is not None else None
+    if outcome is None:
+        completed_now = db.execute(
+            update(table)
+            .where(table.c.user_id == user_id, table.c.lesson_id == lesson_id, table.c.completed.is_not(True))
+            .values(score=score, completed=True, completed_at=now)
+            .returning(table.c.id)
+        ).first()
+        outcome = "completed" if completed_now is not None else "repeat"
+
+    users = user_model.__table__
+    if outcome != "repeat":
+        total = db.execute(
+            update(users)
+            .where(users.c.id == user_id)
+            .values(points=func.coalesce(users.c.points, 0) + points)
+            .returning(users.c.points)
+        ).scalar_one()
+        return points, total, outcome, None
+
+    # Already completed: keep the latest score, award nothing. The row lock makes
+    # concurrent repeats read each other's score, so their deltas chain up
+    match = (table.c.user_id == user_id, table.c.lesson_id == lesson_id)
+    previous = db.execute(select(table.c.score).where(*match).with_for_update()).scalar()
+    db.execute(update(table).where(*match).values(score=score))
+    total = db.execute(select(users.c.points).where(users.c.id == user_id)).scalar_one()
+    return 0, total or 0, outcome, previous
+
+
+def record_attempt(db: Session, progress_model, user_id: int, lesson_id: int, score: Optional[int]) -> bool:
+    """Upsert a not-yet-completed progress row; returns True if it was inserted.
+
+    An existing row that is not completed takes the new score; a completed row
+    is left alone (completions go through record_completion). The caller commits.
+    """
+    table = progress_model.__table__
+    stmt = dialect_insert(db)(table).values(user_id=user_id, lesson_id=lesson_id, score=score, completed=False)
+    stmt = stmt.on_conflict_do_nothing(index_elements=[table.c.user_id, table.c.lesson_id]).returning(table.c.id)
+    if db.execute(stmt).first() is not None:
+        return True
+    db.execute(
+        update(table)
+        .where(table.c.user_id == user_id, table.c.lesson_id == lesson_id, table.c.completed.is_not(True))
+        .values(score=score)
+    )
+    return False
+
+
+def ensure_unique_progress(bind):
+    """Collapse duplicate (user_id, lesson_id) rows and add the unique index the upsert relies on. Idempotent."""
+    if any(ix["name"] == PROGRESS_UNIQUE_INDEX for ix in inspect(bind).get_indexes("progress")):
+        return
+    with bind.begin() as conn:
+        # Keep the completed, best-scoring, newest row of each pair
+        removed = conn.execute(text(
+            "DELETE FROM progress WHERE id IN ("
+            " SELECT id FROM ("
+            "  SELECT id, ROW_NUMBER() OVER ("
+            "   PARTITION BY user_id, lesson_id"
+            "   ORDER BY COALESCE(completed, false) DESC, COALESCE(score, 0) DESC, id DESC"
+            "  ) AS rn FROM progress WHERE user_id IS NOT NULL AND lesson_id IS NOT NULL"
+            " ) ranked WHERE rn > 1)"
+        )).rowcount
+        conn.execute(text(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {PROGRESS_UNIQUE_INDEX} ON progress (user_id, lesson_id)"
+        ))
+    print(f" Progress unique index created ({removed} duplicate rows removed)")
@@ -0,0 +1,47 @@
+# backend/query_budget.py
+"""Count the SQL statements an engine runs, to hold endpoints to a query budget.
+
+    with query_budget(engine, 3):
+        client.get("/admin/assignments", headers=admin)
+
+raises QueryBudgetExceeded (listing the statements) if more than 3 ran.
+"""
+from contextlib import contextmanager
+from sqlalchemy import event
+from typing import List
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCounter:
+    """Records statements executed on an engine while active"""
+
+    def __init__(self, engine):
+        self.engine = getattr(engine, "sync_engine", engine)
+        self.statements: List[str] = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def query_budget(engine, budget: int):
+    """Fail if the block runs more than budget statements on engine"""
+    with QueryCounter(engine) as counter:
+        yield counter
+    if counter.count > budget:
+        listing = "\n".join(f"  {i + 1}. {s.splitlines()[0][:160]}" for i, s in enumerate(counter.statements))
+        raise QueryBudgetExceeded(f"{counter.count} queries, budget {budget}:\n{listing}")
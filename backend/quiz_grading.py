@@ -0,0 +1,276 @@
+# backend/quiz_grading.py
+"""Server-side quiz grading with precompiled answer keys.
+
+A quiz as the player sees it is every question (Quiz row) of one lesson, so
+keys are compiled per lesson: one query loads the lesson's questions, each is
+turned into an AnswerKey of normalised accepted answers, and the set is kept
+in an LRU/TTL cache. Quiz mapper events drop the affected lessons, so grading
+a cached quiz never reads quiz rows.
+
+Question types (as written by the lesson editor):
+  mc_single     correct_answer is an option letter ("B") or the option text
+  mc_multiple   comma-separated letters ("A,C"); all and only those options
+  true_false    "T"/"F" (or true/false/yes/no)
+  short_answer, fill_blank and anything else: free text, alternatives
+                separated by "|", compared after normalisation (and
+                numerically when both sides are numbers)
+"""
+from dataclasses import dataclass
+from sqlalchemy import event, insert, select
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.orm.attributes import get_history
+from typing import Any, Dict, FrozenSet, Hashable, List, Optional, Tuple
+import os
+import string
+import unicodedata
+
+from ttl_cache import TTLCache
+
+# ==================== CONFIGURATION ====================
+ANSWER_KEY_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_KEY_CACHE_TTL_SECONDS", "3600"))
+ANSWER_KEY_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_KEY_CACHE_MAX_ENTRIES", "2000"))
+# Percentage needed for "passed"
+QUIZ_PASS_PERCENT = int(os.getenv("QUIZ_PASS_PERCENT", "60"))
+
+MULTI_SELECT_TYPES = {"mc_multiple", "mc_multi", "multi_select"}
+CHOICE_TYPES = {"mc_single"} | MULTI_SELECT_TYPES
+TRUE_WORDS = {"t", "true", "yes", "y", "1"}
+FALSE_WORDS = {"f", "false", "no", "n", "0"}
+ARTICLES = {"a", "an", "the"}
+
+_PUNCTUATION = str.maketrans({c: " " for c in string.punctuation})
+
+
+def normalize(value: Any) -> str:
+    """Case-, width- and whitespace-insensitive form of an answer"""
+    text = unicodedata.normalize("NFKC", str(value or "")).casefold()
+    return " ".join(text.split())
+
+
+def normalize_free_text(value: Any) -> str:
+    """normalize() without punctuation or a leading article, for typed answers; numbers keep their form"""
+    text = normalize(value)
+    if _number(text) is not None:
+        return text
+    words = text.translate(_PUNCTUATION).split()
+    if len(words) > 1 and words[0] in ARTICLES:
+        words = words[1:]
+    return " ".join(words)
+
+
+def _number(text: str) -> Optional[float]:
+    try:
+        return float(text.replace(",", ""))
+    except ValueError:
+        return None
+
+
+def letter_index(token: str, option_count: int) -> Optional[int]:
+    token = token.strip()
+    if len(token) == 1 and token.isalpha():
+        index = ord(token.upper()) - ord("A")
+        if 0 <= index < option_count:
+            return index
+    return None
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    question_id: int
+    question_type: str
+    accepted: FrozenSet[str]        # normalised accepted answers (the required set for multi-select)
+    options: Tuple[str, ...]        # normalised option texts in letter order, for choice questions
+    display: str                    # correct answer as shown after grading
+    points: int
+    explanation: str
+
+    def grade(self, answer: Any) -> bool:
+        if answer is None or answer == "" or answer == []:
+            return False
+        if self.question_type in MULTI_SELECT_TYPES:
+            given = answer if isinstance(answer, list) else str(answer).split(",")
+            chosen = {self._choice(part) for part in given if str(part).strip()}
+            return chosen == set(self.accepted)
+        if isinstance(answer, list):
+            return len(answer) == 1 and self.grade(answer[0])
+        if self.question_type in CHOICE_TYPES:
+            return self._choice(answer) in self.accepted
+        if self.question_type == "true_false":
+            word = normalize(answer)
+            value = True if word in TRUE_WORDS else False if word in FALSE_WORDS else None
+            return value is not None and ("true" if value else "false") in self.accepted
+        typed = normalize_free_text(answer)
+        if typed in self.accepted:
+            return True
+        number = _number(typed)
+        return number is not None and any(_number(accepted) == number for accepted in self.accepted)
+
+    def _choice(self, answer: Any) -> str:
+        """Normalised option text of an answer given as option text or as its letter"""
+        text = normalize(answer)
+        if text in self.options:
+            return text
+        index = letter_index(text, len(self.options))
+        return self.options[index] if index is not None else text
+
+
+def compile_key(quiz) -> AnswerKey:
+    """Turn a quiz row into its AnswerKey"""
+    question_type = quiz.question_type or "mc_single"
+    options = [option.strip() for option in (quiz.options or "").split(",")]
+    raw = (quiz.correct_answer or "").strip()
+
+    if question_type in CHOICE_TYPES:
+        tokens = [t for t in raw.split(",") if t.strip()] if question_type in MULTI_SELECT_TYPES else [raw]
+        indexes = [letter_index(t, len(options)) for t in tokens]
+        if tokens and all(i is not None for i in indexes):
+            accepted = frozenset(normalize(options[i]) for i in indexes)
+            display = ", ".join(options[i] for i in indexes)
+        else:
+            accepted = frozenset(normalize(t) for t in tokens)
+            display = raw
+    elif question_type == "true_false":
+        word = normalize(raw)
+        accepted = frozenset({"true"} if word in TRUE_WORDS else {"false"} if word in FALSE_WORDS else {word})
+        display = "True" if "true" in accepted else "False" if "false" in accepted else raw
+    else:
+        accepted = frozenset(normalize_free_text(alt) for alt in raw.split("|") if alt.strip())
+        display = raw.split("|")[0].strip()
+
+    return AnswerKey(
+        question_id=quiz.id,
+        question_type=question_type,
+        accepted=accepted,
+        options=tuple(normalize(option) for option in options) if question_type in CHOICE_TYPES else (),
+        display=display,
+        points=quiz.points or 0,
+        explanation=quiz.explanation or "",
+    )
+
+
+class AnswerKeyCache:
+    """Compiled answer keys per lesson (questions without a lesson form a quiz of their own)"""
+
+    def __init__(self, ttl_seconds: float = ANSWER_KEY_CACHE_TTL_SECONDS, max_entries: int = ANSWER_KEY_CACHE_MAX_ENTRIES):
+        self.keys = TTLCache(ttl_seconds, max_entries)
+        self.groups = TTLCache(ttl_seconds, max_entries * 20)
+        self._quiz_model = None
+
+    @staticmethod
+    def _group(quiz_id: int, lesson_id: Optional[int]) -> Hashable:
+        return ("lesson", lesson_id) if lesson_id is not None else ("quiz", quiz_id)
+
+    def track(self, quiz_model):
+        """Drop cached keys whenever a quiz row is written through the ORM"""
+        self._quiz_model = quiz_model
+        for kind in ("after_insert", "after_update", "after_delete"):
+            event.listen(quiz_model, kind, self._on_write)
+        event.listen(Session, "after_commit", self._after_commit)
+
+    def _on_write(self, mapper, connection, target):
+        lesson_ids = set(get_history(target, "lesson_id").sum()) | {target.lesson_id}
+        self.invalidate(target.id, *lesson_ids)
+        # Again once committed, in case a concurrent read cached the old rows in between
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault("answer_keys_written", []).append((target.id, *lesson_ids))
+
+    def _after_commit(self, session):
+        for quiz_id, *lesson_ids in session.info.pop("answer_keys_written", ()):
+            self.invalidate(quiz_id, *lesson_ids)
+
+    def invalidate(self, quiz_id: Optional[int] = None, *lesson_ids: Optional[int]):
+        self.groups.invalidate(quiz_id)
+        self.keys.invalidate(*(self._group(quiz_id, lesson_id) for lesson_id in lesson_ids))
+        self.keys.invalidate(("quiz", quiz_id))
+
+    def invalidate_lessons(self, *lesson_ids: Optional[int]):
+        """For bulk writes that bypass the ORM; lesson-less quizzes expire on their own"""
+        self.keys.invalidate(*(("lesson", lesson_id) for lesson_id in lesson_ids if lesson_id is not None))
+
+    def clear(self):
+        self.keys.clear()
+        self.groups.clear()
+
+    def for_quiz(self, db, quiz_id: int) -> Optional[Tuple[Optional[int], Dict[int, AnswerKey]]]:
+        """(lesson_id, {question_id: AnswerKey}) of the quiz that quiz_id belongs to, or None if it does not exist"""
+        Quiz = self._quiz_model
+        group = self.groups.get(quiz_id)
+        if group is None:
+            row = db.execute(select(Quiz.lesson_id).where(Quiz.id == quiz_id)).first()
+            if row is None:
+                return None
+            group = self._group(quiz_id, row.lesson_id)
+            self.groups.put(quiz_id, group)
+        keys = self.keys.get(group)
+        if keys is None:
+            kind, value = group
+            query = select(Quiz).where(Quiz.lesson_id == value if kind == "lesson" else Quiz.id == value).order_by(Quiz.id)
+            keys = {quiz.id: compile_key(quiz) for quiz in db.execute(query).scalars()}
+            self.keys.put(group, keys)
+            for question_id in keys:
+                self.groups.put(question_id, group)
+        return (group[1] if group[0] == "lesson" else None), keys
+
+    def stats(self) -> Dict[str, Any]:
+        return {"keys": self.keys.stats(), "groups": self.groups.stats()}
+
+
+answer_keys = AnswerKeyCache()
+
+
+def grade_attempt(keys: Dict[int, AnswerKey], answers: Dict[int, Any]) -> Dict[str, Any]:
+    """Grade every question of the quiz in one pass; unanswered questions count as wrong"""
+    results: List[Dict[str, Any]] = []
+    correct = earned = possible = 0
+    for question_id, key in keys.items():
+        answer = answers.get(question_id)
+        is_correct = key.grade(answer)
+        correct += is_correct
+        possible += key.points
+        earned += key.points if is_correct else 0
+        results.append({
+            "question_id": question_id,
+            "user_answer": ", ".join(map(str, answer)) if isinstance(answer, list) else answer,
+            "is_correct": is_correct,
+            "correct_answer": key.display,
+            "explanation": key.explanation,
+            "points": key.points if is_correct else 0,
+        })
+    total = len(keys)
+    score = round(100 * earned / possible) if possible else (round(100 * correct / total) if total else 0)
+    return {
+        "score": score,
+        "correct": correct,
+        "total": total,
+        "points_earned": earned,
+        "passed": score >= QUIZ_PASS_PERCENT,
+        "results": results,
+    }
+
+
+def save_attempt(db, attempt_model, answer_model, user_id: int, quiz_id: int, lesson_id: Optional[int],
+                 graded: Dict[str, Any], submitted_at) -> int:
+    """Persist an attempt and all of its answers in two statements; returns the attempt id (the caller commits)"""
+    attempt_id = db.execute(insert(attempt_model.__table__).values(
+        user_id=user_id,
+        quiz_id=quiz_id,
+        lesson_id=lesson_id,
+        score=graded["score"],
+        correct_count=graded["correct"],
+        total_count=graded["total"],
+        points_earned=graded["points_earned"],
+        submitted_at=submitted_at,
+    ).returning(attempt_model.__table__.c.id)).scalar_one()
+    if graded["results"]:
+        db.execute(insert(answer_model.__table__), [
+            {
+                "attempt_id": attempt_id,
+                "quiz_id": result["question_id"],
+                "answer": None if result["user_answer"] is None else str(result["user_answer"]),
+                "is_correct": result["is_correct"],
+                "points": result["points"],
+            }
+            for result in graded["results"]
+        ])
+    return attempt_id
@@ -0,0 +1,284 @@
+# backend/quiz_ingest.py
+"""Bulk quiz question ingest: JSON, NDJSON or CSV in, one transaction out.
+
+Every row is validated before anything is written (field types, option/answer
+consistency, lesson existence in one query), then all valid rows go in with a
+single executemany INSERT ... RETURNING, which SQLAlchemy sends as multi-row
+VALUES batches. In strict mode any invalid row means nothing is inserted; in
+lenient mode the valid rows are inserted and the invalid ones reported.
+
+Formats:
+  json    {"lesson_id": 1, "quizzes": [...]} ("questions" is accepted too) or a bare list
+  ndjson  one question object per line
+  csv     header row; options and tags are "|"-separated
+
+Usage: python quiz_ingest.py questions.csv [--format csv|ndjson|json] [--lesson-id N] [--lenient]
+"""
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from typing import Any, AsyncIterator, Dict, List, Optional
+import argparse
+import codecs
+import csv
+import json
+import os
+
+from multivalue import sync_rows, to_list
+from quiz_grading import CHOICE_TYPES, FALSE_WORDS, MULTI_SELECT_TYPES, TRUE_WORDS, letter_index, normalize
+from table_versions import bump
+
+# ==================== CONFIGURATION ====================
+QUIZ_BULK_MAX_ROWS = int(os.getenv("QUIZ_BULK_MAX_ROWS", "50000"))
+
+FORMATS = {
+    "application/json": "json",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "text/csv": "csv",
+}
+LIST_FIELDS = ("options", "tags")
+CSV_LIST_SEPARATOR = "|"
+
+
+class TooManyRows(ValueError):
+    pass
+
+
+def detect_format(content_type: Optional[str]) -> str:
+    return FORMATS.get((content_type or "").split(";")[0].strip().lower(), "json")
+
+
+def parse_json(content: bytes, lesson_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Rows of a JSON body; a top-level lesson_id becomes each row's default"""
+    body = json.loads(content or b"null")
+    if isinstance(body, dict):
+        if lesson_id is None:
+            lesson_id = body.get("lesson_id")
+        body = body.get("quizzes", body.get("questions"))
+    if not isinstance(body, list):
+        raise ValueError('Expected a list of questions or {"lesson_id": ..., "quizzes": [...]}')
+    return [_with_lesson(row, lesson_id) if isinstance(row, dict) else {"_parse_error": "Row is not a JSON object"}
+            for row in body]
+
+
+def _with_lesson(row: Dict[str, Any], lesson_id: Optional[int]) -> Dict[str, Any]:
+    if lesson_id is not None and row.get("lesson_id") in (None, ""):
+        row = dict(row, lesson_id=lesson_id)
+    return row
+
+
+def _ndjson_row(line: str, lesson_id: Optional[int]) -> Dict[str, Any]:
+    try:
+        row = json.loads(line)
+    except ValueError as e:
+        return {"_parse_error": f"Invalid JSON: {e}"}
+    return _with_lesson(row, lesson_id) if isinstance(row, dict) else {"_parse_error": "Line is not a JSON object"}
+
+
+def _csv_row(header: List[str], values: List[str], lesson_id: Optional[int]) -> Dict[str, Any]:
+    if len(values) > len(header):
+        return {"_parse_error": f"Expected {len(header)} columns, got {len(values)}"}
+    row = {name: value for name, value in zip(header, values) if value != ""}
+    for field in LIST_FIELDS:
+        if field in row:
+            row[field] = [part.strip() for part in row[field].split(CSV_LIST_SEPARATOR) if part.strip()]
+    return _with_lesson(row, lesson_id)
+
+
+class _LineSplitter:
+    """Decodes byte chunks and hands back complete lines, keeping the partial tail"""
+
+    def __init__(self):
+        self.decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        self.tail = ""
+
+    def feed(self, chunk: bytes, final: bool = False) -> List[str]:
+        text = self.tail + self.decoder.decode(chunk, final)
+        lines = text.splitlines(keepends=True)
+        self.tail = "" if final or not lines or lines[-1].endswith(("\n", "\r")) else lines.pop()
+        return lines
+
+
+async def iter_rows(chunks: AsyncIterator[bytes], fmt: str, lesson_id: Optional[int] = None,
+                    max_rows: int = QUIZ_BULK_MAX_ROWS) -> List[Dict[str, Any]]:
+    """Parse a streamed body chunk by chunk; only the parsed rows are held, never the raw body (JSON excepted)"""
+    if fmt == "json":
+        content = b"".join([chunk async for chunk in chunks])
+        rows = parse_json(content, lesson_id)
+        if len(rows) > max_rows:
+            raise TooManyRows(f"At most {max_rows} questions per request")
+        return rows
+    if fmt not in ("ndjson", "csv"):
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    rows: List[Dict[str, Any]] = []
+    splitter = _LineSplitter()
+    header: Optional[List[str]] = None
+    pending = ""
+
+    def take(lines: List[str]):
+        nonlocal header, pending
+        if fmt == "ndjson":
+            rows.extend(_ndjson_row(line, lesson_id) for line in lines if line.strip())
+        else:
+            for line in lines:
+                # A quoted field may span lines: wait for the closing quote
+                pending += line
+                if pending.count('"') % 2:
+                    continue
+                record, pending = pending, ""
+                if not record.strip():
+                    continue
+                values = next(csv.reader([record]))
+                if header is None:
+                    header = [name.strip() for name in values]
+                else:
+                    rows.append(_csv_row(header, values, lesson_id))
+        if len(rows) > max_rows:
+            raise TooManyRows(f"At most {max_rows} questions per request")
+
+    async for chunk in chunks:
+        take(splitter.feed(chunk))
+    take(splitter.feed(b"", final=True))
+    if pending:
+        rows.append({"_parse_error": "Unterminated quoted field"})
+    return rows
+
+
+def check_question(item) -> List[str]:
+    """Consistency checks the field types alone don't cover"""
+    errors = []
+    question_type = item.question_type or "mc_single"
+    options = [option.strip() for option in item.options]
+    answer = item.correct_answer.strip()
+    if not item.question.strip():
+        errors.append("question: must not be empty")
+    if not answer:
+        errors.append("correct_answer: must not be empty")
+    if any("," in option for option in options):
+        # Options are stored comma-joined
+        errors.append("options: must not contain commas")
+    if item.points < 0:
+        errors.append("points: must not be negative")
+    if question_type in CHOICE_TYPES:
+        if len([option for option in options if option]) < 2:
+            errors.append("options: a choice question needs at least 2 options")
+        elif answer:
+            tokens = [t for t in answer.split(",") if t.strip()] if question_type in MULTI_SELECT_TYPES else [answer]
+            texts = {normalize(option) for option in options}
+            if not all(letter_index(t, len(options)) is not None or normalize(t) in texts for t in tokens):
+                errors.append("correct_answer: must be option letters or option text")
+    elif question_type == "true_false" and answer and normalize(answer) not in TRUE_WORDS | FALSE_WORDS:
+        errors.append("correct_answer: must be true or false")
+    return errors
+
+
+def _field_errors(e: ValidationError) -> List[str]:
+    return [f"{'.'.join(map(str, error['loc'])) or 'row'}: {error['msg']}" for error in e.errors()]
+
+
+def ingest_quizzes(db: Session, quiz_model, lesson_model, create_schema, rows: List[Dict[str, Any]],
+                   lenient: bool = False) -> List[Dict[str, Any]]:
+    """Validate every row, then insert the valid ones in one transaction; one result per row.
+
+    Unless lenient is set, any invalid row means nothing is inserted.
+    """
+    results: List[Dict[str, Any]] = []
+    items = []
+
+    # Pass 1: field types and per-question consistency
+    for number, row in enumerate(rows, start=1):
+        errors, item = [], None
+        if row.get("_parse_error"):
+            errors.append(row["_parse_error"])
+        else:
+            try:
+                item = create_schema.model_validate(row)
+                errors.extend(check_question(item))
+            except ValidationError as e:
+                errors.extend(_field_errors(e))
+        items.append(item)
+        results.append({"row": number, "errors": errors})
+
+    # Pass 2: one query for the referenced lessons
+    lesson_ids = {item.lesson_id for item in items if item is not None and item.lesson_id is not None}
+    known = set(db.execute(select(lesson_model.id).where(lesson_model.id.in_(lesson_ids))).scalars()) if lesson_ids else set()
+    for item, result in zip(items, results):
+        if item is not None and item.lesson_id is not None and item.lesson_id not in known:
+            result["errors"].append(f"lesson_id: lesson {item.lesson_id} does not exist")
+
+    valid = [i for i, result in enumerate(results) if not result["errors"]]
+    if not valid or (len(valid) < len(results) and not lenient):
+        for i in valid:
+            results[i]["status"] = "skipped"
+        for result in results:
+            result.setdefault("status", "error")
+        return results
+
+    # Pass 3: a single executemany INSERT ... RETURNING (ids come back in row order)
+    table = quiz_model.__table__
+    records = []
+    for i in valid:
+        record = items[i].model_dump()
+        record["options"] = ",".join(option.strip() for option in record["options"])
+        record["tags"] = to_list(record["tags"])
+        records.append(record)
+    try:
+        ids = db.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True), records
+        ).scalars().all()
+        sync_rows(db.connection(), quiz_model, [dict(record, id=quiz_id) for record, quiz_id in zip(records, ids)])
+        bump(db.connection(), table.name)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    for i, quiz_id, record in zip(valid, ids, records):
+        results[i].update(status="created", id=quiz_id, lesson_id=record["lesson_id"])
+    for result in results:
+        result.setdefault("status", "error")
+    return results
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    created = [result for result in results if result["status"] == "created"]
+    return {
+        "count": len(created),
+        "ids": [result["id"] for result in created],
+        "skipped": sum(result["status"] == "skipped" for result in results),
+        "errors": [{"row": result["row"], "errors": result["errors"]} for result in results if result["errors"]],
+    }
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Bulk-import quiz questions")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["json", "ndjson", "csv"])
+    parser.add_argument("--lesson-id", type=int)
+    parser.add_argument("--lenient", action="store_true", help="insert valid rows even if some rows fail")
+    args = parser.parse_args()
+
+    from main import SessionLocal, Lesson, Quiz, QuizCreate
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else
+                          "csv" if args.path.endswith(".csv") else "json")
+
+    async def read_file():
+        with open(args.path, "rb") as f:
+            while True:
+                chunk = f.read(1 << 16)
+                if not chunk:
+                    return
+                yield chunk
+
+    parsed = asyncio.run(iter_rows(read_file(), fmt, args.lesson_id))
+    db = SessionLocal()
+    try:
+        outcome = ingest_quizzes(db, Quiz, Lesson, QuizCreate, parsed, lenient=args.lenient)
+    finally:
+        db.close()
+    print(json.dumps(summarize(outcome), indent=2))
@@ -0,0 +1,496 @@
+# backend/response_cache.py
+"""Cache of rendered GET responses shared by every student, with tag invalidation.
+
+Entries are response bodies (JSON bytes) in two tiers: an in-process LRU with
+a TTL and a size bound, and optionally a shared Redis-protocol server
+(RESPONSE_CACHE_URL) so every uvicorn worker sees the others' fills.
+
+Each entry is tagged with the entities it was built from ("subjects",
+"lesson:12"). A tag has a generation number and an entry's key includes the
+generations of its tags as they were read before the body was built, so
+invalidating a tag (bumping its generation) makes every entry built from the
+old data unreachable at once, in every worker. ORM writes invalidate their
+tags after the transaction commits (track()); Core writes call invalidate().
+
+Misses are single-flight inside handlers decorated with coalesce(): while
+one request builds a key, identical requests arriving meanwhile wait for its
+body instead of running the same queries. That works for threadpool (sync)
+and event-loop (async) handlers alike.
+"""
+from collections import defaultdict
+from contextvars import ContextVar
+from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from urllib.parse import urlencode, urlparse
+import asyncio
+import functools
+import os
+import socket
+import threading
+import time
+
+import orjson
+
+from ttl_cache import TTLCache
+
+# ==================== CONFIGURATION ====================
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "300"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2048"))
+# redis://[:password@]host:port/db; empty keeps the cache in-process only
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL", "")
+RESPONSE_CACHE_PREFIX = os.getenv("RESPONSE_CACHE_PREFIX", "questlab:rc:")
+# Socket timeout per shared-cache command; a slow cache must not slow requests down
+RESPONSE_CACHE_TIMEOUT_SECONDS = float(os.getenv("RESPONSE_CACHE_TIMEOUT_SECONDS", "0.1"))
+# After a shared-cache error, serve from the local tier only for this long
+RESPONSE_CACHE_RETRY_SECONDS = float(os.getenv("RESPONSE_CACHE_RETRY_SECONDS", "5"))
+# How long an identical request waits for the in-flight one before building the response itself
+RESPONSE_CACHE_COALESCE_WAIT_SECONDS = float(os.getenv("RESPONSE_CACHE_COALESCE_WAIT_SECONDS", "5"))
+
+CACHE_HEADER = "X-Cache"
+
+_SESSION_KEY = "response_cache_tags"
+
+# Flights led by the current request; None outside coalesce()-decorated handlers
+_led_flights: ContextVar[Optional[List["Flight"]]] = ContextVar("response_cache_flights", default=None)
+
+
+class RespError(Exception):
+    """Error reply from the shared cache server"""
+
+
+class RespClient:
+    """Minimal Redis-protocol (RESP2) client: one command per round trip over pooled sockets"""
+
+    def __init__(self, url: str, timeout: float = RESPONSE_CACHE_TIMEOUT_SECONDS):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.strip("/") or 0)
+        self.timeout = timeout
+        self._idle: List[Any] = []
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile("rb"))
+        if self.password:
+            self._call(conn, "AUTH", self.password)
+        if self.db:
+            self._call(conn, "SELECT", self.db)
+        return conn
+
+    @staticmethod
+    def _encode(args: Sequence[Any]) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    def _read(self, reader):
+        line = reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise ConnectionError("shared cache closed the connection")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RespError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            size = int(rest)
+            if size < 0:
+                return None
+            data = reader.read(size + 2)
+            if len(data) != size + 2:
+                raise ConnectionError("shared cache closed the connection")
+            return data[:-2]
+        if kind == b"*":
+            size = int(rest)
+            return None if size < 0 else [self._read(reader) for _ in range(size)]
+        raise ConnectionError(f"unexpected reply from shared cache: {line[:20]!r}")
+
+    def _call(self, conn, *args):
+        conn[0].sendall(self._encode(args))
+        return self._read(conn[1])
+
+    def execute(self, *args):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            reply = self._call(conn, *args)
+        except RespError:
+            self._release(conn)
+            raise
+        except Exception:
+            # Unknown protocol state: drop the socket
+            conn[0].close()
+            raise
+        self._release(conn)
+        return reply
+
+    def _release(self, conn):
+        with self._lock:
+            self._idle.append(conn)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for sock, _ in idle:
+            sock.close()
+
+
+class RouteStats:
+    __slots__ = ("local_hits", "shared_hits", "coalesced", "misses", "stores", "abandoned")
+
+    def __init__(self):
+        self.local_hits = self.shared_hits = self.coalesced = self.misses = self.stores = self.abandoned = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        hits = self.local_hits + self.shared_hits
+        lookups = hits + self.coalesced + self.misses
+        return {
+            "hits": hits,
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            # Requests that got the body of an identical in-flight request instead of building it
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "stores": self.stores,
+            # Flights whose leader ended without a body (error, uncacheable answer)
+            "abandoned": self.abandoned,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "coalesced_ratio": round(self.coalesced / lookups, 4) if lookups else 0.0,
+        }
+
+
+def _resolve(future: "asyncio.Future", body: Optional[bytes]):
+    if not future.done():
+        future.set_result(body)
+
+
+class Flight:
+    """One in-flight build of a cache key; waiters get its body, or None if the leader gave up"""
+
+    __slots__ = ("route", "key", "body", "_done", "_futures", "_lock")
+
+    def __init__(self, route: str, key: str):
+        self.route, self.key, self.body = route, key, None
+        self._done = threading.Event()
+        self._futures: List[tuple] = []
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float) -> Optional[bytes]:
+        return self.body if self._done.wait(timeout) else None
+
+    async def wait_async(self, timeout: float) -> Optional[bytes]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self._done.is_set():
+                return self.body
+            self._futures.append((loop, future))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def finish(self, body: Optional[bytes]):
+        with self._lock:
+            self.body = body
+            self._done.set()
+            futures, self._futures = self._futures, []
+        # Leaders may run in a worker thread: hand results to each waiter's own loop
+        for loop, future in futures:
+            loop.call_soon_threadsafe(_resolve, future, body)
+
+
+class Lookup:
+    """One cache lookup: the body on a hit, or the key to store the freshly built body under"""
+
+    __slots__ = ("cache", "route", "key", "ttl", "body", "state", "flight")
+
+    def __init__(self, cache: "ResponseCache", route: str, key: str, ttl: Optional[float], body: Optional[bytes],
+                 state: str = "MISS", flight: Optional[Flight] = None):
+        self.cache, self.route, self.key, self.ttl, self.body = cache, route, key, ttl, body
+        self.state = state if body is not None else "MISS"
+        # Set when this request leads the build of key: store() releases the waiters
+        self.flight = flight
+
+    @property
+    def hit(self) -> bool:
+        return self.body is not None
+
+    def response(self, response: Optional[Response] = None) -> Response:
+        """The cached body as a JSON response, keeping headers set on the handler's Response parameter"""
+        return _json_response(self.body, response, self.state)
+
+    def store(self, payload: Any, response: Optional[Response] = None) -> Response:
+        body = payload if isinstance(payload, bytes) else orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+        self.cache.put(self, body)
+        return _json_response(body, response, "MISS")
+
+    async def store_async(self, payload: Any, response: Optional[Response] = None) -> Response:
+        body = payload if isinstance(payload, bytes) else orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+        if self.cache.shared is not None:
+            await run_in_threadpool(self.cache.put, self, body)
+        else:
+            self.cache.put(self, body)
+        return _json_response(body, response, "MISS")
+
+
+def _json_response(body: bytes, response: Optional[Response], state: str) -> Response:
+    headers = dict(response.headers) if response is not None else {}
+    headers[CACHE_HEADER] = state
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def request_key(request) -> str:
+    """Path plus the query with parameters sorted, so ?a=1&b=2 and ?b=2&a=1 share an entry"""
+    query = urlencode(sorted(request.query_params.multi_items()))
+    return f"{request.url.path}?{query}" if query else request.url.path
+
+
+class ResponseCache:
+    def __init__(self, url: str = RESPONSE_CACHE_URL, ttl_seconds: float = RESPONSE_CACHE_TTL_SECONDS,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES, prefix: str = RESPONSE_CACHE_PREFIX):
+        self.local = TTLCache(ttl_seconds, max_entries)
+        self.shared = RespClient(url) if url else None
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+        self._generations: Dict[str, int] = defaultdict(int)
+        self._routes: Dict[str, RouteStats] = defaultdict(RouteStats)
+        self._lock = threading.Lock()
+        self._flights: Dict[str, Flight] = {}
+        self._shared_down_until = 0.0
+        self.shared_errors = 0
+        self.invalidations = 0
+
+    # ---- shared tier ----
+
+    def _shared(self, *args):
+        """Run a command on the shared tier; None when it is not configured or currently failing"""
+        if self.shared is None or time.monotonic() < self._shared_down_until:
+            return None
+        try:
+            return self.shared.execute(*args)
+        except (OSError, RespError) as e:
+            with self._lock:
+                self.shared_errors += 1
+                self._shared_down_until = time.monotonic() + RESPONSE_CACHE_RETRY_SECONDS
+            print(f" Response cache: shared tier unavailable ({e}), local only for {RESPONSE_CACHE_RETRY_SECONDS:g}s")
+            return None
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    def generations(self, tags: Sequence[str]) -> List[Any]:
+        shared = self._shared("MGET", *map(self._tag_key, tags)) if tags else None
+        if shared is not None:
+            return [f"s{int(value or 0)}" for value in shared]
+        with self._lock:
+            return [self._generations[tag] for tag in tags]
+
+    # ---- lookups ----
+
+    def _begin(self, route: str, key: str, tags: Sequence[str], ttl: Optional[float], variant: Sequence[Any]):
+        """A Lookup (hit, or miss this request will build), or the Flight of an identical request to wait for"""
+        generations = self.generations(tags)
+        full_key = "|".join([route, key, *map(str, variant), *(f"{tag}={gen}" for tag, gen in zip(tags, generations))])
+        stats = self._routes[route]
+        body = self.local.get(full_key)
+        if body is not None:
+            with self._lock:
+                stats.local_hits += 1
+            return Lookup(self, route, full_key, ttl, body, "HIT")
+        body = self._shared("GET", self.prefix + full_key)
+        if body is not None:
+            with self._lock:
+                stats.shared_hits += 1
+            self.local.put(full_key, body, ttl)
+            return Lookup(self, route, full_key, ttl, body, "HIT")
+        led = _led_flights.get()
+        with self._lock:
+            flight = self._flights.get(full_key)
+            if flight is not None and led is not None:
+                return flight
+            stats.misses += 1
+            if led is None:
+                # Not inside a coalesce() handler: nobody would release waiters if the build failed
+                return Lookup(self, route, full_key, ttl, None)
+            flight = self._flights[full_key] = Flight(route, full_key)
+        led.append(flight)
+        return Lookup(self, route, full_key, ttl, None, flight=flight)
+
+    def _joined(self, flight: Flight, body: Optional[bytes], ttl: Optional[float]) -> Lookup:
+        with self._lock:
+            if body is not None:
+                self._routes[flight.route].coalesced += 1
+            else:
+                # The leader gave up or is too slow: build it here, without leading a new flight
+                self._routes[flight.route].misses += 1
+        return Lookup(self, flight.route, flight.key, ttl, body, "COALESCED")
+
+    def lookup(self, route: str, key: str, tags: Sequence[str], ttl: Optional[float] = None,
+               variant: Sequence[Any] = ()) -> Lookup:
+        """route names the metrics bucket; key identifies the response within it (see request_key);
+        variant separates callers who must not share a response (auth scope)"""
+        found = self._begin(route, key, tags, ttl, variant)
+        if isinstance(found, Flight):
+            return self._joined(found, found.wait(RESPONSE_CACHE_COALESCE_WAIT_SECONDS), ttl)
+        return found
+
+    async def lookup_async(self, route: str, key: str, tags: Sequence[str], ttl: Optional[float] = None,
+                           variant: Sequence[Any] = ()) -> Lookup:
+        if self.shared is not None:
+            found = await run_in_threadpool(self._begin, route, key, tags, ttl, variant)
+        else:
+            found = self._begin(route, key, tags, ttl, variant)
+        if isinstance(found, Flight):
+            return self._joined(found, await found.wait_async(RESPONSE_CACHE_COALESCE_WAIT_SECONDS), ttl)
+        return found
+
+    def put(self, lookup: Lookup, body: bytes):
+        ttl = self.ttl_seconds if lookup.ttl is None else min(lookup.ttl, self.ttl_seconds)
+        self.local.put(lookup.key, body, ttl)
+        # Waiters first: they should not pay for the shared-tier round trip
+        if lookup.flight is not None:
+            self._land(lookup.flight, body)
+            lookup.flight = None
+        self._shared("SET", self.prefix + lookup.key, body, "PX", max(1, int(ttl * 1000)))
+        with self._lock:
+            self._routes[lookup.route].stores += 1
+
+    def _land(self, flight: Flight, body: Optional[bytes]):
+        with self._lock:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+            if body is None:
+                self._routes[flight.route].abandoned += 1
+        flight.finish(body)
+
+    # ---- coalescing ----
+
+    def coalesce(self, handler):
+        """Decorator for handlers that use lookup(): lets them lead flights, and releases
+        the waiters of any flight the handler leaves without storing (errors, early returns)"""
+        if asyncio.iscoroutinefunction(handler):
+            @functools.wraps(handler)
+            async def async_wrapper(*args, **kwargs):
+                token = _led_flights.set([])
+                try:
+                    return await handler(*args, **kwargs)
+                finally:
+                    self._release(_led_flights.get())
+                    _led_flights.reset(token)
+            return async_wrapper
+
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            token = _led_flights.set([])
+            try:
+                return handler(*args, **kwargs)
+            finally:
+                self._release(_led_flights.get())
+                _led_flights.reset(token)
+        return wrapper
+
+    def _release(self, flights: Optional[List[Flight]]):
+        for flight in flights or ():
+            if not flight.done:
+                self._land(flight, None)
+
+    # ---- invalidation ----
+
+    def invalidate(self, *tags: str):
+        """Make every entry built from these tags unreachable, here and (shared tier) in every worker"""
+        tags = tuple(dict.fromkeys(tags))
+        if not tags:
+            return
+        with self._lock:
+            for tag in tags:
+                self._generations[tag] += 1
+            self.invalidations += len(tags)
+        for tag in tags:
+            self._shared("INCR", self._tag_key(tag))
+
+    def track(self, model, *tags: str, attributes: Optional[Iterable[str]] = None):
+        """Invalidate tags after a commit that wrote model through the ORM.
+
+        Tags may use {id} for the written row's id ("lesson:{id}"). With
+        attributes, updates only count when one of them changed.
+        """
+        watched = tuple(attributes) if attributes is not None else None
+
+        def on_write(mapper, connection, target):
+            session = object_session(target)
+            if session is None:
+                return
+            pending = session.info.setdefault(_SESSION_KEY, set())
+            pending.update(tag.format(id=target.id) for tag in tags)
+
+        def on_update(mapper, connection, target):
+            if watched is not None:
+                state = inspect(target)
+                if not any(state.attrs[name].history.has_changes() for name in watched if name in state.attrs):
+                    return
+            on_write(mapper, connection, target)
+
+        event.listen(model, "after_insert", on_write)
+        event.listen(model, "after_update", on_update)
+        event.listen(model, "after_delete", on_write)
+        if not event.contains(Session, "after_commit", self._after_commit):
+            event.listen(Session, "after_commit", self._after_commit)
+            event.listen(Session, "after_rollback", self._after_rollback)
+
+    def _after_commit(self, session):
+        tags = session.info.pop(_SESSION_KEY, None)
+        if tags:
+            self.invalidate(*sorted(tags))
+
+    def _after_rollback(self, session):
+        session.info.pop(_SESSION_KEY, None)
+
+    # ---- metrics ----
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = {route: stats.as_dict() for route, stats in sorted(self._routes.items())}
+            hits = sum(r["hits"] for r in routes.values())
+            coalesced = sum(r["coalesced"] for r in routes.values())
+            lookups = hits + coalesced + sum(r["misses"] for r in routes.values())
+            return {
+                "backend": "local+shared" if self.shared is not None else "local",
+                "shared_available": self.shared is not None and time.monotonic() >= self._shared_down_until,
+                "shared_errors": self.shared_errors,
+                "invalidations": self.invalidations,
+                "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+                "coalesced": coalesced,
+                "in_flight": len(self._flights),
+                "local": self.local.stats(),
+                "routes": routes,
+            }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Invalidate response cache tags in the shared tier")
+    parser.add_argument("tags", nargs="+", help='e.g. subjects games leaderboard lessons "lesson:12"')
+    args = parser.parse_args()
+    if not RESPONSE_CACHE_URL:
+        parser.error("RESPONSE_CACHE_URL is not set; in-process caches expire on their own after the TTL")
+    ResponseCache().invalidate(*args.tags)
+    print(f" Invalidated: {', '.join(args.tags)}")
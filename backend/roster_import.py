@@ -0,0 +1,211 @@
+# backend/roster_import.py
+"""Bulk-create students, parents and teachers from a CSV or NDJSON roster.
+
+Usage: python roster_import.py roster.csv [--format csv|ndjson] [--partial]
+
+CSV/NDJSON fields: username, email, password, role and, for students,
+an optional parent_username (an existing parent or one in the same roster).
+"""
+from passlib.context import CryptContext
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterator, List
+import argparse
+import csv
+import io
+import json
+
+from hashing import hashing_pool
+
+IMPORTABLE_ROLES = {"student", "parent", "teacher"}
+REQUIRED_FIELDS = ("username", "email", "password", "role")
+
+
+def parse_roster(content: bytes, fmt: str) -> List[Dict[str, Any]]:
+    """Parse a roster file into row dicts; unparseable NDJSON lines become rows carrying _parse_error"""
+    text = content.decode("utf-8-sig")
+    if fmt == "csv":
+        return [dict(row) for row in csv.DictReader(io.StringIO(text))]
+    if fmt == "ndjson":
+        rows = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                rows.append(row if isinstance(row, dict) else {"_parse_error": "Line is not a JSON object"})
+            except ValueError as e:
+                rows.append({"_parse_error": f"Invalid JSON: {e}"})
+        return rows
+    raise ValueError(f"Unsupported roster format: {fmt}")
+
+
+def _clean(row: Dict[str, Any], field: str) -> str:
+    value = row.get(field)
+    return str(value).strip() if value is not None else ""
+
+
+def import_roster(
+    db: Session,
+    user_model,
+    context: CryptContext,
+    rows: List[Dict[str, Any]],
+    partial: bool = False,
+) -> List[Dict[str, Any]]:
+    """Validate, hash and insert a roster in one transaction, returning one result per row.
+
+    Unless partial is set, any invalid row means nothing is inserted.
+    """
+    table = user_model.__table__
+    results = []
+    entries = []
+
+    # Pass 1: field validation and duplicates within the file
+    seen_usernames, seen_emails = set(), set()
+    for number, row in enumerate(rows, start=1):
+        entry = {field: _clean(row, field) for field in REQUIRED_FIELDS + ("parent_username",)}
+        entry["role"] = entry["role"].lower()
+        errors = []
+        if row.get("_parse_error"):
+            errors.append(row["_parse_error"])
+        else:
+            errors.extend(f"Missing {field}" for field in REQUIRED_FIELDS if not entry[field])
+            if entry["role"] and entry["role"] not in IMPORTABLE_ROLES:
+                errors.append(f"Role must be one of {', '.join(sorted(IMPORTABLE_ROLES))}")
+            if entry["email"] and "@" not in entry["email"]:
+                errors.append("Invalid email")
+            if entry["parent_username"] and entry["role"] != "student":
+                errors.append("Only students can have a parent_username")
+            if entry["username"] and entry["username"] in seen_usernames:
+                errors.append("Duplicate username in roster")
+            if entry["email"] and entry["email"].lower() in seen_emails:
+                errors.append("Duplicate email in roster")
+            # Only real values count as taken: blank fields already report "Missing ..."
+            if entry["username"]:
+                seen_usernames.add(entry["username"])
+            if entry["email"]:
+                seen_emails.add(entry["email"].lower())
+        entries.append(entry)
+        results.append({"row": number, "username": entry["username"] or None, "errors": errors})
+
+    # Pass 2: one set-based query for collisions with existing users and for parent lookups
+    usernames = {e["username"] for e in entries if e["username"]}
+    parent_usernames = {e["parent_username"] for e in entries if e["parent_username"]}
+    # Emails compare case-insensitively, as in the in-file duplicate check above
+    emails = {e["email"].lower() for e in entries if e["email"]}
+    existing = db.execute(
+        select(table.c.id, table.c.username, table.c.email, table.c.role).where(
+            or_(table.c.username.in_(usernames | parent_usernames), func.lower(table.c.email).in_(emails))
+        )
+    ).all() if usernames or emails else []
+    taken_usernames = {r.username for r in existing}
+    taken_emails = {r.email.lower() for r in existing if r.email}
+    existing_parents = {r.username: r.id for r in existing if r.role == "parent"}
+
+    for entry, result in zip(entries, results):
+        if entry["username"] in taken_usernames:
+            result["errors"].append("Username already exists")
+        if entry["email"] and entry["email"].lower() in taken_emails:
+            result["errors"].append("Email already registered")
+
+    roster_parents = {
+        e["username"] for e, r in zip(entries, results) if e["role"] == "parent" and not r["errors"]
+    }
+    for entry, result in zip(entries, results):
+        parent = entry["parent_username"]
+        if parent and not result["errors"] and parent not in existing_parents and parent not in roster_parents:
+            result["errors"].append(f"Parent '{parent}' not found")
+
+    valid = [i for i, result in enumerate(results) if not result["errors"]]
+    if len(valid) < len(results) and not partial:
+        for i in valid:
+            results[i]["status"] = "skipped"
+        for result in results:
+            result.setdefault("status", "error")
+        return results
+
+    # Pass 3: hash in parallel across the pool, then insert everything in one transaction.
+    # Parents and teachers go first so students can reference parent ids created here.
+    hashes = hashing_pool.hash_many(context, [entries[i]["password"] for i in valid])
+    records = {
+        i: {
+            "username": entries[i]["username"],
+            "email": entries[i]["email"],
+            "hashed_password": hashed,
+            "role": entries[i]["role"],
+        }
+        for i, hashed in zip(valid, hashes)
+    }
+    adults = [i for i in valid if entries[i]["role"] != "student"]
+    students = [i for i in valid if entries[i]["role"] == "student"]
+    created_ids = {}
+    try:
+        if adults:
+            inserted = db.execute(
+                insert(table).returning(table.c.id, table.c.username),
+                [records[i] for i in adults],
+            ).all()
+            created_ids.update({r.username: r.id for r in inserted})
+        if students:
+            parent_ids = {**existing_parents, **created_ids}
+            for i in students:
+                records[i]["parent_id"] = parent_ids.get(entries[i]["parent_username"])
+            inserted = db.execute(
+                insert(table).returning(table.c.id, table.c.username),
+                [records[i] for i in students],
+            ).all()
+            created_ids.update({r.username: r.id for r in inserted})
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    for i, result in enumerate(results):
+        if i in records:
+            result["status"] = "created"
+            result["id"] = created_ids.get(entries[i]["username"])
+            result["role"] = entries[i]["role"]
+        else:
+            result["status"] = "error"
+    return results
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, int]:
+    summary = {"created": 0, "error": 0, "skipped": 0}
+    for result in results:
+        summary[result["status"]] += 1
+    return summary
+
+
+def iter_report(results: List[Dict[str, Any]]) -> Iterator[str]:
+    """NDJSON report: one line per row, then a summary line"""
+    for result in results:
+        yield json.dumps(result) + "\n"
+    yield json.dumps({"summary": summarize(results)}) + "\n"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a student/parent/teacher roster")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "ndjson"])
+    parser.add_argument("--partial", action="store_true", help="insert valid rows even if some rows fail")
+    args = parser.parse_args()
+
+    from main import SessionLocal, User, pwd_context
+    from hash_calibration import load_params, apply_params
+
+    hash_params = load_params()
+    if hash_params:
+        apply_params(pwd_context, hash_params)
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    with open(args.path, "rb") as f:
+        roster_rows = parse_roster(f.read(), fmt)
+
+    db = SessionLocal()
+    try:
+        for line in iter_report(import_roster(db, User, pwd_context, roster_rows, partial=args.partial)):
+            print(line, end="")
+    finally:
+        db.close()
+        hashing_pool.shutdown()
@@ -1,5 +1,5 @@
 # backend/routers/admin.py
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
@@ -9,6 +9,10 @@ from schemas import (
     SchoolCreate, SchoolOut, IslandOut, SubjectCreate, SubjectOut
 )
 from dependencies import get_db, get_current_user
+from principal_cache import principal_cache
+from leaderboard_index import leaderboard_index
+from pagination import MAX_PAGE_SIZE, keyset, page
+from batch_loader import Loaders
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 
@@ -21,9 +25,11 @@ def require_admin(current_user: User = Depends(get_current_user)):
 # Users Management
 @router.get("/users", response_model=List[UserOut])
 def get_all_users(
+    response: Response,
     role: Optional[str] = Query(None),
-    skip: int = 0,
-    limit: int = 100,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, deprecated=True),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
 ):
@@ -33,8 +39,7 @@ def get_all_users(
     if role and role != "all":
         query = query.filter(User.role == role)
     
-    users = query.offset(skip).limit(limit).all()
-    return users
+    return page(keyset(query, User.id, cursor, limit, skip).all(), limit, response)
 
 @router.delete("/users/{user_id}")
 def delete_user(
@@ -51,6 +56,7 @@ def delete_user(
     if user.id == current_user.id:
         raise HTTPException(status_code=400, detail="Cannot delete yourself")
     
+    username = user.username
     try:
         db.delete(user)
         db.commit()
@@ -58,24 +64,32 @@ def delete_user(
         db.rollback()
         raise HTTPException(status_code=400, detail="Failed to delete user")
     
+    principal_cache.invalidate(username)
+    leaderboard_index.remove(user_id)
+    
     return {"message": "User deleted successfully"}
 
 # Assignments Management
 @router.get("/assignments", response_model=List[dict])
 def get_assignments(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, deprecated=True),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     db: Session = Depends(get_db),
     current_user: User = Depends(require_admin)
 ):
     """Get all student assignments"""
-    assignments = db.query(Assignment).offset(skip).limit(limit).all()
+    assignments = page(keyset(db.query(Assignment), Assignment.id, cursor, limit, skip).all(), limit, response)
+    
+    # Every student/parent/teacher of the page in one query
+    users = Loaders(db)(User)
+    for a in assignments:
+        users.want(a.student_id, a.parent_id, a.teacher_id)
     
     result = []
     for a in assignments:
-        student = db.query(User).filter(User.id == a.student_id).first()
-        parent = db.query(User).filter(User.id == a.parent_id).first() if a.parent_id else None
-        teacher = db.query(User).filter(User.id == a.teacher_id).first() if a.teacher_id else None
+        student, parent, teacher = users.get(a.student_id), users.get(a.parent_id), users.get(a.teacher_id)
         
         result.append({
             "id": a.id,
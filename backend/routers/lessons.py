@@ -1,55 +1,101 @@
 # backend/routers/lessons.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session, undefer
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
 from models import User, Lesson, Subject
-from schemas import LessonCreate, LessonOut
+from schemas import LessonCreate, LessonOut, LESSON_VIEWS
 from dependencies import get_db, get_current_user
+from pagination import MAX_PAGE_SIZE, decode_cursor, keyset, page
+from multivalue import match_values, split_values
+from lesson_search import ranked
+from fieldsets import Fieldset
 
 router = APIRouter(prefix="/lessons", tags=["Lessons"])
+lesson_fields = Fieldset(Lesson, LESSON_VIEWS)
 
-@router.get("", response_model=List[LessonOut])
+@router.get("", response_model=List[LessonOut], response_model_exclude_unset=True)
 def get_lessons(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = Query(0, deprecated=True),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
     concept_id: Optional[int] = None,
     creator_id: Optional[int] = None,
+    subject_id: Optional[int] = None,
+    subject: Optional[int] = Query(None, deprecated=True),
+    grade_level: Optional[int] = None,
+    term_id: Optional[int] = None,
+    tag: Optional[List[str]] = Query(None),
+    grade: Optional[List[str]] = Query(None),
+    match: str = Query("any", pattern="^(any|all)$"),
+    fields: Optional[List[str]] = Query(None),
+    view: str = Query("full", pattern="^(full|summary)$"),
     db: Session = Depends(get_db)
 ):
-    """Get all lessons with optional filters"""
-    query = db.query(Lesson)
+    """Get all lessons with optional filters (tag/grade match any or all of the given values).
+
+    ?fields=title,points or ?view=summary return (and load) only those fields.
+    """
+    selected = lesson_fields.resolve(fields, view)
+    query = db.query(Lesson).options(lesson_fields.load(selected))
+    subject_id = subject_id or subject
     
     if concept_id:
         query = query.filter(Lesson.concept_id == concept_id)
     if creator_id:
         query = query.filter(Lesson.creator_id == creator_id)
-    
-    lessons = query.offset(skip).limit(limit).all()
-    
-    # Convert string fields to lists for response
-    result = []
-    for lesson in lessons:
-        lesson_dict = {c.name: getattr(lesson, c.name) for c in lesson.__table__.columns}
-        lesson_dict['grade_levels'] = lesson.grade_levels.split(',') if lesson.grade_levels else []
-        lesson_dict['tags'] = lesson.tags.split(',') if lesson.tags else []
-        result.append(lesson_dict)
-    
-    return result
+    # Materialized curriculum path, see lesson_path.py
+    if subject_id:
+        query = query.filter(Lesson.subject_id == subject_id)
+    if grade_level is not None:
+        query = query.filter(Lesson.grade_level == grade_level)
+    if term_id:
+        query = query.filter(Lesson.term_id == term_id)
+    if split_values(tag):
+        query = query.filter(match_values(Lesson, "tags", split_values(tag), match))
+    if split_values(grade):
+        query = query.filter(match_values(Lesson, "grade_levels", split_values(grade), match))
+    
+    return lesson_fields.dump_all(page(keyset(query, Lesson.id, cursor, limit, skip).all(), limit, response), selected)
+
+@router.get("/search", response_model=List[LessonOut], response_model_exclude_unset=True)
+def search_lessons(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    fields: Optional[List[str]] = Query(None),
+    view: str = Query("full", pattern="^(full|summary)$"),
+    db: Session = Depends(get_db)
+):
+    """Full-text search, best match first (the cursor is the offset of the next page)"""
+    selected = lesson_fields.resolve(fields, view)
+    matches = ranked(db.get_bind(), q)
+    if matches is None:
+        return []
+    offset = decode_cursor(cursor) if cursor else 0
+    if not isinstance(offset, int) or offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    query = (
+        db.query(Lesson)
+        .options(lesson_fields.load(selected))
+        .join(matches, matches.c.lesson_id == Lesson.id)
+        .order_by(matches.c.score.desc(), Lesson.id)
+        .offset(offset)
+        .limit(limit + 1)
+    )
+    return lesson_fields.dump_all(page(query.all(), limit, response, key=lambda _: offset + limit), selected)
 
 @router.get("/{lesson_id}", response_model=LessonOut)
 def get_lesson(lesson_id: int, db: Session = Depends(get_db)):
     """Get a specific lesson by ID"""
-    lesson = db.query(Lesson).filter(Lesson.id == lesson_id).first()
+    lesson = db.query(Lesson).options(undefer(Lesson.content_html)).filter(Lesson.id == lesson_id).first()
     if not lesson:
         raise HTTPException(status_code=404, detail="Lesson not found")
     
-    # Convert to dict and parse string fields
-    lesson_dict = {c.name: getattr(lesson, c.name) for c in lesson.__table__.columns}
-    lesson_dict['grade_levels'] = lesson.grade_levels.split(',') if lesson.grade_levels else []
-    lesson_dict['tags'] = lesson.tags.split(',') if lesson.tags else []
-    
-    return lesson_dict
+    return lesson
 
 @router.post("", response_model=LessonOut, status_code=status.HTTP_201_CREATED)
 def create_lesson(
@@ -61,12 +107,7 @@ def create_lesson(
     if current_user.role not in ['teacher', 'parent', 'admin']:
         raise HTTPException(status_code=403, detail="Not authorized to create lessons")
     
-    # Convert lists to strings for database storage
-    lesson_dict = lesson.dict()
-    lesson_dict['grade_levels'] = ','.join(lesson_dict['grade_levels']) if lesson_dict['grade_levels'] else ''
-    lesson_dict['tags'] = ','.join(lesson_dict['tags']) if lesson_dict['tags'] else ''
-    
-    db_lesson = Lesson(**lesson_dict, creator_id=current_user.id)
+    db_lesson = Lesson(**lesson.dict(), creator_id=current_user.id)
     
     try:
         db.add(db_lesson)
@@ -76,12 +117,7 @@ def create_lesson(
         db.rollback()
         raise HTTPException(status_code=400, detail="Failed to create lesson")
     
-    # Convert back for response
-    lesson_out = {c.name: getattr(db_lesson, c.name) for c in db_lesson.__table__.columns}
-    lesson_out['grade_levels'] = lesson.grade_levels
-    lesson_out['tags'] = lesson.tags
-    
-    return lesson_out
+    return db_lesson
 
 @router.put("/{lesson_id}", response_model=LessonOut)
 def update_lesson(
@@ -101,14 +137,6 @@ def update_lesson(
     
     update_data = lesson_update.dict(exclude_unset=True)
     
-    # Handle grade_levels conversion
-    if 'grade_levels' in update_data and update_data['grade_levels']:
-        update_data['grade_levels'] = ','.join(update_data['grade_levels'])
-    
-    # Handle tags conversion
-    if 'tags' in update_data and update_data['tags']:
-        update_data['tags'] = ','.join(update_data['tags'])
-    
     for field, value in update_data.items():
         setattr(lesson, field, value)
     
@@ -119,12 +147,7 @@ def update_lesson(
         db.rollback()
         raise HTTPException(status_code=400, detail="Failed to update lesson")
     
-    # Convert back for response
-    lesson_out = {c.name: getattr(lesson, c.name) for c in lesson.__table__.columns}
-    lesson_out['grade_levels'] = lesson_update.grade_levels
-    lesson_out['tags'] = lesson_update.tags
-    
-    return lesson_out
+    return lesson
 
 @router.delete("/{lesson_id}")
 def delete_lesson(
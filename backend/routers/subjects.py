@@ -1,6 +1,6 @@
 # backend/routers/subjects.py
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from sqlalchemy.exc import IntegrityError
 from typing import List
 from models import User, Subject, School, Island
@@ -81,7 +81,7 @@ def get_schools(
     db: Session = Depends(get_db)
 ):
     """Get all schools"""
-    query = db.query(School)
+    query = db.query(School).options(selectinload(School.island))
     
     if island_id:
         query = query.filter(School.island_id == island_id)
@@ -90,7 +90,7 @@ def get_schools(
     
     result = []
     for school in schools:
-        island = db.query(Island).filter(Island.id == school.island_id).first() if school.island_id else None
+        island = school.island
         result.append({
             "id": school.id,
             "name": school.name,
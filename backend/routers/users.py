@@ -3,9 +3,11 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from typing import List, Optional
-from models import User
+from models import User, UserStats
 from schemas import UserOut, UserUpdate
 from dependencies import get_db, get_current_user, get_current_active_user
+from principal_cache import principal_cache
+from user_stats import stats_payload
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -39,6 +41,7 @@ def update_user(
         raise HTTPException(status_code=403, detail="Not authorized to update this user")
     
     # Update fields
+    old_username = user.username
     update_data = user_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(user, field, value)
@@ -49,6 +52,8 @@ def update_user(
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Update failed")
+    finally:
+        principal_cache.invalidate(old_username, update_data.get('username'))
     
     return user
 
@@ -58,21 +63,7 @@ def get_my_stats(
     db: Session = Depends(get_db)
 ):
     """Get current user's statistics"""
-    from models import Progress
-    
-    progress_records = db.query(Progress).filter(Progress.user_id == current_user.id).all()
-    completed = [p for p in progress_records if p.completed]
-    
-    return {
-        "user_id": current_user.id,
-        "username": current_user.username,
-        "total_points": current_user.points or 0,
-        "level": current_user.level or "Explorer",
-        "streak": current_user.streak or 0,
-        "completed_lessons": len(completed),
-        "total_lessons_attempted": len(progress_records),
-        "average_score": sum([p.score or 0 for p in completed]) / len(completed) if completed else 0
-    }
+    return stats_payload(current_user, db.get(UserStats, current_user.id))
 
 @router.get("/{user_id}/stats")
 def get_user_stats(
@@ -89,17 +80,4 @@ def get_user_stats(
     if current_user.id != user_id and current_user.role not in ['admin', 'teacher', 'parent']:
         raise HTTPException(status_code=403, detail="Not authorized")
     
-    from models import Progress
-    progress_records = db.query(Progress).filter(Progress.user_id == user_id).all()
-    completed = [p for p in progress_records if p.completed]
-    
-    return {
-        "user_id": user_id,
-        "username": user.username,
-        "total_points": user.points,
-        "level": user.level,
-        "streak": user.streak,
-        "completed_lessons": len(completed),
-        "total_lessons_attempted": len(progress_records),
-        "average_score": sum([p.score or 0 for p in completed]) / len(completed) if completed else 0
-    }
\ No newline at end of file
+    return stats_payload(user, db.get(UserStats, user_id))
\ No newline at end of file
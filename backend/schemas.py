@@ -52,26 +52,35 @@ class LessonCreate(BaseModel):
     prerequisites: str = ""
     tags: List[str] = []
 
+# Every field but id is optional: list endpoints return only the requested fields (?fields= / ?view=)
 class LessonOut(BaseModel):
     id: int
-    concept_id: Optional[int]
-    title: str
-    content_html: str
-    creator_id: Optional[int]
-    created_at: datetime
-    category: str
-    difficulty: str
-    estimated_time: int
-    points: int
-    grade_levels: List[str]
-    description: str
-    objectives: str
-    prerequisites: str
-    tags: List[str]
+    concept_id: Optional[int] = None
+    title: Optional[str] = None
+    content_html: Optional[str] = None
+    creator_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    category: Optional[str] = None
+    difficulty: Optional[str] = None
+    estimated_time: Optional[int] = None
+    points: Optional[int] = None
+    grade_levels: Optional[List[str]] = None
+    description: Optional[str] = None
+    objectives: Optional[str] = None
+    prerequisites: Optional[str] = None
+    tags: Optional[List[str]] = None
+    subject_id: Optional[int] = None
+    grade_level: Optional[int] = None
+    term_id: Optional[int] = None
     
     class Config:
         from_attributes = True
 
+LESSON_VIEWS = {
+    "full": tuple(LessonOut.model_fields),
+    "summary": ("id", "title", "category", "difficulty", "points", "estimated_time", "subject_id", "grade_level"),
+}
+
 # Game Schemas
 class GameCreate(BaseModel):
     lesson_id: Optional[int] = None
@@ -109,7 +118,8 @@ class QuizOut(BaseModel):
     question: str
     question_type: str
     options: List[str]
-    correct_answer: str
+    # Only sent to authors (teacher/parent/admin); players are graded server-side
+    correct_answer: Optional[str] = None
     explanation: str
     points: int
     difficulty: str
@@ -0,0 +1,130 @@
+# backend/table_versions.py
+"""Per-table version counters for conditional GETs on the catalog endpoints.
+
+Any ORM insert/update/delete on a tracked model bumps its table's row in
+`table_versions`, once per transaction and inside that transaction, so a new
+version becomes visible exactly when the data does. Core bulk writes call
+bump() themselves. A GET reads only the counter rows it depends on (one
+primary-key lookup, no catalog rows), derives a strong ETag and Last-Modified
+from them, and answers If-None-Match / If-Modified-Since with 304 before
+touching the data.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response, status
+from functools import partial
+from sqlalchemy import BigInteger, Column, MetaData, String, TIMESTAMP, Table, event, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, object_session
+from typing import Any, Dict, Iterable, Optional, Sequence
+import hashlib
+import os
+
+# ==================== CONFIGURATION ====================
+# Shared caches (nginx) may keep public catalog responses but must revalidate them
+CATALOG_CACHE_CONTROL = os.getenv("CATALOG_CACHE_CONTROL", "public, no-cache")
+# Responses that depend on who is asking stay in the browser cache only
+PRIVATE_CACHE_CONTROL = os.getenv("PRIVATE_CACHE_CONTROL", "private, no-cache")
+# Part of every ETag: change it on deploys that change a response shape
+CATALOG_ETAG_SALT = os.getenv("CATALOG_ETAG_SALT", "1")
+
+_SESSION_KEY = "table_versions_bumped"
+
+_table: Optional[Table] = None
+
+
+def version_table(metadata: MetaData) -> Table:
+    global _table
+    _table = Table(
+        "table_versions",
+        metadata,
+        Column("name", String(64), primary_key=True),
+        Column("version", BigInteger, nullable=False, default=0),
+        Column("updated_at", TIMESTAMP, nullable=True),
+    )
+    return _table
+
+
+def bump(connection, *names: str, at: Optional[datetime] = None):
+    """Increment the counters of the given tables; they commit (or roll back) with the caller's transaction"""
+    if not names:
+        return
+    at = at or datetime.utcnow()
+    dialect_insert = pg_insert if connection.dialect.name == "postgresql" else sqlite_insert
+    # Sorted so concurrent writers lock counter rows in the same order
+    stmt = dialect_insert(_table).values([{"name": name, "version": 1, "updated_at": at} for name in sorted(set(names))])
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=[_table.c.name],
+        set_={"version": _table.c.version + 1, "updated_at": stmt.excluded.updated_at},
+    ))
+
+
+def _on_write(names: Sequence[str], mapper, connection, target):
+    session = object_session(target)
+    done = session.info.setdefault(_SESSION_KEY, set()) if session is not None else set()
+    todo = [name for name in names if name not in done]
+    if todo:
+        bump(connection, *todo)
+        done.update(todo)
+
+
+def _transaction_end(session, transaction):
+    # A rolled-back savepoint may have undone a bump: let the next write bump again
+    session.info.pop(_SESSION_KEY, None)
+
+
+def track_versions(model, *names: str):
+    """Bump names (default: the model's own table) whenever model is written through the ORM"""
+    handler = partial(_on_write, names or (model.__table__.name,))
+    for kind in ("after_insert", "after_update", "after_delete"):
+        event.listen(model, kind, handler)
+    if not event.contains(Session, "after_transaction_end", _transaction_end):
+        event.listen(Session, "after_transaction_end", _transaction_end)
+
+
+def versions_query(*names: str):
+    return select(_table.c.name, _table.c.version, _table.c.updated_at).where(_table.c.name.in_(names))
+
+
+class Conditional:
+    """Validators of one catalog response, derived from the versions of the tables it reads"""
+
+    def __init__(self, request: Request, rows: Iterable[Any], names: Sequence[str], variant: Sequence[Any] = (),
+                 private: bool = False):
+        found = {row.name: row for row in rows}
+        versions = [f"{name}:{found[name].version if name in found else 0}" for name in names]
+        # The URL is part of the tag so a tag is never valid for another page, filter or view
+        key = "|".join([CATALOG_ETAG_SALT, request.url.path, str(request.url.query), *versions, *map(str, variant)])
+        self.etag = '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+        stamps = [found[name].updated_at for name in names if name in found and found[name].updated_at]
+        self.last_modified = max(stamps).replace(tzinfo=timezone.utc, microsecond=0) if stamps else None
+        self.headers: Dict[str, str] = {
+            "ETag": self.etag,
+            "Cache-Control": PRIVATE_CACHE_CONTROL if private else CATALOG_CACHE_CONTROL,
+        }
+        if self.last_modified:
+            self.headers["Last-Modified"] = format_datetime(self.last_modified, usegmt=True)
+        if private:
+            self.headers["Vary"] = "Authorization"
+        self.not_modified = self._matches(request)
+
+    def _matches(self, request: Request) -> bool:
+        # If-None-Match wins; If-Modified-Since only counts when no tags were sent
+        header = request.headers.get("if-none-match")
+        if header:
+            tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+            return "*" in tags or self.etag in tags
+        since = request.headers.get("if-modified-since")
+        if since and self.last_modified:
+            try:
+                return self.last_modified <= parsedate_to_datetime(since)
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def response_304(self) -> Response:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=self.headers)
+
+    def apply(self, response: Response):
+        response.headers.update(self.headers)
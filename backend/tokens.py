@@ -0,0 +1,62 @@
+# backend/tokens.py
+from jose import JWTError, jwt
+from datetime import datetime, timedelta
+from typing import Any, Dict
+import hashlib
+import os
+import time
+import uuid
+
+from ttl_cache import TTLCache
+
+# ==================== CONFIGURATION ====================
+SECRET_KEY = os.getenv("SECRET_KEY", "your_super_secret_key_here_change_this_in_production")
+ALGORITHM = os.getenv("ALGORITHM", "HS256")
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "20000"))
+
+REFRESH_TOKEN_TYPE = "refresh"
+
+# Claims of access tokens whose signature was already verified, keyed by token digest.
+# Entries never outlive the token's own exp claim.
+token_cache = TTLCache(TOKEN_CACHE_TTL_SECONDS, TOKEN_CACHE_MAX_ENTRIES)
+
+
+def _token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def verify_access_token(token: str) -> Dict[str, Any]:
+    """Return the claims of a valid access token, skipping signature checks for recently verified tokens"""
+    digest = _token_digest(token)
+    claims = token_cache.get(digest)
+    if claims is not None:
+        if claims.get("exp", 0) > time.time():
+            return claims
+        token_cache.invalidate(digest)
+
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    if claims.get("type") == REFRESH_TOKEN_TYPE:
+        raise JWTError("Refresh tokens cannot be used as access tokens")
+    remaining = claims.get("exp", 0) - time.time()
+    if remaining > 0:
+        token_cache.put(digest, claims, ttl_seconds=remaining)
+    return claims
+
+
+def create_refresh_token(subject: str) -> str:
+    expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    return jwt.encode(
+        {"sub": subject, "type": REFRESH_TOKEN_TYPE, "jti": uuid.uuid4().hex, "exp": expire},
+        SECRET_KEY,
+        algorithm=ALGORITHM,
+    )
+
+
+def decode_refresh_token(token: str) -> Dict[str, Any]:
+    """Verify a refresh token's signature, expiry and type (the denylist is checked by the caller)"""
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    if claims.get("type") != REFRESH_TOKEN_TYPE or not claims.get("jti") or not claims.get("sub"):
+        raise JWTError("Not a refresh token")
+    return claims
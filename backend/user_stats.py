@@ -0,0 +1,133 @@
+# backend/user_stats.py
+"""Per-user progress rollup (completed/attempted counts, score sum, last activity).
+
+The rollup row is bumped in the same transaction as the Progress write that
+changes it, so the stats endpoints read one row by primary key instead of
+every Progress row of the user. `reconcile` recomputes all rows set-based
+from progress to repair any drift.
+
+Usage: python user_stats.py reconcile
+"""
+from datetime import datetime
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.orm import Session
+from typing import Optional
+import argparse
+
+from progress_store import dialect_insert
+
+# record_completion outcomes
+INSERTED = "inserted"      # new progress row, completed
+COMPLETED = "completed"    # existing row completed for the first time
+REPEAT = "repeat"          # already completed, only the score changed
+
+
+def bump_stats(
+    db: Session,
+    stats_model,
+    user_id: int,
+    attempted: int = 0,
+    completed: int = 0,
+    score: int = 0,
+    at: Optional[datetime] = None,
+):
+    """Add deltas to a user's rollup row, creating it if needed (the caller commits)"""
+    table = stats_model.__table__
+    at = at or datetime.utcnow()
+    stmt = dialect_insert(db)(table).values(
+        user_id=user_id, attempted_count=attempted, completed_count=completed, score_sum=score, last_activity_at=at
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.user_id],
+        set_={
+            "attempted_count": table.c.attempted_count + stmt.excluded.attempted_count,
+            "completed_count": table.c.completed_count + stmt.excluded.completed_count,
+            "score_sum": table.c.score_sum + stmt.excluded.score_sum,
+            "last_activity_at": stmt.excluded.last_activity_at,
+        },
+    ))
+
+
+def record_completion_stats(db: Session, stats_model, user_id: int, outcome: str, score: int,
+                            previous_score: Optional[int] = None):
+    """Apply a record_completion outcome to the user's rollup"""
+    if outcome == INSERTED:
+        bump_stats(db, stats_model, user_id, attempted=1, completed=1, score=score or 0)
+    elif outcome == COMPLETED:
+        bump_stats(db, stats_model, user_id, completed=1, score=score or 0)
+    else:
+        # The overwritten score already counts in score_sum: add the difference
+        bump_stats(db, stats_model, user_id, score=(score or 0) - (previous_score or 0))
+
+
+def _rollup_select(progress):
+    completed = progress.c.completed.is_(True)
+    return select(
+        progress.c.user_id,
+        func.count(),
+        func.coalesce(func.sum(case((completed, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((completed, func.coalesce(progress.c.score, 0)), else_=0)), 0),
+        func.max(progress.c.completed_at),
+    ).where(progress.c.user_id.is_not(None)).group_by(progress.c.user_id)
+
+
+_COLUMNS = ["user_id", "attempted_count", "completed_count", "score_sum", "last_activity_at"]
+
+
+def reconcile_user(db: Session, stats_model, progress_model, user_id: int):
+    """Recompute one user's rollup row from progress"""
+    table, progress = stats_model.__table__, progress_model.__table__
+    db.execute(delete(table).where(table.c.user_id == user_id))
+    db.execute(insert(table).from_select(_COLUMNS, _rollup_select(progress).where(progress.c.user_id == user_id)))
+
+
+def reconcile(db: Session, stats_model, progress_model) -> int:
+    """Recompute every rollup row from progress in two statements; returns the number of rows"""
+    table = stats_model.__table__
+    db.execute(delete(table))
+    return db.execute(insert(table).from_select(_COLUMNS, _rollup_select(progress_model.__table__))).rowcount
+
+
+def ensure_user_stats(bind, stats_model, progress_model):
+    """Fill an empty rollup table from existing progress (first start after the table was added)"""
+    table, progress = stats_model.__table__, progress_model.__table__
+    with Session(bind) as db:
+        if db.execute(select(table.c.user_id).limit(1)).first() is not None:
+            return
+        if db.execute(select(progress.c.id).limit(1)).first() is None:
+            return
+        rows = reconcile(db, stats_model, progress_model)
+        db.commit()
+    print(f" User stats rollup filled from progress ({rows} users)")
+
+
+def stats_payload(user, stats) -> dict:
+    """Response body of the stats endpoints from a user and their rollup row (or None)"""
+    completed = stats.completed_count if stats else 0
+    return {
+        "user_id": user.id,
+        "username": user.username,
+        "total_points": user.points or 0,
+        "level": user.level or "Explorer",
+        "streak": user.streak or 0,
+        "completed_lessons": completed,
+        "total_lessons_attempted": stats.attempted_count if stats else 0,
+        "average_score": stats.score_sum / completed if completed else 0,
+        "last_activity_at": stats.last_activity_at if stats else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the per-user stats rollup")
+    parser.add_argument("command", choices=["reconcile"])
+    parser.parse_args()
+
+    from main import SessionLocal, UserStats, Progress
+
+    db = SessionLocal()
+    try:
+        rows = reconcile(db, UserStats, Progress)
+        db.commit()
+        print(f" Reconciled stats for {rows} users")
+    finally:
+        db.close()
@@ -99,8 +99,8 @@ function AdminOverview() {
     try {
       const [users, lessons, quizzes, games] = await Promise.all([
         apiClient.get("/admin/users"),
-        apiClient.get("/lessons"),
-        apiClient.get("/quizzes"),
+        apiClient.get("/lessons", { params: { fields: "id" } }),
+        apiClient.get("/quizzes", { params: { fields: "id" } }),
         apiClient.get("/games")
       ]);
       setStats({
@@ -243,7 +243,7 @@ function AdminLessons() {
   const fetchData = async () => {
     try {
       const [lessonsRes, subjectsRes] = await Promise.all([
-        apiClient.get("/lessons"),
+        apiClient.get("/lessons", { params: { view: "summary" } }),
         apiClient.get("/subjects")
       ]);
       setLessons(lessonsRes.data);
@@ -451,7 +451,7 @@ function AdminQuizzes() {
       const [quizzesRes, subjectsRes, lessonsRes] = await Promise.all([
         apiClient.get("/quizzes"),
         apiClient.get("/subjects"),
-        apiClient.get("/lessons")
+        apiClient.get("/lessons", { params: { fields: "id,title" } })
       ]);
       setQuizzes(quizzesRes.data);
       setSubjects(subjectsRes.data);
@@ -92,8 +92,8 @@ function TeacherOverview() {
     try {
       const [studentsRes, lessonsRes, quizzesRes, gamesRes] = await Promise.all([
         apiClient.get("/my-students"),
-        apiClient.get("/lessons"),
-        apiClient.get("/quizzes"),
+        apiClient.get("/lessons", { params: { fields: "id" } }),
+        apiClient.get("/quizzes", { params: { fields: "id" } }),
         apiClient.get("/games")
       ]);
       setStudents(studentsRes.data);
@@ -82,11 +82,15 @@ CREATE TABLE IF NOT EXISTS lessons (
     difficulty VARCHAR(20) DEFAULT 'beginner',
     estimated_time INTEGER DEFAULT 30,
     points INTEGER DEFAULT 50,
-    grade_levels TEXT DEFAULT '',
+    grade_levels TEXT[] DEFAULT '{}',
     description TEXT DEFAULT '',
     objectives TEXT DEFAULT '',
     prerequisites TEXT DEFAULT '',
-    tags TEXT DEFAULT ''
+    tags TEXT[] DEFAULT '{}',
+    -- Curriculum path of concept_id (concept -> topic -> curriculum subject), kept by backend/lesson_path.py
+    subject_id INTEGER,
+    grade_level INTEGER,
+    term_id INTEGER
 );
 
 -- Game Engines (created BEFORE games table)
@@ -131,7 +135,7 @@ CREATE TABLE IF NOT EXISTS quizzes (
     time_limit INTEGER DEFAULT 0,
     image_url TEXT DEFAULT '',
     audio_url TEXT DEFAULT '',
-    tags TEXT DEFAULT ''
+    tags TEXT[] DEFAULT '{}'
 );
 
 -- Progress (user-lesson tracking, including quiz/game scores)
@@ -153,10 +157,101 @@ CREATE TABLE IF NOT EXISTS rewards (
     for_user_id INTEGER REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- Revoked refresh tokens (kept only until the token itself would expire)
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti VARCHAR(32) PRIMARY KEY,
+    expires_at TIMESTAMP NOT NULL
+);
+
+-- Append-only points ledger and its day/week/term rollups (leaderboard windows)
+CREATE TABLE IF NOT EXISTS points_ledger (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    points INTEGER NOT NULL,
+    reason VARCHAR(30) NOT NULL,
+    source_id INTEGER,
+    awarded_at TIMESTAMP NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS points_rollups (
+    bucket_kind VARCHAR(10) NOT NULL,
+    bucket_key VARCHAR(20) NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    points INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket_kind, bucket_key, user_id)
+);
+
+-- Progress counters per user, kept in step with progress writes (backend/user_stats.py)
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INTEGER PRIMARY KEY REFERENCES users(id) ON DELETE CASCADE,
+    completed_count INTEGER NOT NULL DEFAULT 0,
+    attempted_count INTEGER NOT NULL DEFAULT 0,
+    score_sum INTEGER NOT NULL DEFAULT 0,
+    last_activity_at TIMESTAMP
+);
+
+-- Catalog version counters behind the ETag/304 answers of the catalog GETs (backend/table_versions.py)
+CREATE TABLE IF NOT EXISTS table_versions (
+    name VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP
+);
+
+-- Graded quiz submissions (all questions of the quiz's lesson) and their answers
+CREATE TABLE IF NOT EXISTS quiz_attempts (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    quiz_id INTEGER REFERENCES quizzes(id) ON DELETE SET NULL,
+    lesson_id INTEGER REFERENCES lessons(id) ON DELETE SET NULL,
+    score INTEGER NOT NULL,
+    correct_count INTEGER NOT NULL,
+    total_count INTEGER NOT NULL,
+    points_earned INTEGER NOT NULL DEFAULT 0,
+    submitted_at TIMESTAMP NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS quiz_answers (
+    id SERIAL PRIMARY KEY,
+    attempt_id INTEGER NOT NULL REFERENCES quiz_attempts(id) ON DELETE CASCADE,
+    quiz_id INTEGER REFERENCES quizzes(id) ON DELETE CASCADE,
+    answer TEXT,
+    is_correct BOOLEAN NOT NULL,
+    points INTEGER NOT NULL DEFAULT 0
+);
+
+-- Weighted full-text document per lesson, kept by backend/lesson_search.py
+CREATE TABLE IF NOT EXISTS lesson_search (
+    lesson_id INTEGER PRIMARY KEY REFERENCES lessons(id) ON DELETE CASCADE,
+    document tsvector NOT NULL
+);
+
 -- Indexes for performance
 CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
+-- Case-insensitive email lookups (roster import collision check)
+CREATE INDEX IF NOT EXISTS idx_users_email_lower ON users(lower(email));
 CREATE INDEX IF NOT EXISTS idx_progress_user ON progress(user_id);
+-- Keyset pagination: WHERE <filter> AND id > :cursor ORDER BY id
+CREATE INDEX IF NOT EXISTS idx_users_role_id ON users(role, id);
+CREATE INDEX IF NOT EXISTS idx_progress_user_id ON progress(user_id, id);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_progress_user_lesson ON progress(user_id, lesson_id);
+CREATE INDEX IF NOT EXISTS idx_lessons_concept_id ON lessons(concept_id, id);
+CREATE INDEX IF NOT EXISTS idx_quizzes_lesson_id ON quizzes(lesson_id, id);
 CREATE INDEX IF NOT EXISTS idx_media_lesson ON media(lesson_id);
+-- Tag/grade filters: && (any) and @> (all)
+CREATE INDEX IF NOT EXISTS idx_lessons_tags ON lessons USING GIN (tags);
+CREATE INDEX IF NOT EXISTS idx_lessons_grade_levels ON lessons USING GIN (grade_levels);
+CREATE INDEX IF NOT EXISTS idx_quizzes_tags ON quizzes USING GIN (tags);
+-- Subject / grade / term filters on the materialized curriculum path
+CREATE INDEX IF NOT EXISTS idx_lessons_subject ON lessons(subject_id, id);
+CREATE INDEX IF NOT EXISTS idx_lessons_subject_grade ON lessons(subject_id, grade_level, id);
+CREATE INDEX IF NOT EXISTS idx_lessons_grade_level ON lessons(grade_level, id);
+CREATE INDEX IF NOT EXISTS idx_lessons_term ON lessons(term_id, id);
+CREATE INDEX IF NOT EXISTS idx_quiz_attempts_user ON quiz_attempts(user_id, id);
+CREATE INDEX IF NOT EXISTS ix_quiz_answers_attempt_id ON quiz_answers(attempt_id);
+CREATE INDEX IF NOT EXISTS idx_lesson_search_document ON lesson_search USING GIN (document);
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires ON revoked_tokens(expires_at);
+CREATE INDEX IF NOT EXISTS idx_points_ledger_source ON points_ledger(user_id, reason, source_id);
+CREATE INDEX IF NOT EXISTS idx_points_rollups_rank ON points_rollups(bucket_kind, bucket_key, points);
 
 -- Insert some initial data
 INSERT INTO countries (name) VALUES 
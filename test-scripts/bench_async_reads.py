@@ -0,0 +1,79 @@
+# bench_async_reads.py
+# Requests/sec on the hot read endpoints at high concurrency, for comparing two
+# deployments (e.g. the sync build vs the async build):
+#
+#   python bench_async_reads.py --before http://localhost:8001 --after http://localhost:8000 \
+#       --username student --password student123
+import argparse
+import asyncio
+import time
+
+import httpx
+
+ENDPOINTS = ["/lessons", "/quizzes", "/games", "/leaderboard", "/users/me", "/progress/lesson/1"]
+
+
+async def login(client, base_url, username, password):
+    response = await client.post(f"{base_url}/token", data={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def run_endpoint(client, url, headers, concurrency, duration):
+    done = 0
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal done, errors
+        while time.perf_counter() < deadline:
+            try:
+                response = await client.get(url, headers=headers)
+                if response.status_code == 200:
+                    done += 1
+                else:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return done / elapsed, errors
+
+
+async def bench(base_url, args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        headers = await login(client, base_url, args.username, args.password)
+        results = {}
+        for endpoint in ENDPOINTS:
+            results[endpoint] = await run_endpoint(
+                client, f"{base_url}{endpoint}", headers, args.concurrency, args.duration
+            )
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--before", required=True, help="base URL of the baseline deployment")
+    parser.add_argument("--after", required=True, help="base URL of the deployment under test")
+    parser.add_argument("--username", default="student")
+    parser.add_argument("--password", default="student123")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per endpoint")
+    args = parser.parse_args()
+
+    before = asyncio.run(bench(args.before, args))
+    after = asyncio.run(bench(args.after, args))
+
+    print(f"{'endpoint':<22}{'before req/s':>14}{'after req/s':>14}{'speedup':>10}{'errors':>10}")
+    for endpoint in ENDPOINTS:
+        b_rps, b_err = before[endpoint]
+        a_rps, a_err = after[endpoint]
+        speedup = a_rps / b_rps if b_rps else float("inf")
+        print(f"{endpoint:<22}{b_rps:>14.1f}{a_rps:>14.1f}{speedup:>9.2f}x{b_err + a_err:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+# bench_coalescing.py
+# A classroom opening the leaderboard at once: bursts of identical concurrent
+# requests against a cold cache key, and how many of them the server answered
+# from one in-flight build (the "coalesced" counters in /metrics) instead of
+# running their own queries. Seeds users with points on first run.
+#
+#   python bench_coalescing.py --base-url http://localhost:8000 [--burst 30] [--rounds 20]
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+PASSWORD = "bench-pass-123"
+
+
+async def register(client, role="student"):
+    username = f"bench_{role}_{uuid.uuid4().hex[:8]}"
+    response = await client.post("/register", json={
+        "username": username, "email": f"{username}@example.com", "password": PASSWORD, "role": role,
+    })
+    response.raise_for_status()
+    response = await client.post("/token", data={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def seed(client, students):
+    teacher = await register(client, "teacher")
+    lesson = await client.post("/lessons", json={
+        "title": "Coalescing benchmark lesson", "content_html": "<p>" + "Reefs shelter fish. " * 2000 + "</p>",
+    }, headers=teacher)
+    lesson.raise_for_status()
+    lesson_id = lesson.json()["id"]
+    for _ in range(students):
+        headers = await register(client)
+        await client.post(f"/progress/lesson/{lesson_id}/complete", json={"score": 90}, headers=headers)
+    return lesson_id
+
+
+def route_counters(metrics, route):
+    stats = metrics["response_cache"]["routes"].get(route, {})
+    return stats.get("misses", 0), stats.get("coalesced", 0), stats.get("hits", 0)
+
+
+async def burst(client, path, size):
+    async def one():
+        started = time.perf_counter()
+        response = await client.get(path)
+        response.raise_for_status()
+        return (time.perf_counter() - started) * 1000, response.headers.get("x-cache")
+
+    return await asyncio.gather(*(one() for _ in range(size)))
+
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.burst, max_keepalive_connections=args.burst)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60, limits=limits) as client:
+        lesson_id = await seed(client, args.students)
+        cases = [("/leaderboard", "/leaderboard?limit=50"), ("/lessons/enhanced/{lesson_id}", f"/lessons/enhanced/{lesson_id}")]
+        print(f"{args.rounds} rounds of {args.burst} identical requests on a cold key")
+        print(f"{'endpoint':<32}{'requests':>9}{'built':>7}{'coalesced':>10}{'cached':>8}{'p50 ms':>8}{'max ms':>8}")
+        for route, path in cases:
+            before = route_counters((await client.get("/metrics")).json(), route)
+            samples = []
+            for i in range(args.rounds):
+                # A fresh query parameter per round makes every burst start from a miss
+                samples += await burst(client, f"{path}{'&' if '?' in path else '?'}_round={uuid.uuid4().hex[:6]}", args.burst)
+            after = route_counters((await client.get("/metrics")).json(), route)
+            built, coalesced, cached = (a - b for a, b in zip(after, before))
+            ms = [sample for sample, _ in samples]
+            print(f"{route:<32}{len(samples):>9}{built:>7}{coalesced:>10}{cached:>8}"
+                  f"{statistics.median(ms):>8.1f}{max(ms):>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--burst", type=int, default=30)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--students", type=int, default=60)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
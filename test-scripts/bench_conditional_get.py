@@ -0,0 +1,78 @@
+# bench_conditional_get.py
+# Latency and bytes of a catalog GET answered in full (200) vs revalidated with
+# If-None-Match (304). Seeds lessons with a realistic content_html body on first
+# run, then checks that a write moves the ETag:
+#
+#   python bench_conditional_get.py --base-url http://localhost:8000 [--lessons 100] [--repeat 30]
+import argparse
+import statistics
+import time
+import uuid
+
+import httpx
+
+PASSWORD = "bench-pass-123"
+
+PATHS = ["/lessons?limit=100", "/lessons?limit=100&view=summary", "/quizzes?limit=100", "/subjects", "/games"]
+
+
+def register_and_login(client):
+    username = f"bench_teacher_{uuid.uuid4().hex[:8]}"
+    response = client.post("/register", json={
+        "username": username, "email": f"{username}@example.com", "password": PASSWORD, "role": "teacher",
+    })
+    response.raise_for_status()
+    response = client.post("/token", data={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def seed(client, headers, lessons):
+    existing = len(client.get("/lessons?limit=100&fields=id").json())
+    body = "<p>" + "Photosynthesis turns light into chemical energy. " * 400 + "</p>"
+    for i in range(existing, lessons):
+        client.post("/lessons", json={
+            "title": f"Benchmark lesson {i}", "content_html": body, "category": "Science", "points": 50,
+        }, headers=headers).raise_for_status()
+
+
+def measure(client, path, headers, repeat):
+    samples, size, code = [], 0, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path, headers=headers)
+        samples.append((time.perf_counter() - started) * 1000)
+        size, code = len(response.content), response.status_code
+    return code, size, statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--lessons", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    with httpx.Client(base_url=args.base_url, timeout=60, headers={"Accept-Encoding": "identity"}) as client:
+        headers = register_and_login(client)
+        seed(client, headers, args.lessons)
+        print(f"{'endpoint':<34}{'200 ms':>9}{'bytes':>11}{'304 ms':>9}{'bytes':>7}")
+        for path in PATHS:
+            etag = client.get(path, headers=headers).headers.get("etag")
+            if not etag:
+                print(f"{path:<34}  no ETag")
+                continue
+            _, full_size, full_ms = measure(client, path, headers, args.repeat)
+            code, size, ms = measure(client, path, {**headers, "If-None-Match": etag}, args.repeat)
+            print(f"{path:<34}{full_ms:>9.2f}{full_size:>11,}{ms:>9.2f}{size:>7}" + ("" if code == 304 else f"  (got {code})"))
+
+        # A write must invalidate: the old tag no longer matches
+        etag = client.get(PATHS[0], headers=headers).headers["etag"]
+        client.post("/lessons", json={"title": "Benchmark lesson extra", "content_html": "<p>x</p>"},
+                    headers=headers).raise_for_status()
+        status = client.get(PATHS[0], headers={**headers, "If-None-Match": etag}).status_code
+        print(f"after a lesson write: {status} ({'OK' if status == 200 else 'STALE'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# bench_leaderboard.py
+# In-memory leaderboard index vs the SQL sort it replaces, at 500k users by default:
+#
+#   python bench_leaderboard.py [--database-url sqlite:///./bench_leaderboard.db] [--users 500000]
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, func, insert, or_, select, and_
+
+from leaderboard_index import LeaderboardIndex
+
+metadata = MetaData()
+users = Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("points", Integer),
+    Column("role", String(50)),
+)
+
+
+def build(engine, count):
+    metadata.create_all(engine)
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count()).select_from(users)).scalar()
+    if existing >= count:
+        return
+    print(f"Inserting {count - existing} users...")
+    rng = random.Random(7)
+    with engine.begin() as conn:
+        for start in range(existing, count, 50000):
+            conn.execute(insert(users), [
+                {"points": int(rng.expovariate(1 / 800)), "role": "student" if rng.random() < 0.9 else "teacher"}
+                for _ in range(start, min(start + 50000, count))
+            ])
+
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default="sqlite:///./bench_leaderboard.db")
+    parser.add_argument("--users", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    build(engine, args.users)
+
+    with engine.connect() as conn:
+        started = time.perf_counter()
+        index = LeaderboardIndex()
+        index.rebuild(conn.execute(select(users.c.id, users.c.points, users.c.role)).all(), ["role"])
+        rebuild_s = time.perf_counter() - started
+
+        probe = conn.execute(select(users.c.id, users.c.points).order_by(func.random()).limit(1)).first()
+        top_sql = select(users.c.id, users.c.points).order_by(users.c.points.desc(), users.c.id).limit(50)
+        rank_sql = select(func.count() + 1).where(or_(
+            users.c.points > probe.points, and_(users.c.points == probe.points, users.c.id < probe.id)
+        ))
+        students_sql = top_sql.where(users.c.role == "student")
+
+        sql_rank = conn.execute(rank_sql).scalar()
+        assert sql_rank == index.rank_of(probe.id), (sql_rank, index.rank_of(probe.id))
+        assert [r.id for r in conn.execute(top_sql)] == [r["user_id"] for r in index.top(50)]
+
+        results = [
+            ("top 50", median_ms(lambda: conn.execute(top_sql).all(), args.repeat),
+             median_ms(lambda: index.top(50), args.repeat)),
+            ("top 50 students", median_ms(lambda: conn.execute(students_sql).all(), args.repeat),
+             median_ms(lambda: index.top(50, ("role", "student")), args.repeat)),
+            ("rank of user", median_ms(lambda: conn.execute(rank_sql).scalar(), args.repeat),
+             median_ms(lambda: index.rank_of(probe.id), args.repeat)),
+        ]
+
+    around_ms = median_ms(lambda: index.around(probe.id, 5), args.repeat)
+    rng = random.Random(1)
+    ids = [rng.randint(1, args.users) for _ in range(10000)]
+    started = time.perf_counter()
+    for user_id in ids:
+        index.update(user_id, rng.randint(0, 5000), (("role", "student"),))
+    updates_per_s = len(ids) / (time.perf_counter() - started)
+
+    print(f"{args.users} users, index rebuild {rebuild_s:.2f}s")
+    print(f"{'query':<18}{'SQL ms':>10}{'index ms':>10}")
+    for name, sql_ms, index_ms in results:
+        print(f"{name:<18}{sql_ms:>10.2f}{index_ms:>10.4f}")
+    print(f"{'neighbours (+-5)':<18}{'-':>10}{around_ms:>10.4f}")
+    print(f"incremental updates: {updates_per_s:,.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# bench_lean_reads.py
+# In-process microbenchmark of a 1k-row /lessons and /quizzes page, from query
+# to response bytes:
+#   orm + pydantic   ORM objects -> dict per row -> response_model validation
+#                    -> json.dumps (the old list handlers)
+#   orm + orjson     the same, rendered by ORJSONResponse
+#   lean             Core row tuples -> compiled row encoder -> orjson
+#                    (backend/lean_read.py)
+#
+#   python bench_lean_reads.py [--rows 1000] [--repeat 30]
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import List
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "lean_reads.db")
+os.environ.setdefault("HASH_CALIBRATE_ON_STARTUP", "false")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend"))
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from sqlalchemy.orm import undefer
+
+import main as backend
+from main import Base, Lesson, Quiz, LessonOut, QuizOut, LESSON_VIEWS, QUIZ_VIEWS, engine, SessionLocal, lesson_fields, quiz_fields
+from lean_read import encode_rows
+
+
+def seed(rows):
+    Base.metadata.create_all(engine)
+    body = "<p>" + "Lesson text. " * 150 + "</p>"
+    with engine.begin() as conn:
+        conn.execute(insert(Lesson.__table__), [
+            {"title": f"Lesson {i}", "content_html": body, "created_at": datetime.utcnow(), "category": "Science",
+             "tags": "biology,plants", "grade_levels": "6,7"}
+            for i in range(rows)
+        ])
+        conn.execute(insert(Quiz.__table__), [
+            {"lesson_id": i % rows + 1, "question": f"Question {i}?", "options": "Alpha,Beta,Gamma,Delta",
+             "correct_answer": "B", "explanation": "Because", "tags": "bench"}
+            for i in range(rows)
+        ])
+
+
+def orm_pydantic(db, model, out_model, fields, to_dict, render):
+    objects = db.execute(select(model).options(undefer("*")).order_by(model.id)).scalars().all()
+    adapter = TypeAdapter(List[out_model])
+    payload = adapter.dump_python(adapter.validate_python([to_dict(o, fields) for o in objects]), mode="json",
+                                  exclude_unset=True)
+    return render(payload)
+
+
+def lean(db, fieldset, fields):
+    rows = db.execute(fieldset.select(fields).order_by(fieldset.model.id)).all()
+    return encode_rows(fieldset.encoder(fields), rows)
+
+
+def lesson_dict(lesson, fields):
+    return {name: getattr(lesson, name) for name in fields}
+
+
+def quiz_dict(quiz, fields):
+    out = {name: getattr(quiz, name) for name in fields}
+    out["options"] = backend.split_options(quiz.options)
+    return out
+
+
+def median_ms(fn, repeat):
+    samples = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+        size = len(body)
+    return statistics.median(samples), size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+    seed(args.rows)
+
+    stdlib = lambda payload: json.dumps(payload).encode()
+    fast = lambda payload: orjson.dumps(payload)
+    cases = [
+        ("lessons", Lesson, LessonOut, lesson_fields, LESSON_VIEWS["full"], lesson_dict),
+        ("lessons summary", Lesson, LessonOut, lesson_fields, LESSON_VIEWS["summary"], lesson_dict),
+        ("quizzes", Quiz, QuizOut, quiz_fields, QUIZ_VIEWS["full"], quiz_dict),
+    ]
+    print(f"{args.rows} rows per page, median of {args.repeat}")
+    print(f"{'list':<18}{'orm+pydantic ms':>17}{'orm+orjson ms':>15}{'lean ms':>10}{'speedup':>9}{'bytes':>11}")
+    with SessionLocal() as db:
+        for name, model, out_model, fieldset, fields, to_dict in cases:
+            old, _ = median_ms(lambda: orm_pydantic(db, model, out_model, fields, to_dict, stdlib), args.repeat)
+            mid, _ = median_ms(lambda: orm_pydantic(db, model, out_model, fields, to_dict, fast), args.repeat)
+            new, size = median_ms(lambda: lean(db, fieldset, fields), args.repeat)
+            db.expunge_all()
+            print(f"{name:<18}{old:>17.2f}{mid:>15.2f}{new:>10.2f}{old / new:>8.1f}x{size:>11,}")
+
+
+if __name__ == "__main__":
+    main()
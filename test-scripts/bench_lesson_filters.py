@@ -0,0 +1,162 @@
+# bench_lesson_filters.py
+# /lessons subject/grade/term filters on a 200k-lesson catalog: the four-way
+# join through concept -> topic -> curriculum_subject vs the materialized path
+# columns on lessons (see backend/lesson_path.py). Builds the catalog on first run:
+#
+#   python bench_lesson_filters.py [--database-url sqlite:///./bench_lesson_filters.db] [--lessons 200000]
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table, create_engine, func, insert, select, update
+
+metadata = MetaData()
+curriculum_subjects = Table(
+    "curriculum_subjects", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("subject_id", Integer),
+    Column("grade_level", Integer),
+)
+topics = Table(
+    "topics", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("curriculum_subject_id", Integer),
+    Column("term_id", Integer),
+)
+concepts = Table(
+    "concepts", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("topic_id", Integer),
+)
+lessons = Table(
+    "lessons", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("concept_id", Integer),
+    Column("title", String(150)),
+    Column("subject_id", Integer),
+    Column("grade_level", Integer),
+    Column("term_id", Integer),
+    Index("idx_lessons_concept_id", "concept_id", "id"),
+    Index("idx_lessons_subject", "subject_id", "id"),
+    Index("idx_lessons_subject_grade", "subject_id", "grade_level", "id"),
+    Index("idx_lessons_grade_level", "grade_level", "id"),
+    Index("idx_lessons_term", "term_id", "id"),
+)
+
+SUBJECTS, GRADES, TERMS, TOPICS_PER_TERM, CONCEPTS_PER_TOPIC = 12, 13, 3, 5, 8
+PAGE = 50
+
+
+def build(engine, count):
+    metadata.create_all(engine)
+    with engine.connect() as conn:
+        if conn.execute(select(func.count()).select_from(lessons)).scalar() >= count:
+            return
+    print(f"Building a {count}-lesson catalog...")
+    rng = random.Random(3)
+    with engine.begin() as conn:
+        for table in (lessons, concepts, topics, curriculum_subjects):
+            conn.execute(table.delete())
+        conn.execute(insert(curriculum_subjects), [
+            {"id": s * GRADES + g + 1, "subject_id": s + 1, "grade_level": g} for s in range(SUBJECTS) for g in range(GRADES)
+        ])
+        topic_rows = [
+            {"curriculum_subject_id": cs, "term_id": (cs - 1) * TERMS + t + 1}
+            for cs in range(1, SUBJECTS * GRADES + 1) for t in range(TERMS) for _ in range(TOPICS_PER_TERM)
+        ]
+        conn.execute(insert(topics), topic_rows)
+        conn.execute(insert(concepts), [
+            {"topic_id": topic} for topic in range(1, len(topic_rows) + 1) for _ in range(CONCEPTS_PER_TOPIC)
+        ])
+        concept_count = len(topic_rows) * CONCEPTS_PER_TOPIC
+        for start in range(0, count, 50000):
+            conn.execute(insert(lessons), [
+                {"concept_id": rng.randint(1, concept_count), "title": f"Lesson {i}"}
+                for i in range(start, min(start + 50000, count))
+            ])
+        # Same correlated update as lesson_path.refresh_paths
+        path = (
+            select(curriculum_subjects.c.subject_id, curriculum_subjects.c.grade_level, topics.c.term_id)
+            .select_from(concepts)
+            .join(topics, topics.c.id == concepts.c.topic_id)
+            .join(curriculum_subjects, curriculum_subjects.c.id == topics.c.curriculum_subject_id)
+            .where(concepts.c.id == lessons.c.concept_id)
+        )
+        started = time.perf_counter()
+        conn.execute(update(lessons).values(
+            subject_id=path.with_only_columns(curriculum_subjects.c.subject_id).scalar_subquery(),
+            grade_level=path.with_only_columns(curriculum_subjects.c.grade_level).scalar_subquery(),
+            term_id=path.with_only_columns(topics.c.term_id).scalar_subquery(),
+        ))
+        print(f"Materialized paths for {count} lessons in {time.perf_counter() - started:.2f}s")
+
+
+def joined(**filters):
+    query = (
+        select(lessons.c.id, lessons.c.title)
+        .join(concepts, concepts.c.id == lessons.c.concept_id)
+        .join(topics, topics.c.id == concepts.c.topic_id)
+        .join(curriculum_subjects, curriculum_subjects.c.id == topics.c.curriculum_subject_id)
+    )
+    columns = {"subject_id": curriculum_subjects.c.subject_id, "grade_level": curriculum_subjects.c.grade_level,
+               "term_id": topics.c.term_id}
+    for name, value in filters.items():
+        query = query.where(columns[name] == value)
+    return query
+
+
+def materialized(**filters):
+    query = select(lessons.c.id, lessons.c.title)
+    for name, value in filters.items():
+        query = query.where(lessons.c[name] == value)
+    return query
+
+
+def page(query, after):
+    return query.where(lessons.c.id > after).order_by(lessons.c.id).limit(PAGE)
+
+
+def median_ms(conn, statement, repeat):
+    samples, rows = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = conn.execute(statement).all()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default="sqlite:///./bench_lesson_filters.db")
+    parser.add_argument("--lessons", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    build(engine, args.lessons)
+
+    cases = [
+        ("subject", {"subject_id": 3}),
+        ("subject + grade", {"subject_id": 3, "grade_level": 7}),
+        ("grade", {"grade_level": 7}),
+        ("term", {"term_id": 100}),
+    ]
+    print(f"{'filter':<18}{'page':>6}{'join ms':>10}{'path ms':>10}{'rows':>6}")
+    with engine.connect() as conn:
+        for name, filters in cases:
+            middle = conn.execute(
+                select(lessons.c.id).where(*(lessons.c[k] == v for k, v in filters.items()))
+                .order_by(lessons.c.id).offset(conn.execute(
+                    select(func.count()).select_from(lessons).where(*(lessons.c[k] == v for k, v in filters.items()))
+                ).scalar() // 2).limit(1)
+            ).scalar() or 0
+            for label, after in (("first", 0), ("middle", middle)):
+                join_ms, join_rows = median_ms(conn, page(joined(**filters), after), args.repeat)
+                path_ms, path_rows = median_ms(conn, page(materialized(**filters), after), args.repeat)
+                assert join_rows == path_rows, f"{name}: results differ"
+                print(f"{name:<18}{label:>6}{join_ms:>10.2f}{path_ms:>10.2f}{len(path_rows):>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# bench_pagination.py
+# Latency of deep pages on a large progress table: deprecated skip/limit vs keyset cursors.
+# Builds the table on first run (1M rows by default, spread over --users users):
+#
+#   python bench_pagination.py [--database-url sqlite:///./bench_pagination.db] [--rows 1000000]
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+
+from sqlalchemy import Boolean, Column, Index, Integer, MetaData, Table, create_engine, func, insert, select
+
+from pagination import decode_cursor, encode_cursor, keyset
+
+metadata = MetaData()
+progress = Table(
+    "progress",
+    metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer),
+    Column("lesson_id", Integer),
+    Column("score", Integer),
+    Column("completed", Boolean),
+    Index("idx_progress_user_id", "user_id", "id"),
+)
+
+PAGES = [1, 10, 100, 1000]
+
+
+def build(engine, rows, users):
+    metadata.create_all(engine)
+    with engine.connect() as conn:
+        existing = conn.execute(select(func.count()).select_from(progress)).scalar()
+    if existing >= rows:
+        return
+    print(f"Inserting {rows - existing} progress rows...")
+    batch = 50000
+    with engine.begin() as conn:
+        for start in range(existing, rows, batch):
+            conn.execute(insert(progress), [
+                {"user_id": i % users + 1, "lesson_id": i % 500 + 1, "score": i % 100, "completed": i % 3 == 0}
+                for i in range(start, min(start + batch, rows))
+            ])
+
+
+def timed(conn, statement, repeat):
+    samples = []
+    rows = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = conn.execute(statement).all()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default="sqlite:///./bench_pagination.db")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    build(engine, args.rows, args.users)
+    base = select(progress).where(progress.c.user_id == 1)
+
+    with engine.connect() as conn:
+        # keyset() fetches limit + 1 rows, exactly as the endpoints do.
+        # Walk the cursors once to find the key each page starts after
+        cursors = {1: None}
+        cursor = None
+        for number in range(2, max(PAGES) + 1):
+            last = conn.execute(keyset(base, progress.c.id, cursor, args.limit)).all()[args.limit - 1]
+            cursor = encode_cursor(last.id)
+            cursors[number] = cursor
+
+        print(f"{'page':>6}{'offset ms':>12}{'keyset ms':>12}")
+        for number in PAGES:
+            offset_ms, offset_rows = timed(
+                conn, keyset(base, progress.c.id, None, args.limit, skip=(number - 1) * args.limit), args.repeat
+            )
+            keyset_ms, keyset_rows = timed(conn, keyset(base, progress.c.id, cursors[number], args.limit), args.repeat)
+            assert [r.id for r in offset_rows] == [r.id for r in keyset_rows], f"page {number} differs"
+            print(f"{number:>6}{offset_ms:>12.2f}{keyset_ms:>12.2f}")
+        if cursors[max(PAGES)]:
+            print(f"page {max(PAGES)} starts after id {decode_cursor(cursors[max(PAGES)])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# bench_quiz_ingest.py
+# Questions/sec for POST /quizzes/bulk (JSON, streamed NDJSON and CSV bodies)
+# against one POST /quizzes per question, which is what the old bulk endpoint
+# cost (a commit and refresh per row). The per-row baseline runs a sample and
+# is extrapolated to the full size:
+#
+#   python bench_quiz_ingest.py --base-url http://localhost:8000 --questions 10000 --sample 500
+import argparse
+import asyncio
+import csv
+import io
+import json
+import time
+import uuid
+
+import httpx
+
+PASSWORD = "bench-pass-123"
+
+
+async def register_and_login(client):
+    username = f"bench_teacher_{uuid.uuid4().hex[:8]}"
+    response = await client.post("/register", json={
+        "username": username, "email": f"{username}@example.com", "password": PASSWORD, "role": "teacher",
+    })
+    response.raise_for_status()
+    response = await client.post("/token", data={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def question(i):
+    return {
+        "question": f"Benchmark question {i}: which option is B?",
+        "question_type": "mc_single",
+        "options": ["Option A", "Option B", "Option C", "Option D"],
+        "correct_answer": "B",
+        "explanation": "B is B",
+        "points": 10,
+        "tags": ["bench", f"set{i % 10}"],
+    }
+
+
+def csv_body(questions):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["question", "question_type", "options", "correct_answer", "explanation", "points", "tags"])
+    for q in questions:
+        writer.writerow([q["question"], q["question_type"], "|".join(q["options"]), q["correct_answer"],
+                         q["explanation"], q["points"], "|".join(q["tags"])])
+    return out.getvalue().encode()
+
+
+async def ndjson_stream(questions, batch=500):
+    for start in range(0, len(questions), batch):
+        yield "".join(json.dumps(q) + "\n" for q in questions[start:start + batch]).encode()
+
+
+async def timed_bulk(client, headers, lesson_id, label, **request):
+    started = time.perf_counter()
+    response = await client.post(f"/quizzes/bulk?lesson_id={lesson_id}", headers=headers, **request)
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    return label, response.json()["count"], elapsed
+
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=600) as client:
+        headers = await register_and_login(client)
+        response = await client.post("/lessons", json={"title": "Bulk ingest benchmark", "content_html": ""},
+                                     headers=headers)
+        response.raise_for_status()
+        lesson_id = response.json()["id"]
+        questions = [question(i) for i in range(args.questions)]
+
+        results = [
+            await timed_bulk(client, headers, lesson_id, "bulk json", json={"quizzes": questions}),
+            await timed_bulk(client, {**headers, "Content-Type": "application/x-ndjson"}, lesson_id,
+                             "bulk ndjson (streamed)", content=ndjson_stream(questions)),
+            await timed_bulk(client, {**headers, "Content-Type": "text/csv"}, lesson_id, "bulk csv",
+                             content=csv_body(questions)),
+        ]
+
+        started = time.perf_counter()
+        for q in questions[:args.sample]:
+            response = await client.post("/quizzes", json=dict(q, lesson_id=lesson_id), headers=headers)
+            response.raise_for_status()
+        per_row = (time.perf_counter() - started) / args.sample
+        results.append((f"per-row POST (x{args.sample}, extrapolated)", args.questions, per_row * args.questions))
+
+    print(f"{'path':<40}{'questions':>10}{'seconds':>10}{'q/s':>10}")
+    for label, count, elapsed in results:
+        print(f"{label:<40}{count:>10}{elapsed:>10.2f}{count / elapsed:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--questions", type=int, default=10_000)
+    parser.add_argument("--sample", type=int, default=500, help="questions posted one by one for the baseline")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
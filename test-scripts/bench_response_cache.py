@@ -0,0 +1,70 @@
+# bench_response_cache.py
+# Latency of the shared read endpoints answered from the response cache vs
+# rebuilt on every request (a throwaway query parameter makes each request a
+# new cache key), then the per-route hit ratios from /metrics.
+#
+#   python bench_response_cache.py --base-url http://localhost:8000 [--repeat 50]
+#
+# To exercise the shared tier across workers, start resp_stub.py and run the
+# API with RESPONSE_CACHE_URL=redis://127.0.0.1:6390/0 and --workers > 1.
+import argparse
+import statistics
+import time
+import uuid
+
+import httpx
+
+PASSWORD = "bench-pass-123"
+
+PATHS = ["/subjects", "/subjects/enhanced", "/games/list", "/leaderboard", "/leaderboard?window=week"]
+
+
+def register_and_login(client):
+    username = f"bench_teacher_{uuid.uuid4().hex[:8]}"
+    response = client.post("/register", json={
+        "username": username, "email": f"{username}@example.com", "password": PASSWORD, "role": "teacher",
+    })
+    response.raise_for_status()
+    response = client.post("/token", data={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def measure(client, path, headers, repeat, bust):
+    samples = []
+    for i in range(repeat):
+        url = path + ("&" if "?" in path else "?") + f"_bust={i}" if bust else path
+        started = time.perf_counter()
+        client.get(url, headers=headers).raise_for_status()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with httpx.Client(base_url=args.base_url, timeout=60) as client:
+        headers = register_and_login(client)
+        lesson = client.post("/lessons", json={
+            "title": "Cache benchmark lesson", "content_html": "<p>" + "Tides follow the moon. " * 2000 + "</p>",
+        }, headers=headers)
+        lesson.raise_for_status()
+        paths = PATHS + [f"/lessons/enhanced/{lesson.json()['id']}"]
+
+        print(f"{'endpoint':<30}{'rebuilt ms':>12}{'cached ms':>11}{'speedup':>9}")
+        for path in paths:
+            rebuilt = measure(client, path, headers, args.repeat, bust=True)
+            cached = measure(client, path, headers, args.repeat, bust=False)
+            print(f"{path:<30}{rebuilt:>12.2f}{cached:>11.2f}{rebuilt / cached:>8.1f}x")
+
+        stats = client.get("/metrics").json()["response_cache"]
+        print(f"\nbackend {stats['backend']}, overall hit ratio {stats['hit_ratio']:.1%}")
+        for route, route_stats in stats["routes"].items():
+            print(f"  {route:<32}{route_stats['hit_ratio']:>8.1%}  ({route_stats['hits']} hits, {route_stats['misses']} misses)")
+
+
+if __name__ == "__main__":
+    main()
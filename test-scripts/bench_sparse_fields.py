@@ -0,0 +1,88 @@
+# bench_sparse_fields.py
+# Payload size and latency of the lesson and quiz list pages in the full shape
+# vs ?view=summary and a narrow ?fields= projection. Seeds lessons with a
+# realistic content_html body (and one quiz each) on first run:
+#
+#   python bench_sparse_fields.py --base-url http://localhost:8000 [--lessons 100] [--body-kb 20]
+import argparse
+import statistics
+import time
+import uuid
+
+import httpx
+
+PASSWORD = "bench-pass-123"
+
+CASES = [
+    ("/lessons?limit=100", "full"),
+    ("/lessons?limit=100&view=summary", "summary"),
+    ("/lessons?limit=100&fields=title,points", "fields=title,points"),
+    ("/quizzes?limit=100", "full"),
+    ("/quizzes?limit=100&view=summary", "summary"),
+]
+
+
+def register_and_login(client):
+    username = f"bench_teacher_{uuid.uuid4().hex[:8]}"
+    response = client.post("/register", json={
+        "username": username, "email": f"{username}@example.com", "password": PASSWORD, "role": "teacher",
+    })
+    response.raise_for_status()
+    response = client.post("/token", data={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def seed(client, headers, lessons, body_kb):
+    existing = len(client.get("/lessons?limit=100&fields=id").json())
+    if existing >= lessons:
+        return
+    paragraph = "<p>" + "Photosynthesis turns light into chemical energy. " * 20 + "</p>"
+    body = paragraph * max(1, body_kb * 1024 // len(paragraph))
+    for i in range(existing, lessons):
+        response = client.post("/lessons", json={
+            "title": f"Benchmark lesson {i}", "content_html": body, "category": "Science",
+            "difficulty": "intermediate", "points": 50, "description": "A lesson used for benchmarking",
+        }, headers=headers)
+        response.raise_for_status()
+        client.post("/quizzes", json={
+            "lesson_id": response.json()["id"], "question": "What does photosynthesis produce?",
+            "options": ["Glucose", "Salt", "Iron"], "correct_answer": "A", "explanation": "Plants make sugar",
+        }, headers=headers).raise_for_status()
+
+
+def measure(client, headers, path, repeat):
+    samples, size = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path, headers=headers)
+        samples.append((time.perf_counter() - started) * 1000)
+        response.raise_for_status()
+        size = len(response.content)
+    return size, statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--lessons", type=int, default=100)
+    parser.add_argument("--body-kb", type=int, default=20, help="size of each seeded lesson's content_html")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    # Identity encoding so sizes are what a client without gzip receives
+    with httpx.Client(base_url=args.base_url, timeout=60, headers={"Accept-Encoding": "identity"}) as client:
+        headers = register_and_login(client)
+        seed(client, headers, args.lessons, args.body_kb)
+        print(f"{'endpoint':<10}{'shape':<22}{'bytes':>12}{'median ms':>12}")
+        baseline = {}
+        for path, shape in CASES:
+            size, ms = measure(client, headers, path, args.repeat)
+            endpoint = path.split("?")[0]
+            base_size, base_ms = baseline.setdefault(endpoint, (size, ms))
+            print(f"{endpoint:<10}{shape:<22}{size:>12,}{ms:>12.2f}"
+                  f"   ({size / base_size:.1%} of the bytes, {ms / base_ms:.2f}x the time)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# check_query_budgets.py
+# Seeds a throwaway SQLite database and checks list endpoints stay within their
+# query budget however many rows they return (no N+1 lookups):
+#
+#   python check_query_budgets.py [--rows 100]
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "budgets.db")
+BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND)
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from database import engine, SessionLocal
+from dependencies import get_current_user
+from models import Base, User, Assignment, School, Island, Lesson
+from query_budget import query_budget
+
+
+def load_router(name):
+    """Import one routers/ module on its own (routers/__init__.py imports modules that do not exist)"""
+    spec = importlib.util.spec_from_file_location(f"routers_{name}", os.path.join(BACKEND, "routers", f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+admin, subjects, lessons = load_router("admin"), load_router("subjects"), load_router("lessons")
+
+# (path, maximum queries)
+BUDGETS = [
+    ("/admin/assignments?limit=100", 2),
+    ("/schools", 2),
+    ("/lessons?limit=100", 1),
+    ("/lessons?view=summary&limit=100", 1),
+]
+
+
+def seed(rows):
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    users = [User(username=f"u{i}", email=f"u{i}@example.com", hashed_password="x", role="student", created_at=datetime.utcnow())
+             for i in range(rows * 3)]
+    islands = [Island(name=f"Island {i}") for i in range(rows)]
+    db.add_all(users + islands)
+    db.flush()
+    db.add_all(
+        Assignment(student_id=users[3 * i].id, parent_id=users[3 * i + 1].id, teacher_id=users[3 * i + 2].id, created_at=datetime.utcnow())
+        for i in range(rows)
+    )
+    db.add_all(School(name=f"School {i}", island_id=islands[i].id) for i in range(rows))
+    # Core insert: the search index table is not created here
+    db.execute(Lesson.__table__.insert(), [
+        {"title": f"Lesson {i}", "content_html": "<p>...</p>", "created_at": datetime.utcnow()} for i in range(rows)
+    ])
+    db.commit()
+    admin_user = User(id=0, username="admin", role="admin")
+    db.close()
+    return admin_user
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100)
+    args = parser.parse_args()
+
+    admin_user = seed(args.rows)
+    app = FastAPI()
+    app.include_router(admin.router)
+    app.include_router(subjects.router)
+    app.include_router(lessons.router)
+    app.dependency_overrides[get_current_user] = lambda: admin_user
+    client = TestClient(app)
+
+    for path, budget in BUDGETS:
+        with query_budget(engine, budget) as counter:
+            response = client.get(path)
+        response.raise_for_status()
+        print(f"{path:<32} {len(response.json()):>5} rows {counter.count:>3} queries (budget {budget})")
+    print("OK: all endpoints within budget")
+
+
+if __name__ == "__main__":
+    main()
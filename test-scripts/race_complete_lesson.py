@@ -0,0 +1,71 @@
+# race_complete_lesson.py
+# Fires N parallel completions of one lesson for a fresh student and checks the
+# points were awarded exactly once and only one progress row exists:
+#
+#   python race_complete_lesson.py --base-url http://localhost:8000 -n 50
+import argparse
+import asyncio
+import uuid
+
+import httpx
+
+PASSWORD = "race-pass-123"
+
+
+async def register_and_login(client, role):
+    username = f"race_{role}_{uuid.uuid4().hex[:8]}"
+    response = await client.post("/register", json={
+        "username": username, "email": f"{username}@example.com", "password": PASSWORD, "role": role,
+    })
+    response.raise_for_status()
+    response = await client.post("/token", data={"username": username, "password": PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def run(args):
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=60) as client:
+        teacher = await register_and_login(client, "teacher")
+        student = await register_and_login(client, "student")
+
+        response = await client.post("/lessons", headers=teacher, json={
+            "title": "Race lesson", "content_html": "<p>race</p>", "points": args.points,
+        })
+        response.raise_for_status()
+        lesson_id = response.json()["id"]
+
+        me = (await client.get("/users/me", headers=student)).json()
+        before = me["points"] or 0
+
+        responses = await asyncio.gather(*(
+            client.post(f"/progress/lesson/{lesson_id}/complete", headers=student, json={"score": 90})
+            for _ in range(args.n)
+        ))
+        statuses = [r.status_code for r in responses]
+        awarded = [r.json()["points_awarded"] for r in responses if r.status_code == 200]
+
+        after = (await client.get("/users/me", headers=student)).json()["points"]
+        rows = [
+            p for p in (await client.get(f"/progress/user/{me['id']}", headers=student)).json()
+            if p["lesson_id"] == lesson_id
+        ]
+
+    print(f"statuses: { {s: statuses.count(s) for s in set(statuses)} }")
+    print(f"awards: {sum(1 for a in awarded if a)} of {len(awarded)}, points {before} -> {after}, progress rows: {len(rows)}")
+    assert all(s == 200 for s in statuses), "some completions failed"
+    assert sum(1 for a in awarded if a) == 1, "points awarded more than once"
+    assert after - before == args.points, "total points do not match a single award"
+    assert len(rows) == 1, "duplicate progress rows"
+    print("OK: exactly-once")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("-n", type=int, default=50, help="parallel completions")
+    parser.add_argument("--points", type=int, default=75)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# resp_stub.py
+# Tiny in-memory Redis-protocol server with just the commands the response
+# cache uses (GET, MGET, SET [PX|EX], DEL, INCR, PING, SELECT, FLUSHDB), for
+# trying RESPONSE_CACHE_URL without a Redis install:
+#
+#   python resp_stub.py [--port 6390]
+#   RESPONSE_CACHE_URL=redis://127.0.0.1:6390/0 uvicorn main:app --workers 4
+#
+# Other scripts can start it in a thread with start(port).
+import argparse
+import socketserver
+import threading
+import time
+
+_data = {}
+_expires = {}
+_lock = threading.Lock()
+
+
+def _live(key):
+    deadline = _expires.get(key)
+    if deadline is not None and deadline <= time.monotonic():
+        _data.pop(key, None)
+        _expires.pop(key, None)
+    return _data.get(key)
+
+
+def _bulk(value):
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+def handle(args):
+    command = args[0].upper()
+    with _lock:
+        if command == b"GET":
+            return _bulk(_live(args[1]))
+        if command == b"MGET":
+            return b"*%d\r\n" % (len(args) - 1) + b"".join(_bulk(_live(key)) for key in args[1:])
+        if command == b"SET":
+            _data[args[1]] = args[2]
+            _expires.pop(args[1], None)
+            if len(args) >= 5 and args[3].upper() in (b"PX", b"EX"):
+                scale = 1000 if args[3].upper() == b"PX" else 1
+                _expires[args[1]] = time.monotonic() + int(args[4]) / scale
+            return b"+OK\r\n"
+        if command == b"DEL":
+            removed = sum(_data.pop(key, None) is not None for key in args[1:])
+            return b":%d\r\n" % removed
+        if command == b"INCR":
+            value = int(_live(args[1]) or 0) + 1
+            _data[args[1]] = str(value).encode()
+            return b":%d\r\n" % value
+        if command == b"FLUSHDB":
+            _data.clear()
+            _expires.clear()
+            return b"+OK\r\n"
+        if command in (b"PING",):
+            return b"+PONG\r\n"
+        if command in (b"SELECT", b"AUTH"):
+            return b"+OK\r\n"
+    return b"-ERR unknown command '%s'\r\n" % command
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:-2])):
+                size = int(self.rfile.readline()[1:-2])
+                args.append(self.rfile.read(size + 2)[:-2])
+            self.wfile.write(handle(args))
+
+
+class Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start(port=6390):
+    server = Server(("127.0.0.1", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    print(f"RESP stand-in on 127.0.0.1:{args.port}")
+    Server(("127.0.0.1", args.port), Handler).serve_forever()